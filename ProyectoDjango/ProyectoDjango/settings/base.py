@@ -35,6 +35,7 @@ DJANGO_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
 ]
 
@@ -135,3 +136,125 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 # CORS Configuration
 CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOW_CREDENTIALS = True
+
+# ===== CACHÉ =====
+# Backend compartido entre procesos (todos los workers ven las mismas entradas).
+# En producción puede apuntarse a Redis o Memcached con las variables de entorno.
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', os.path.join(BASE_DIR, '.cache', 'django')),
+    },
+    # Respuestas de las APIs REST (ver apis/services/cache_respuestas.py). La
+    # invalidación va por la versión del catálogo en 'default', así que una
+    # caché local por proceso es válida; también sirve archivos, BD o Redis.
+    'respuestas': {
+        'BACKEND': os.environ.get('RESPUESTAS_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('RESPUESTAS_CACHE_LOCATION', 'respuestas-api'),
+        'OPTIONS': {'MAX_ENTRIES': int(os.environ.get('RESPUESTAS_CACHE_MAX_ENTRIES', 500))},
+    },
+}
+
+# Caché de respuestas de las APIs REST: alias de CACHES, segundos de vida
+# (0 = desactivada) y tamaño máximo de una respuesta para guardarla
+API_CACHE_RESPUESTAS_ALIAS = os.environ.get('API_CACHE_RESPUESTAS_ALIAS', 'respuestas')
+API_CACHE_RESPUESTAS_TTL = int(os.environ.get('API_CACHE_RESPUESTAS_TTL', 300))
+API_CACHE_RESPUESTAS_MAX_BYTES = int(os.environ.get('API_CACHE_RESPUESTAS_MAX_BYTES', 512 * 1024))
+
+# Tasa de cambio USD -> COP: segundos que se considera fresca y segundos
+# adicionales durante los que se sirve mientras se refresca en segundo plano
+EXCHANGERATE_CACHE_TTL = int(os.environ.get('EXCHANGERATE_CACHE_TTL', 3600))
+EXCHANGERATE_CACHE_STALE_TTL = int(os.environ.get('EXCHANGERATE_CACHE_STALE_TTL', 86400))
+
+# Catálogo externo de la tienda: segundos antes de refrescar el snapshot en segundo plano
+CATALOGO_SNAPSHOT_TTL = int(os.environ.get('CATALOGO_SNAPSHOT_TTL', 300))
+
+# Tamaño de lote para INSERT ... ON CONFLICT al sincronizar productos
+SINCRONIZACION_BATCH_SIZE = int(os.environ.get('SINCRONIZACION_BATCH_SIZE', 500))
+
+# Recalculo de precios COP: filas por transacción (0 = una sola sentencia UPDATE)
+PRECIOS_COP_TAMANO_LOTE = int(os.environ.get('PRECIOS_COP_TAMANO_LOTE', 0))
+
+# Recalcular los precios COP almacenados cuando un refresco en segundo plano trae una tasa nueva
+EXCHANGERATE_ACTUALIZAR_PRECIOS = os.environ.get('EXCHANGERATE_ACTUALIZAR_PRECIOS', 'True') == 'True'
+
+# ===== CLIENTE HTTP (APIs externas) =====
+# Timeouts en segundos, conexiones persistentes por host e hilos para descargas en paralelo
+HTTP_TIMEOUT_CONEXION = float(os.environ.get('HTTP_TIMEOUT_CONEXION', 3.05))
+HTTP_TIMEOUT_LECTURA = float(os.environ.get('HTTP_TIMEOUT_LECTURA', 10))
+HTTP_MAX_CONEXIONES_POR_HOST = int(os.environ.get('HTTP_MAX_CONEXIONES_POR_HOST', 10))
+HTTP_MAX_HILOS = int(os.environ.get('HTTP_MAX_HILOS', 8))
+
+# ===== APIS EXTERNAS =====
+DUMMYJSON_API_URL = os.environ.get('DUMMYJSON_API_URL', 'https://dummyjson.com/products')
+
+# Directorio de los puntos de control de rastrear_catalogo
+CRAWLER_CHECKPOINT_DIR = os.environ.get('CRAWLER_CHECKPOINT_DIR', os.path.join(BASE_DIR, '.cache', 'crawler'))
+
+# ===== TELEMETRÍA =====
+# Buffer en memoria para el historial (MongoDB) y ConsultaAPI: máximo de registros
+# pendientes, tamaño de lote por escritura y segundos entre escrituras
+TELEMETRIA_MAX_PENDIENTES = int(os.environ.get('TELEMETRIA_MAX_PENDIENTES', 10000))
+TELEMETRIA_TAMANO_LOTE = int(os.environ.get('TELEMETRIA_TAMANO_LOTE', 500))
+TELEMETRIA_INTERVALO = float(os.environ.get('TELEMETRIA_INTERVALO', 1.0))
+
+# ===== MONGODB =====
+# Días que se conserva el historial (índice TTL sobre `fecha`) y si los índices
+# se crean automáticamente en la primera conexión de cada proceso
+MONGO_HISTORIAL_RETENCION_DIAS = float(os.environ.get('MONGO_HISTORIAL_RETENCION_DIAS', 90))
+MONGO_ASEGURAR_INDICES = os.environ.get('MONGO_ASEGURAR_INDICES', 'True') == 'True'
+# Segundos entre intentos de crear los índices si MongoDB no responde
+MONGO_REINTENTO_INDICES_SEGUNDOS = int(os.environ.get('MONGO_REINTENTO_INDICES_SEGUNDOS', 300))
+
+# Conexión (MONGO_URI tiene prioridad sobre host/puerto) y base de datos
+MONGO_HOST = os.environ.get('MONGO_HOST', 'localhost')
+MONGO_PORT = int(os.environ.get('MONGO_PORT', 27017))
+MONGO_URI = os.environ.get('MONGO_URI', f'mongodb://{MONGO_HOST}:{MONGO_PORT}/')
+MONGO_DB = os.environ.get('MONGO_DB', 'tienda_apis_db')
+
+# Pool de conexiones por proceso y timeouts en milisegundos. La selección de
+# servidor es corta para que una caída de MongoDB falle rápido.
+MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', 50))
+MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', 0))
+MONGO_MAX_IDLE_TIME_MS = int(os.environ.get('MONGO_MAX_IDLE_TIME_MS', 60000))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS', 1000))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', 2000))
+MONGO_CONNECT_TIMEOUT_MS = int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', 2000))
+MONGO_SOCKET_TIMEOUT_MS = int(os.environ.get('MONGO_SOCKET_TIMEOUT_MS', 5000))
+
+# ===== DASHBOARD DE APIS =====
+# Segundos que se reutilizan los contadores (las escrituras los invalidan) y
+# filas estimadas de api_consultas a partir de las que no se hace COUNT(*) (0 = siempre exacto)
+DASHBOARD_CONTADORES_TTL = int(os.environ.get('DASHBOARD_CONTADORES_TTL', 300))
+DASHBOARD_CONTADORES_STALE_TTL = int(os.environ.get('DASHBOARD_CONTADORES_STALE_TTL', 60))
+DASHBOARD_CONTEO_ESTIMADO_DESDE = int(os.environ.get('DASHBOARD_CONTEO_ESTIMADO_DESDE', 100000))
+
+# Facetas de categoría/marca: segundos en caché (las escrituras la invalidan)
+FACETAS_CACHE_TTL = int(os.environ.get('FACETAS_CACHE_TTL', 3600))
+
+# Máximo de productos por respuesta de /apis/api/productos/ (parámetro limit)
+API_PRODUCTOS_JSON_MAX_LIMIT = int(os.environ.get('API_PRODUCTOS_JSON_MAX_LIMIT', 5000))
+
+# Máximo de productos por petición a /api/productos/lote/ (crear, actualizar o eliminar)
+PRODUCTOS_API_MAX_LOTE = int(os.environ.get('PRODUCTOS_API_MAX_LOTE', 1000))
+
+# Carrito: unidades máximas por línea y líneas máximas por petición a carrito/api/agregar/
+CARRITO_MAX_CANTIDAD = int(os.environ.get('CARRITO_MAX_CANTIDAD', 99))
+CARRITO_MAX_ITEMS = int(os.environ.get('CARRITO_MAX_ITEMS', 100))
+
+# ===== PROXY DE IMÁGENES =====
+# Hosts de origen admitidos, caché en disco (límite total con expulsión LRU y
+# tamaño máximo por imagen), vigencia si el origen no la indica y max-age
+# que se envía a los navegadores
+IMAGENES_HOSTS_PERMITIDOS = os.environ.get('IMAGENES_HOSTS_PERMITIDOS', 'cdn.dummyjson.com,dummyjson.com').split(',')
+IMAGENES_CACHE_DIR = os.environ.get('IMAGENES_CACHE_DIR', os.path.join(BASE_DIR, '.cache', 'imagenes'))
+IMAGENES_CACHE_MAX_BYTES = int(os.environ.get('IMAGENES_CACHE_MAX_BYTES', 500 * 1024 * 1024))
+IMAGENES_MAX_BYTES_IMAGEN = int(os.environ.get('IMAGENES_MAX_BYTES_IMAGEN', 10 * 1024 * 1024))
+IMAGENES_TTL_POR_DEFECTO = int(os.environ.get('IMAGENES_TTL_POR_DEFECTO', 86400))
+IMAGENES_MAX_AGE_CLIENTE = int(os.environ.get('IMAGENES_MAX_AGE_CLIENTE', 2592000))
+
+# Variantes de imágenes: anchos permitidos (el pedido se ajusta al siguiente),
+# formatos que se ofrecen según Accept (en orden de preferencia) y calidad
+IMAGENES_ANCHOS = [int(a) for a in os.environ.get('IMAGENES_ANCHOS', '150,300,600,900,1200').split(',')]
+IMAGENES_FORMATOS_NEGOCIADOS = os.environ.get('IMAGENES_FORMATOS_NEGOCIADOS', 'avif,webp').split(',')
+IMAGENES_CALIDAD = int(os.environ.get('IMAGENES_CALIDAD', 80))
@@ -1,8 +1,10 @@
 """
 Administración de modelos para el panel de Django Admin.
 """
-from django.contrib import admin
-from .models import ProductoAPI, ConsultaAPI
+from django.conf import settings
+from django.contrib import admin, messages
+from .models import ProductoAPI, ConsultaAPI, FacetaProducto, DocumentoBusqueda
+from .services.exchangerate_service import ExchangeRateService
 
 @admin.register(ProductoAPI)
 class ProductoAPIAdmin(admin.ModelAdmin):
@@ -11,6 +13,7 @@ class ProductoAPIAdmin(admin.ModelAdmin):
     search_fields = ['titulo', 'descripcion', 'categoria', 'marca']
     readonly_fields = ['api_id', 'sincronizado_en', 'actualizado_en']
     list_editable = ['activo']
+    actions = ['recalcular_precios_cop']
     
     fieldsets = (
         ('Información de API', {
@@ -27,6 +30,22 @@ class ProductoAPIAdmin(admin.ModelAdmin):
         }),
     )
 
+    @admin.action(description='Recalcular precios COP con la tasa actual')
+    def recalcular_precios_cop(self, request, queryset):
+        tasas = ExchangeRateService.obtener_tasa_cambio()
+        if not tasas:
+            self.message_user(request, 'No se pudo obtener la tasa de cambio.', messages.ERROR)
+            return
+        
+        actualizados = queryset.recalcular_precios_cop(
+            tasas['tasa_cop'], tamano_lote=settings.PRECIOS_COP_TAMANO_LOTE
+        )
+        self.message_user(
+            request,
+            f"✓ {actualizados} precios actualizados. Tasa: 1 USD = {tasas['tasa_cop']:.2f} COP",
+            messages.SUCCESS,
+        )
+
 @admin.register(ConsultaAPI)
 class ConsultaAPIAdmin(admin.ModelAdmin):
     list_display = ['api_nombre', 'tipo', 'fecha_consulta', 'exitosa']
@@ -34,3 +53,18 @@ class ConsultaAPIAdmin(admin.ModelAdmin):
     search_fields = ['api_nombre', 'detalles']
     readonly_fields = ['fecha_consulta']
     date_hierarchy = 'fecha_consulta'
+
+@admin.register(FacetaProducto)
+class FacetaProductoAdmin(admin.ModelAdmin):
+    list_display = ['tipo', 'valor', 'total', 'activos']
+    list_filter = ['tipo']
+    search_fields = ['valor']
+    readonly_fields = ['tipo', 'valor', 'total', 'activos']
+
+
+@admin.register(DocumentoBusqueda)
+class DocumentoBusquedaAdmin(admin.ModelAdmin):
+    list_display = ['origen', 'objeto_id', 'titulo', 'etiquetas', 'activo', 'actualizado_en']
+    list_filter = ['origen', 'activo']
+    search_fields = ['titulo']
+    readonly_fields = ['origen', 'objeto_id', 'titulo', 'etiquetas', 'descripcion', 'activo', 'actualizado_en']
@@ -5,3 +5,6 @@ class ApisConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'applications.apis'
     verbose_name = 'Integración de APIs'
+
+    def ready(self):
+        from . import signals  # noqa: F401
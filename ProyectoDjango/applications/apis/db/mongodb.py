@@ -1,40 +1,202 @@
 """
 Configuración de MongoDB para almacenar datos no relacionales.
 Este módulo maneja la conexión a MongoDB.
+
+El cliente se crea de forma perezosa en cada proceso (nunca se comparte
+un cliente creado antes de un fork, por ejemplo con gunicorn --preload) y
+toma el tamaño del pool y los timeouts de settings, con una selección de
+servidor corta para que una caída de MongoDB falle rápido.
 """
-from pymongo import MongoClient
+import os
+import threading
+import time
+
+from pymongo import MongoClient, DESCENDING
+from pymongo.errors import OperationFailure
+from pymongo.monitoring import ConnectionPoolListener
 from django.conf import settings
 
+# Colecciones de historial: se consultan ordenadas por fecha y expiran por TTL
+COLECCIONES_HISTORIAL = ['historial_dummyjson', 'historial_exchangerate']
+
+
+class MonitorPool(ConnectionPoolListener):
+    """Cuenta los eventos del pool de conexiones para exponerlos en métricas"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.contadores = {
+            'conexiones_creadas': 0,
+            'conexiones_cerradas': 0,
+            'checkouts': 0,
+            'checkins': 0,
+            'checkouts_fallidos': 0,
+            'pools_limpiados': 0,
+        }
+
+    def _sumar(self, contador):
+        with self._lock:
+            self.contadores[contador] += 1
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._sumar('pools_limpiados')
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._sumar('conexiones_creadas')
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._sumar('conexiones_cerradas')
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self._sumar('checkouts_fallidos')
+
+    def connection_checked_out(self, event):
+        self._sumar('checkouts')
+
+    def connection_checked_in(self, event):
+        self._sumar('checkins')
+
+    def estadisticas(self):
+        with self._lock:
+            datos = dict(self.contadores)
+        datos['conexiones_abiertas'] = datos['conexiones_creadas'] - datos['conexiones_cerradas']
+        datos['conexiones_en_uso'] = datos['checkouts'] - datos['checkins']
+        return datos
+
+
+def opciones_cliente():
+    """Parámetros de MongoClient tomados de settings"""
+    return {
+        'maxPoolSize': getattr(settings, 'MONGO_MAX_POOL_SIZE', 50),
+        'minPoolSize': getattr(settings, 'MONGO_MIN_POOL_SIZE', 0),
+        'maxIdleTimeMS': getattr(settings, 'MONGO_MAX_IDLE_TIME_MS', 60000),
+        'waitQueueTimeoutMS': getattr(settings, 'MONGO_WAIT_QUEUE_TIMEOUT_MS', 1000),
+        'serverSelectionTimeoutMS': getattr(settings, 'MONGO_SERVER_SELECTION_TIMEOUT_MS', 2000),
+        'connectTimeoutMS': getattr(settings, 'MONGO_CONNECT_TIMEOUT_MS', 2000),
+        'socketTimeoutMS': getattr(settings, 'MONGO_SOCKET_TIMEOUT_MS', 5000),
+    }
+
+
 class MongoDBConnection:
-    """Singleton para conexión a MongoDB"""
+    """Singleton para conexión a MongoDB (un cliente por proceso)"""
     _instance = None
     _client = None
     _db = None
-    
+    _pid = None
+    _monitor = None
+    _indices_asegurados = False
+    _indices_intentados_en = None
+    _lock = threading.Lock()
+
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(MongoDBConnection, cls).__new__(cls)
         return cls._instance
-    
+
     def connect(self):
-        """Establece la conexión con MongoDB"""
-        if self._client is None:
-            # Conexión a MongoDB local
-            self._client = MongoClient('mongodb://localhost:27017/')
-            self._db = self._client['tienda_apis_db']
+        """Establece la conexión con MongoDB en el proceso actual"""
+        if self._client is None or self._pid != os.getpid():
+            with self._lock:
+                if self._client is None or self._pid != os.getpid():
+                    self._crear_cliente()
+
+        if getattr(settings, 'MONGO_ASEGURAR_INDICES', True) and self._toca_asegurar_indices():
+            try:
+                self.asegurar_indices()
+            except Exception as e:
+                print(f"Error al crear índices en MongoDB: {e}")
         return self._db
-    
+
+    def _toca_asegurar_indices(self):
+        """
+        Con MongoDB caído no se reintenta en cada petición (cada intento
+        espera el timeout de selección de servidor), sino como mucho una vez
+        cada MONGO_REINTENTO_INDICES_SEGUNDOS.
+        """
+        if self._indices_asegurados:
+            return False
+        ahora = time.monotonic()
+        espera = getattr(settings, 'MONGO_REINTENTO_INDICES_SEGUNDOS', 300)
+        with self._lock:
+            if self._indices_intentados_en is not None and ahora - self._indices_intentados_en < espera:
+                return False
+            self._indices_intentados_en = ahora
+        return True
+
+    def _crear_cliente(self):
+        # El cliente heredado de otro proceso no se cierra ni se reutiliza:
+        # sus sockets pertenecen al proceso padre
+        self._monitor = MonitorPool()
+        self._client = MongoClient(
+            getattr(settings, 'MONGO_URI', 'mongodb://localhost:27017/'),
+            connect=False,
+            event_listeners=[self._monitor],
+            **opciones_cliente()
+        )
+        self._db = self._client[getattr(settings, 'MONGO_DB', 'tienda_apis_db')]
+        self._pid = os.getpid()
+        self._indices_asegurados = False
+        self._indices_intentados_en = None
+
+    def asegurar_indices(self, dias_retencion=None):
+        """
+        Crea (si no existen) los índices que usan las consultas de historial:
+        un índice por fecha descendente que además es TTL, de modo que los
+        registros con más de `dias_retencion` días se eliminan solos.
+        Si el índice ya existe con otra retención, la ajusta con collMod.
+        """
+        if dias_retencion is None:
+            dias_retencion = getattr(settings, 'MONGO_HISTORIAL_RETENCION_DIAS', 90)
+        segundos = int(dias_retencion * 86400)
+        db = self._db if self._db is not None and self._pid == os.getpid() else self.connect()
+
+        for nombre in COLECCIONES_HISTORIAL:
+            try:
+                db[nombre].create_index(
+                    [('fecha', DESCENDING)], name='fecha_ttl', expireAfterSeconds=segundos
+                )
+            except OperationFailure:
+                db.command('collMod', nombre, index={'name': 'fecha_ttl', 'expireAfterSeconds': segundos})
+
+        self._indices_asegurados = True
+
     def get_collection(self, collection_name):
         """Obtiene una colección específica"""
         db = self.connect()
         return db[collection_name]
-    
+
+    def estadisticas_pool(self):
+        """Contadores del pool de conexiones del proceso actual y su configuración"""
+        activo = self._client is not None and self._pid == os.getpid()
+        return {
+            'pid': os.getpid(),
+            'cliente_creado': activo,
+            **(self._monitor.estadisticas() if activo else {}),
+            'configuracion': opciones_cliente(),
+        }
+
     def close(self):
         """Cierra la conexión"""
-        if self._client:
+        if self._client and self._pid == os.getpid():
             self._client.close()
-            self._client = None
-            self._db = None
+        self._client = None
+        self._db = None
+        self._pid = None
 
 # Instancia global
 mongo_db = MongoDBConnection()
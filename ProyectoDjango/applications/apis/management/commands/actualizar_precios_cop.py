@@ -0,0 +1,43 @@
+"""
+Recalcula los precios en COP de todos los productos de la API con una
+actualización SQL por conjuntos:
+
+    python manage.py actualizar_precios_cop
+    python manage.py actualizar_precios_cop --tasa 3950.5 --tamano-lote 10000
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from applications.apis.services.exchangerate_service import ExchangeRateService
+
+
+class Command(BaseCommand):
+    help = 'Recalcula precio_cop de los productos de la API con la tasa USD -> COP'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tasa',
+            type=str,
+            help='Tasa USD -> COP a aplicar; por defecto la tasa actual de ExchangeRate',
+        )
+        parser.add_argument(
+            '--tamano-lote',
+            type=int,
+            default=settings.PRECIOS_COP_TAMANO_LOTE,
+            help='Filas por transacción; 0 actualiza todo en una sola sentencia',
+        )
+
+    def handle(self, *args, **options):
+        tasa = options['tasa']
+        if tasa is None:
+            tasas = ExchangeRateService.obtener_tasa_cambio()
+            if not tasas:
+                raise CommandError('No se pudo obtener la tasa de cambio.')
+            tasa = tasas['tasa_cop']
+
+        actualizados = ExchangeRateService.aplicar_tasa_a_precios(
+            tasa, forzar=True, tamano_lote=options['tamano_lote']
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {actualizados} productos actualizados con tasa 1 USD = {tasa} COP'
+        ))
@@ -0,0 +1,33 @@
+"""
+Crea o ajusta los índices de las colecciones de historial en MongoDB:
+
+    python manage.py asegurar_indices_mongo
+    python manage.py asegurar_indices_mongo --dias 30
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from applications.apis.db.mongodb import COLECCIONES_HISTORIAL, mongo_db
+
+
+class Command(BaseCommand):
+    help = 'Crea los índices por fecha y la expiración TTL del historial en MongoDB'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias',
+            type=float,
+            default=getattr(settings, 'MONGO_HISTORIAL_RETENCION_DIAS', 90),
+            help='Días que se conserva el historial antes de expirar',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            mongo_db.asegurar_indices(dias_retencion=options['dias'])
+        except Exception as e:
+            raise CommandError(f'No se pudieron crear los índices: {e}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ Índices asegurados en {', '.join(COLECCIONES_HISTORIAL)} "
+            f"(retención: {options['dias']:g} días)"
+        ))
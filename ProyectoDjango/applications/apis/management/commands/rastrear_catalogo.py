@@ -0,0 +1,87 @@
+"""
+Recorre el catálogo completo de DummyJSON página a página y lo sincroniza
+con api_productos. Guarda un punto de control después de cada página, de
+modo que un recorrido interrumpido continúa donde quedó:
+
+    python manage.py rastrear_catalogo
+    python manage.py rastrear_catalogo --categoria mens-shoes --tamano-pagina 50
+    python manage.py rastrear_catalogo --base-url http://127.0.0.1:8001/products --desde-cero
+"""
+from datetime import datetime
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+from applications.apis.services.checkpoint_service import CheckpointCrawler
+from applications.apis.services.dummyjson_service import DummyJSONService
+from applications.apis.services.exchangerate_service import ExchangeRateService
+from applications.apis.services.sincronizacion_service import SincronizacionService
+
+
+class Command(BaseCommand):
+    help = 'Recorre el catálogo de DummyJSON con limit/skip y sincroniza cada página'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--categoria', help='Recorrer solo una categoría (por ejemplo mens-shoes)')
+        parser.add_argument('--tamano-pagina', type=int, default=100, help='Productos por página')
+        parser.add_argument('--base-url', help='URL base de la API (por defecto DUMMYJSON_API_URL)')
+        parser.add_argument(
+            '--desde-cero',
+            action='store_true',
+            help='Ignorar el punto de control y empezar desde el primer producto',
+        )
+
+    def handle(self, *args, **options):
+        categoria = options['categoria']
+        checkpoint = CheckpointCrawler(f"catalogo-{categoria or 'completo'}")
+
+        resumen = {'creados': 0, 'actualizados': 0, 'sin_cambios': 0, 'desactivados': 0}
+        skip = 0
+        avance = None if options['desde_cero'] else checkpoint.leer()
+        if avance:
+            skip = avance['skip']
+            resumen.update(avance.get('resumen', {}))
+            self.stdout.write(f"↻ Reanudando desde el producto {skip} de {avance['total']}")
+
+        tasas = ExchangeRateService.obtener_tasa_cambio()
+        tasa_cop = tasas.get('tasa_cop', 4000) if tasas else 4000
+
+        try:
+            for productos, skip, total in DummyJSONService.recorrer_paginas(
+                categoria=categoria,
+                tamano_pagina=options['tamano_pagina'],
+                skip=skip,
+                base_url=options['base_url'],
+            ):
+                resultado = SincronizacionService.sincronizar(productos, tasa_cop)
+                for clave, valor in resultado.items():
+                    resumen[clave] += valor
+                checkpoint.guardar(skip, total, resumen=resumen)
+                self.stdout.write(f"   {skip}/{total} productos procesados")
+        except requests.RequestException as e:
+            DummyJSONService._guardar_historial({
+                "tipo": "rastrear_catalogo",
+                "fecha": datetime.now(),
+                "categoria": categoria,
+                "skip": skip,
+                "exitoso": False,
+                "error": str(e),
+            })
+            raise CommandError(
+                f'Recorrido interrumpido en el producto {skip}: {e}. '
+                'Vuelve a ejecutar el comando para reanudarlo.'
+            )
+
+        checkpoint.borrar()
+        DummyJSONService._guardar_historial({
+            "tipo": "rastrear_catalogo",
+            "fecha": datetime.now(),
+            "categoria": categoria,
+            "cantidad": skip,
+            "exitoso": True,
+            **resumen,
+        })
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ Recorrido completo: {resumen['creados']} nuevos, {resumen['actualizados']} actualizados, "
+            f"{resumen['sin_cambios']} sin cambios"
+        ))
@@ -0,0 +1,17 @@
+"""
+Recalcula desde cero las facetas de categoría y marca (tabla api_facetas).
+Normalmente se mantienen solas; usar tras cargas manuales en la base de datos:
+
+    python manage.py reconstruir_facetas
+"""
+from django.core.management.base import BaseCommand
+
+from applications.apis.services.facetas_service import FacetasService
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los conteos por categoría y marca de los productos de la API'
+
+    def handle(self, *args, **options):
+        total = FacetasService.reconstruir()
+        self.stdout.write(self.style.SUCCESS(f'✓ {total} facetas recalculadas'))
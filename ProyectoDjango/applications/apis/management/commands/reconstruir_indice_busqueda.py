@@ -0,0 +1,17 @@
+"""
+Recalcula desde cero el índice de búsqueda unificado de la tienda (tabla
+api_busqueda). Normalmente se mantiene solo; usar tras cargas manuales:
+
+    python manage.py reconstruir_indice_busqueda
+"""
+from django.core.management.base import BaseCommand
+
+from applications.apis.services.busqueda_service import BusquedaService
+
+
+class Command(BaseCommand):
+    help = 'Recalcula el índice de búsqueda de productos locales y de la API'
+
+    def handle(self, *args, **options):
+        total = BusquedaService.reconstruir()
+        self.stdout.write(self.style.SUCCESS(f'✓ {total} productos indexados'))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apis', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productoapi',
+            name='hash_contenido',
+            field=models.CharField(blank=True, editable=False, help_text='Huella de los datos de la API para omitir productos sin cambios al sincronizar', max_length=64),
+        ),
+    ]
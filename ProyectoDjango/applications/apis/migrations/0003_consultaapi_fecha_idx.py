@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apis', '0002_productoapi_hash_contenido'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='consultaapi',
+            index=models.Index(fields=['-fecha_consulta'], name='api_consultas_fecha_idx'),
+        ),
+    ]
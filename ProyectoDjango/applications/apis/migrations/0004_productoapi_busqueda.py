@@ -0,0 +1,64 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:16
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+# Mantiene search_vector al insertar o modificar los campos de texto
+# (incluye los INSERT ... ON CONFLICT DO UPDATE de la sincronización)
+VECTOR_BUSQUEDA = """
+    setweight(to_tsvector('english', coalesce({t}.titulo, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce({t}.marca, '') || ' ' || coalesce({t}.categoria, '')), 'B') ||
+    setweight(to_tsvector('english', coalesce({t}.descripcion, '')), 'C')
+"""
+
+CREAR_TRIGGER = f"""
+CREATE OR REPLACE FUNCTION api_productos_search_vector_trigger() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := {VECTOR_BUSQUEDA.format(t='NEW')};
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER api_productos_search_vector_update
+    BEFORE INSERT OR UPDATE OF titulo, descripcion, marca, categoria
+    ON api_productos
+    FOR EACH ROW EXECUTE PROCEDURE api_productos_search_vector_trigger();
+
+UPDATE api_productos SET search_vector = {VECTOR_BUSQUEDA.format(t='api_productos')};
+"""
+
+ELIMINAR_TRIGGER = """
+DROP TRIGGER IF EXISTS api_productos_search_vector_update ON api_productos;
+DROP FUNCTION IF EXISTS api_productos_search_vector_trigger();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apis', '0003_consultaapi_fecha_idx'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='productoapi',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, help_text='Índice de búsqueda; lo mantiene un trigger de PostgreSQL', null=True),
+        ),
+        migrations.RunSQL(CREAR_TRIGGER, ELIMINAR_TRIGGER),
+        migrations.AddIndex(
+            model_name='productoapi',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='api_productos_busqueda_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='productoapi',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['titulo'], name='api_productos_titulo_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='productoapi',
+            index=models.Index(fields=['categoria'], name='api_productos_categoria_idx'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:18
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def poblar_facetas(apps, schema_editor):
+    """Calcula las facetas iniciales a partir de los productos existentes"""
+    ProductoAPI = apps.get_model('apis', 'ProductoAPI')
+    FacetaProducto = apps.get_model('apis', 'FacetaProducto')
+
+    filas = []
+    for tipo in ('categoria', 'marca'):
+        conteos = ProductoAPI.objects.exclude(**{tipo: ''}).values(tipo).annotate(
+            total=Count('id'),
+            activos=Count('id', filter=Q(activo=True)),
+        ).order_by()
+        filas.extend(
+            FacetaProducto(tipo=tipo, valor=fila[tipo], total=fila['total'], activos=fila['activos'])
+            for fila in conteos
+        )
+    FacetaProducto.objects.bulk_create(filas)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apis', '0004_productoapi_busqueda'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FacetaProducto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('categoria', 'Categoría'), ('marca', 'Marca')], max_length=20)),
+                ('valor', models.CharField(max_length=100)),
+                ('total', models.IntegerField(default=0)),
+                ('activos', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Faceta de productos',
+                'verbose_name_plural': 'Facetas de productos',
+                'db_table': 'api_facetas',
+                'ordering': ['tipo', 'valor'],
+                'constraints': [models.UniqueConstraint(fields=('tipo', 'valor'), name='api_facetas_tipo_valor_unico')],
+            },
+        ),
+        migrations.RunPython(poblar_facetas, migrations.RunPython.noop),
+    ]
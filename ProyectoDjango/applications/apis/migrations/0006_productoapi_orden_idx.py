@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apis', '0005_facetaproducto'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='productoapi',
+            index=models.Index(fields=['-sincronizado_en', '-id'], name='api_productos_orden_idx'),
+        ),
+    ]
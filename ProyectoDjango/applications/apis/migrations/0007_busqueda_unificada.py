@@ -0,0 +1,86 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:33
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+# Mismos pesos y configuración que el trigger de api_productos (migración 0004)
+CREAR_TRIGGER = """
+CREATE OR REPLACE FUNCTION api_busqueda_search_vector_trigger() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('english', coalesce(NEW.titulo, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(NEW.etiquetas, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(NEW.descripcion, '')), 'C');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER api_busqueda_search_vector_update
+    BEFORE INSERT OR UPDATE OF titulo, etiquetas, descripcion
+    ON api_busqueda
+    FOR EACH ROW EXECUTE PROCEDURE api_busqueda_search_vector_trigger();
+"""
+
+ELIMINAR_TRIGGER = """
+DROP TRIGGER IF EXISTS api_busqueda_search_vector_update ON api_busqueda;
+DROP FUNCTION IF EXISTS api_busqueda_search_vector_trigger();
+"""
+
+
+def poblar_indice(apps, schema_editor):
+    """Indexa los productos de la API y los locales propios (sin api_id) existentes"""
+    DocumentoBusqueda = apps.get_model('apis', 'DocumentoBusqueda')
+    ProductoAPI = apps.get_model('apis', 'ProductoAPI')
+    Producto = apps.get_model('productos', 'Producto')
+
+    documentos = [
+        DocumentoBusqueda(
+            origen='api', objeto_id=id_, titulo=titulo, activo=activo,
+            etiquetas=f'{categoria} {marca}'.strip(), descripcion=descripcion,
+        )
+        for id_, titulo, categoria, marca, descripcion, activo in ProductoAPI.objects.values_list(
+            'id', 'titulo', 'categoria', 'marca', 'descripcion', 'activo'
+        ).iterator()
+    ]
+    documentos.extend(
+        DocumentoBusqueda(origen='local', objeto_id=id_, titulo=nombre, descripcion=descripcion or '')
+        for id_, nombre, descripcion in Producto.objects.filter(api_id__isnull=True).values_list(
+            'id', 'nombre', 'descripcion'
+        ).iterator()
+    )
+    DocumentoBusqueda.objects.bulk_create(documentos, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apis', '0006_productoapi_orden_idx'),
+        ('productos', '0004_producto_api_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentoBusqueda',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('origen', models.CharField(choices=[('local', 'Producto local'), ('api', 'Producto de API')], max_length=10)),
+                ('objeto_id', models.IntegerField(help_text='id del producto en su tabla de origen')),
+                ('titulo', models.CharField(max_length=200)),
+                ('etiquetas', models.CharField(blank=True, help_text='Categoría y marca', max_length=250)),
+                ('descripcion', models.TextField(blank=True)),
+                ('activo', models.BooleanField(default=True)),
+                ('search_vector', django.contrib.postgres.search.SearchVectorField(editable=False, help_text='Índice de búsqueda; lo mantiene un trigger de PostgreSQL', null=True)),
+                ('actualizado_en', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Documento de búsqueda',
+                'verbose_name_plural': 'Índice de búsqueda',
+                'db_table': 'api_busqueda',
+                'indexes': [django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='api_busqueda_gin'), django.contrib.postgres.indexes.GinIndex(fields=['titulo'], name='api_busqueda_titulo_trgm', opclasses=['gin_trgm_ops'])],
+                'constraints': [models.UniqueConstraint(fields=('origen', 'objeto_id'), name='api_busqueda_origen_objeto_unico')],
+            },
+        ),
+        migrations.RunSQL(CREAR_TRIGGER, ELIMINAR_TRIGGER),
+        migrations.RunPython(poblar_indice, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+from django.db import migrations
+
+
+def quitar_espejos(apps, schema_editor):
+    """
+    Quita del índice los productos locales que son copias de productos de la
+    API (api_id), que ya aparecen con origen "api".
+    """
+    DocumentoBusqueda = apps.get_model('apis', 'DocumentoBusqueda')
+    Producto = apps.get_model('productos', 'Producto')
+    DocumentoBusqueda.objects.filter(
+        origen='local',
+        objeto_id__in=Producto.objects.filter(api_id__isnull=False).values('id'),
+    ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apis', '0007_busqueda_unificada'),
+    ]
+
+    operations = [
+        migrations.RunPython(quitar_espejos, migrations.RunPython.noop),
+    ]
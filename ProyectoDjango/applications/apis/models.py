@@ -2,9 +2,109 @@
 Modelos para la aplicación de APIs.
 Incluye modelos para almacenar productos sincronizados desde la API.
 """
-from django.db import models
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import (
+    SearchQuery, SearchRank, SearchVectorField, TrigramWordSimilarity,
+)
+from django.db import connections, models, transaction
+from django.db.models import DecimalField, F, FloatField, Max, Min, Q, Value
+from django.db.models.functions import Cast, Now
 from django.utils import timezone
 
+from .services.version_catalogo import PRODUCTOS_API, VersionCatalogo
+
+CENTAVOS = Decimal('0.01')
+
+# Configuración de texto de PostgreSQL del índice de búsqueda (los datos de la API están en inglés).
+# Debe coincidir con la del trigger de la migración 0004.
+CONFIG_BUSQUEDA = 'english'
+
+
+def normalizar_tasa(tasa_cambio):
+    """Tasa de cambio como Decimal con 6 decimales (misma precisión en Python y en SQL)"""
+    return Decimal(str(tasa_cambio)).quantize(Decimal('0.000001'), rounding=ROUND_HALF_UP)
+
+
+def convertir_usd_a_cop(precio_usd, tasa_cambio):
+    """Convierte un precio en USD a COP con aritmética Decimal exacta (2 decimales)"""
+    precio = Decimal(str(precio_usd)) * normalizar_tasa(tasa_cambio)
+    return precio.quantize(CENTAVOS, rounding=ROUND_HALF_UP)
+
+
+def buscar_por_relevancia(queryset, texto, campos):
+    """
+    Filtra `queryset` (modelo con `titulo` y un tsvector `search_vector`
+    mantenido por trigger) por `texto`. En PostgreSQL combina el tsvector
+    (índice GIN) con similitud de trigramas sobre el título (índice GIN con
+    pg_trgm) para tolerar errores de escritura, y ordena por relevancia.
+    En otros motores recurre a icontains sobre `campos`.
+    """
+    texto = (texto or '').strip()
+    if not texto:
+        return queryset
+
+    if connections[queryset.db].vendor != 'postgresql':
+        condicion = Q()
+        for campo in campos:
+            condicion |= Q(**{f'{campo}__icontains': texto})
+        return queryset.filter(condicion)
+
+    consulta = SearchQuery(texto, config=CONFIG_BUSQUEDA, search_type='websearch')
+    # ts_rank y word_similarity devuelven real; en double precision los
+    # valores sobreviven exactos a un cursor de paginación
+    return queryset.annotate(
+        relevancia=Cast(SearchRank(F('search_vector'), consulta), FloatField()),
+        similitud=Cast(TrigramWordSimilarity(texto, 'titulo'), FloatField()),
+    ).filter(
+        Q(search_vector=consulta) | Q(titulo__trigram_word_similar=texto)
+    ).order_by('-relevancia', '-similitud', '-id')
+
+
+class ProductoAPIQuerySet(models.QuerySet):
+    """Operaciones masivas y búsqueda sobre productos de la API"""
+
+    def buscar(self, texto):
+        """
+        Búsqueda por relevancia en título, marca, categoría y descripción
+        (pesos A título / B marca y categoría / C descripción). Ver
+        buscar_por_relevancia().
+        """
+        return buscar_por_relevancia(self, texto, ['titulo', 'marca', 'categoria', 'descripcion'])
+
+    def recalcular_precios_cop(self, tasa_cambio, tamano_lote=None):
+        """
+        Recalcula precio_cop = precio_usd * tasa directamente en SQL, con
+        aritmética NUMERIC exacta, reescribiendo solo las filas cuyo precio
+        cambia. Con tamano_lote se actualiza por rangos de id, cada uno en su
+        propia transacción, para no bloquear tablas muy grandes.
+        Devuelve el número de productos actualizados.
+        """
+        tasa = Value(normalizar_tasa(tasa_cambio), output_field=DecimalField(max_digits=20, decimal_places=6))
+        nuevo_precio = Cast(F('precio_usd') * tasa, output_field=DecimalField(max_digits=15, decimal_places=2))
+        pendientes = self.exclude(precio_cop=nuevo_precio)
+
+        if not tamano_lote:
+            actualizados = pendientes.update(precio_cop=nuevo_precio, actualizado_en=Now())
+        else:
+            limites = self.aggregate(minimo=Min('id'), maximo=Max('id'))
+            if limites['minimo'] is None:
+                return 0
+
+            actualizados = 0
+            for inicio in range(limites['minimo'], limites['maximo'] + 1, tamano_lote):
+                with transaction.atomic():
+                    actualizados += pendientes.filter(
+                        id__gte=inicio, id__lt=inicio + tamano_lote
+                    ).update(precio_cop=nuevo_precio, actualizado_en=Now())
+
+        # update() no emite señales
+        if actualizados:
+            transaction.on_commit(lambda: VersionCatalogo.incrementar(PRODUCTOS_API))
+        return actualizados
+
+
 class ProductoAPI(models.Model):
     """
     Modelo para almacenar productos obtenidos de DummyJSON API.
@@ -22,23 +122,44 @@ class ProductoAPI(models.Model):
     imagen_url = models.URLField(blank=True)
     
     # Metadatos
+    hash_contenido = models.CharField(
+        max_length=64, blank=True, editable=False,
+        help_text="Huella de los datos de la API para omitir productos sin cambios al sincronizar"
+    )
+    search_vector = SearchVectorField(
+        null=True, editable=False,
+        help_text="Índice de búsqueda; lo mantiene un trigger de PostgreSQL"
+    )
     sincronizado_en = models.DateTimeField(auto_now_add=True)
     actualizado_en = models.DateTimeField(auto_now=True)
     activo = models.BooleanField(default=True)
     
+    objects = ProductoAPIQuerySet.as_manager()
+    
     class Meta:
         db_table = 'api_productos'
         verbose_name = 'Producto de API'
         verbose_name_plural = 'Productos de API'
         ordering = ['-sincronizado_en']
+        indexes = [
+            GinIndex(fields=['search_vector'], name='api_productos_busqueda_gin'),
+            GinIndex(fields=['titulo'], name='api_productos_titulo_trgm', opclasses=['gin_trgm_ops']),
+            models.Index(fields=['categoria'], name='api_productos_categoria_idx'),
+            # Orden del listado y de la paginación por cursor
+            models.Index(fields=['-sincronizado_en', '-id'], name='api_productos_orden_idx'),
+        ]
     
     def __str__(self):
         return f"{self.titulo} (${self.precio_usd})"
     
+    def calcular_precio_cop(self, tasa_cambio):
+        """Devuelve el precio en COP para la tasa indicada sin modificar el producto"""
+        return convertir_usd_a_cop(self.precio_usd, tasa_cambio)
+    
     def actualizar_precio_cop(self, tasa_cambio):
         """Actualiza el precio en COP según la tasa de cambio"""
-        self.precio_cop = float(self.precio_usd) * tasa_cambio
-        self.save()
+        self.precio_cop = self.calcular_precio_cop(tasa_cambio)
+        self.save(update_fields=['precio_cop', 'actualizado_en'])
 
 
 class ConsultaAPI(models.Model):
@@ -63,6 +184,95 @@ class ConsultaAPI(models.Model):
         verbose_name = 'Consulta de API'
         verbose_name_plural = 'Consultas de APIs'
         ordering = ['-fecha_consulta']
+        indexes = [
+            # Últimas consultas del dashboard y del historial sin ordenar toda la tabla
+            models.Index(fields=['-fecha_consulta'], name='api_consultas_fecha_idx'),
+        ]
     
     def __str__(self):
         return f"{self.api_nombre} - {self.tipo} ({self.fecha_consulta})"
+
+
+class FacetaProducto(models.Model):
+    """
+    Conteo materializado de productos por categoría o marca, para los
+    filtros del listado sin recorrer api_productos en cada petición.
+    Lo mantienen al día la sincronización y las señales de ProductoAPI
+    (ver services/facetas_service.py); `reconstruir_facetas` lo recalcula.
+    """
+    TIPO_CHOICES = [
+        ('categoria', 'Categoría'),
+        ('marca', 'Marca'),
+    ]
+    
+    tipo = models.CharField(max_length=20, choices=TIPO_CHOICES)
+    valor = models.CharField(max_length=100)
+    total = models.IntegerField(default=0)
+    activos = models.IntegerField(default=0)
+    
+    class Meta:
+        db_table = 'api_facetas'
+        verbose_name = 'Faceta de productos'
+        verbose_name_plural = 'Facetas de productos'
+        ordering = ['tipo', 'valor']
+        constraints = [
+            models.UniqueConstraint(fields=['tipo', 'valor'], name='api_facetas_tipo_valor_unico'),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_tipo_display()}: {self.valor} ({self.activos}/{self.total})"
+
+
+class DocumentoBusquedaQuerySet(models.QuerySet):
+    def buscar(self, texto):
+        """
+        Búsqueda por relevancia en título, etiquetas y descripción (pesos
+        A / B / C). Ver buscar_por_relevancia().
+        """
+        return buscar_por_relevancia(self, texto, ['titulo', 'etiquetas', 'descripcion'])
+
+
+class DocumentoBusqueda(models.Model):
+    """
+    Índice de búsqueda unificado de la tienda: una fila por producto local
+    (productos.Producto) o de la API (ProductoAPI) con su texto y su
+    tsvector. Lo mantienen las señales de ambos modelos y la sincronización
+    (ver services/busqueda_service.py); `reconstruir_indice_busqueda` lo
+    rehace. Precios e imágenes se leen de las tablas de origen al mostrar
+    los resultados, así que los cambios de precio no tocan el índice.
+    """
+    ORIGEN_LOCAL = 'local'
+    ORIGEN_API = 'api'
+    ORIGEN_CHOICES = [
+        (ORIGEN_LOCAL, 'Producto local'),
+        (ORIGEN_API, 'Producto de API'),
+    ]
+    
+    origen = models.CharField(max_length=10, choices=ORIGEN_CHOICES)
+    objeto_id = models.IntegerField(help_text="id del producto en su tabla de origen")
+    titulo = models.CharField(max_length=200)
+    etiquetas = models.CharField(max_length=250, blank=True, help_text="Categoría y marca")
+    descripcion = models.TextField(blank=True)
+    activo = models.BooleanField(default=True)
+    search_vector = SearchVectorField(
+        null=True, editable=False,
+        help_text="Índice de búsqueda; lo mantiene un trigger de PostgreSQL"
+    )
+    actualizado_en = models.DateTimeField(auto_now=True)
+    
+    objects = DocumentoBusquedaQuerySet.as_manager()
+    
+    class Meta:
+        db_table = 'api_busqueda'
+        verbose_name = 'Documento de búsqueda'
+        verbose_name_plural = 'Índice de búsqueda'
+        constraints = [
+            models.UniqueConstraint(fields=['origen', 'objeto_id'], name='api_busqueda_origen_objeto_unico'),
+        ]
+        indexes = [
+            GinIndex(fields=['search_vector'], name='api_busqueda_gin'),
+            GinIndex(fields=['titulo'], name='api_busqueda_titulo_trgm', opclasses=['gin_trgm_ops']),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_origen_display()} #{self.objeto_id}: {self.titulo}"
@@ -0,0 +1,136 @@
+"""
+Paginación por cursor (keyset) para listados grandes.
+En lugar de OFFSET/LIMIT, cada página se pide con los valores de las claves
+de orden de su frontera (WHERE (a, b) < (x, y) ORDER BY a, b LIMIT n), que el
+índice resuelve en tiempo constante sin importar la profundidad. El cursor es
+opaco para el cliente (JSON en base64) y el conteo total es opcional.
+
+La última clave de orden debe ser única (normalmente el id) y ninguna puede
+ser nula. Las claves pueden ser anotaciones (p. ej. la relevancia de buscar()).
+"""
+import base64
+import binascii
+import json
+
+from django.db.models import Q
+
+ADELANTE = 'n'
+ATRAS = 'p'
+
+
+def _serializar(valor):
+    # isoformat conserva los microsegundos (DjangoJSONEncoder los recorta)
+    if hasattr(valor, 'isoformat'):
+        return valor.isoformat()
+    return str(valor)
+
+
+def codificar_cursor(orden, valores, direccion):
+    datos = json.dumps(
+        {'o': orden, 'v': valores, 'd': direccion}, default=_serializar, separators=(',', ':')
+    )
+    return base64.urlsafe_b64encode(datos.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decodificar_cursor(cursor, orden):
+    """Devuelve (valores, direccion) o None si el cursor no es válido para este orden"""
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        datos = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        valores, direccion = datos['v'], datos['d']
+    except (ValueError, TypeError, KeyError, binascii.Error):
+        return None
+    if datos.get('o') != list(orden) or len(valores) != len(orden) or direccion not in (ADELANTE, ATRAS):
+        return None
+    return valores, direccion
+
+
+def _invertir(campo):
+    return campo[1:] if campo.startswith('-') else f'-{campo}'
+
+
+def filtro_keyset(orden, valores):
+    """
+    Filas estrictamente posteriores a `valores` en el orden dado:
+    (a > x) OR (a = x AND b > y) OR ... respetando el sentido de cada clave.
+    La primera condición a >= x se repite fuera del OR para que el planificador
+    use el índice como rango.
+    """
+    condicion = Q()
+    iguales = {}
+    for campo, valor in zip(orden, valores):
+        nombre = campo.lstrip('-')
+        operador = 'lt' if campo.startswith('-') else 'gt'
+        condicion |= Q(**iguales, **{f'{nombre}__{operador}': valor})
+        iguales[nombre] = valor
+
+    primero = orden[0]
+    rango = {f"{primero.lstrip('-')}__{'lte' if primero.startswith('-') else 'gte'}": valores[0]}
+    return Q(**rango) & condicion
+
+
+class PaginaCursor:
+    """Página de resultados con los cursores de la anterior y la siguiente"""
+
+    def __init__(self, object_list, siguiente, anterior, total=None):
+        self.object_list = object_list
+        self.siguiente = siguiente
+        self.anterior = anterior
+        self.total = total
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, indice):
+        return self.object_list[indice]
+
+    def has_next(self):
+        return self.siguiente is not None
+
+    def has_previous(self):
+        return self.anterior is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def paginar_por_cursor(queryset, orden, cursor=None, tamano=20, total=None):
+    """
+    Devuelve la PaginaCursor de `queryset` ordenado por `orden` (lista de
+    campos, con '-' para descendente) a partir de `cursor`. Un cursor ausente
+    o inválido devuelve la primera página. `total` se copia tal cual a la
+    página: quien llama decide si cuenta o no.
+    """
+    orden = list(orden)
+    decodificado = decodificar_cursor(cursor, orden) if cursor else None
+
+    if decodificado is None:
+        valores, direccion = None, ADELANTE
+    else:
+        valores, direccion = decodificado
+
+    orden_consulta = orden if direccion == ADELANTE else [_invertir(c) for c in orden]
+    filas = queryset.order_by(*orden_consulta)
+    if valores is not None:
+        filas = filas.filter(filtro_keyset(orden_consulta, valores))
+
+    filas = list(filas[:tamano + 1])
+    hay_mas = len(filas) > tamano
+    filas = filas[:tamano]
+    if direccion == ATRAS:
+        filas.reverse()
+
+    def frontera(obj):
+        return [getattr(obj, campo.lstrip('-')) for campo in orden]
+
+    if direccion == ADELANTE:
+        siguiente_existe, anterior_existe = hay_mas, valores is not None
+    else:
+        siguiente_existe, anterior_existe = True, hay_mas
+
+    siguiente = codificar_cursor(orden, frontera(filas[-1]), ADELANTE) if filas and siguiente_existe else None
+    anterior = codificar_cursor(orden, frontera(filas[0]), ATRAS) if filas and anterior_existe else None
+    return PaginaCursor(filas, siguiente, anterior, total)
@@ -0,0 +1,39 @@
+"""
+Serialización JSON rápida para respuestas grandes.
+Usa orjson si está instalado (varias veces más rápido que json) y recurre a
+la librería estándar en caso contrario.
+"""
+from itertools import islice
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson es opcional
+    orjson = None
+    import json
+
+
+def dumps(datos):
+    """Serializa a bytes UTF-8"""
+    if orjson is not None:
+        return orjson.dumps(datos)
+    return json.dumps(datos, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def serializar_filas_json(campos, filas, tamano_bloque=1000):
+    """
+    Generador que produce un array JSON de objetos {campo: valor} a partir de
+    tuplas (values_list), por bloques de `tamano_bloque` filas, para usarlo
+    con StreamingHttpResponse sin armar toda la respuesta en memoria.
+    """
+    filas = iter(filas)
+    yield b'['
+    primero = True
+    while True:
+        bloque = [dict(zip(campos, fila)) for fila in islice(filas, tamano_bloque)]
+        if not bloque:
+            break
+        # Se quitan los corchetes del array de cada bloque
+        contenido = dumps(bloque)[1:-1]
+        yield contenido if primero else b',' + contenido
+        primero = False
+    yield b']'
@@ -0,0 +1,176 @@
+"""
+Índice de búsqueda unificado de la tienda (tabla api_busqueda).
+Reúne los productos locales (productos.Producto) y los de la API
+(ProductoAPI) en una sola tabla con tsvector, de modo que una búsqueda es
+una consulta local ordenada por relevancia y paginada por cursor, sin
+llamar a la API externa.
+
+Se mantiene al día con:
+- Las señales post_save / post_delete de ambos modelos.
+- La señal productos_sincronizados que emite la sincronización masiva.
+- Las operaciones por lotes de la API REST de productos.
+`reconstruir_indice_busqueda` lo recalcula desde cero.
+"""
+from django.db import connection, transaction
+
+from applications.productos.models import Producto
+from ..models import DocumentoBusqueda, ProductoAPI
+from ..paginacion import paginar_por_cursor
+
+# Campos de ProductoAPI que se copian al índice: guardados parciales sin ellos no lo tocan
+CAMPOS_INDICE_API = ('titulo', 'descripcion', 'categoria', 'marca', 'activo')
+# api_id incluido: al vincular un producto local con uno de la API sale del índice
+CAMPOS_INDICE_LOCAL = ('nombre', 'descripcion', 'api_id')
+
+ORDEN_RELEVANCIA = ['-relevancia', '-similitud', '-id']
+ORDEN_SIN_RELEVANCIA = ['-id']
+
+
+def _documentos_api(ids):
+    for id_, titulo, categoria, marca, descripcion, activo in ProductoAPI.objects.filter(
+        id__in=ids
+    ).values_list('id', 'titulo', 'categoria', 'marca', 'descripcion', 'activo'):
+        yield DocumentoBusqueda(
+            origen=DocumentoBusqueda.ORIGEN_API, objeto_id=id_, titulo=titulo,
+            etiquetas=f'{categoria} {marca}'.strip(), descripcion=descripcion, activo=activo,
+        )
+
+
+def _productos_locales():
+    """
+    Productos propios de la tienda. Los que tienen api_id son copias que crea
+    el carrito de productos de la API, ya indexados con origen "api".
+    """
+    return Producto.objects.filter(api_id__isnull=True)
+
+
+def _documentos_locales(ids):
+    for id_, nombre, descripcion in _productos_locales().filter(id__in=ids).values_list(
+        'id', 'nombre', 'descripcion'
+    ):
+        yield DocumentoBusqueda(
+            origen=DocumentoBusqueda.ORIGEN_LOCAL, objeto_id=id_, titulo=nombre, descripcion=descripcion or '',
+        )
+
+
+def _indexar_locales(ids):
+    espejos = Producto.objects.filter(id__in=ids, api_id__isnull=False).values('id')
+    DocumentoBusqueda.objects.filter(origen=DocumentoBusqueda.ORIGEN_LOCAL, objeto_id__in=espejos).delete()
+    _guardar(_documentos_locales(ids))
+
+
+def _guardar(documentos, batch_size=1000):
+    """INSERT ... ON CONFLICT (origen, objeto_id) DO UPDATE; el trigger recalcula el tsvector"""
+    documentos = list(documentos)
+    if documentos:
+        DocumentoBusqueda.objects.bulk_create(
+            documentos,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=['origen', 'objeto_id'],
+            update_fields=['titulo', 'etiquetas', 'descripcion', 'activo', 'actualizado_en'],
+        )
+    return len(documentos)
+
+
+def _resultado_api(producto):
+    return {
+        'origen': DocumentoBusqueda.ORIGEN_API,
+        'id': producto.api_id,
+        'titulo': producto.titulo,
+        'descripcion': producto.descripcion,
+        'precio_cop': producto.precio_cop,
+        'precio_usd': producto.precio_usd,
+        'imagen_url': producto.imagen_url,
+    }
+
+
+def _resultado_local(producto):
+    return {
+        'origen': DocumentoBusqueda.ORIGEN_LOCAL,
+        'id': producto.id,
+        'titulo': producto.nombre,
+        'descripcion': producto.descripcion,
+        'precio_cop': producto.precio,
+        'precio_usd': None,
+        'imagen_url': producto.imagen_mostrar,
+    }
+
+
+class BusquedaService:
+    """Mantenimiento y consulta del índice de búsqueda unificado"""
+
+    @staticmethod
+    def indexar_productos_api(ids):
+        """Indexa (o reindexa) los ProductoAPI con esos ids al confirmar la transacción"""
+        ids = list(ids)
+        if ids:
+            transaction.on_commit(lambda: _guardar(_documentos_api(ids)))
+
+    @staticmethod
+    def indexar_productos_locales(ids):
+        """
+        Indexa (o reindexa) los Producto con esos ids al confirmar la
+        transacción; los que tienen api_id se quitan del índice.
+        """
+        ids = list(ids)
+        if ids:
+            transaction.on_commit(lambda: _indexar_locales(ids))
+
+    @staticmethod
+    def eliminar(origen, ids):
+        """Quita del índice esos productos al confirmar la transacción (un rollback los conserva)"""
+        ids = list(ids)
+        if ids:
+            transaction.on_commit(
+                lambda: DocumentoBusqueda.objects.filter(origen=origen, objeto_id__in=ids).delete()
+            )
+
+    @staticmethod
+    def reconstruir(batch_size=1000):
+        """Rehace el índice con todos los productos. Devuelve cuántos documentos quedan."""
+        with transaction.atomic():
+            DocumentoBusqueda.objects.all().delete()
+            total = 0
+            for productos, documentos in (
+                (ProductoAPI.objects.all(), _documentos_api),
+                (_productos_locales(), _documentos_locales),
+            ):
+                ids = list(productos.values_list('id', flat=True))
+                for inicio in range(0, len(ids), batch_size):
+                    total += _guardar(documentos(ids[inicio:inicio + batch_size]), batch_size)
+        return total
+
+    @staticmethod
+    def buscar(texto, cursor=None, tamano=24):
+        """
+        PaginaCursor con los productos (locales y de la API) que coinciden
+        con `texto`, por relevancia. Cada resultado es un diccionario
+        {"origen", "id", "titulo", "descripcion", "precio_cop", "precio_usd",
+        "imagen_url"}; "id" es el api_id para los de la API. Los datos se
+        leen de las tablas de origen: dos consultas por página como máximo.
+        """
+        documentos = DocumentoBusqueda.objects.filter(activo=True).buscar(texto).only(
+            'id', 'origen', 'objeto_id'
+        )
+        orden = ORDEN_RELEVANCIA if connection.vendor == 'postgresql' else ORDEN_SIN_RELEVANCIA
+        pagina = paginar_por_cursor(documentos, orden, cursor=cursor, tamano=tamano)
+
+        ids = {DocumentoBusqueda.ORIGEN_API: [], DocumentoBusqueda.ORIGEN_LOCAL: []}
+        for documento in pagina:
+            ids[documento.origen].append(documento.objeto_id)
+        productos = {
+            DocumentoBusqueda.ORIGEN_API: ProductoAPI.objects.in_bulk(ids[DocumentoBusqueda.ORIGEN_API])
+            if ids[DocumentoBusqueda.ORIGEN_API] else {},
+            DocumentoBusqueda.ORIGEN_LOCAL: Producto.objects.in_bulk(ids[DocumentoBusqueda.ORIGEN_LOCAL])
+            if ids[DocumentoBusqueda.ORIGEN_LOCAL] else {},
+        }
+        convertir = {DocumentoBusqueda.ORIGEN_API: _resultado_api, DocumentoBusqueda.ORIGEN_LOCAL: _resultado_local}
+
+        # Mismo orden que el índice; se omiten filas de origen borradas entre consultas
+        pagina.object_list = [
+            convertir[documento.origen](productos[documento.origen][documento.objeto_id])
+            for documento in pagina
+            if documento.objeto_id in productos[documento.origen]
+        ]
+        return pagina
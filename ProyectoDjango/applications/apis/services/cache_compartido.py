@@ -0,0 +1,221 @@
+"""
+Caché compartida entre procesos para datos que cambian poco (tasas, catálogos).
+Se apoya en el backend configurado en settings.CACHES, de modo que todos los
+workers leen la misma entrada.
+
+Estrategia:
+- Fresco (edad < ttl): se devuelve el valor guardado.
+- Obsoleto (ttl <= edad < ttl + ttl_obsoleto): se devuelve el valor guardado
+  y se refresca en segundo plano (stale-while-revalidate).
+- Ausente o vencido: una sola carga por clave (single-flight entre hilos y
+  procesos); el resto espera el resultado. El lock entre procesos usa
+  cache.add(), que es atómico en Redis, Memcached y la caché en BD; con
+  FileBasedCache (donde add() no lo es) se usa un archivo de lock creado
+  con O_CREAT | O_EXCL junto a la caché. Con bloquear=False no se espera:
+  se lanza la carga en segundo plano y se devuelve lo que haya.
+- Si la carga falla, se sirve el último valor conocido.
+- `al_refrescar(valor)` se ejecuta tras un refresco en segundo plano con
+  éxito, para tareas derivadas que no deben correr dentro de una petición.
+"""
+import hashlib
+import os
+import threading
+import time
+
+from django.core.cache import caches
+from django.core.cache.backends.filebased import FileBasedCache
+from django.db import connections
+
+# Locks por clave para colapsar las cargas concurrentes dentro del proceso
+_locks_locales = {}
+_lock_registro = threading.Lock()
+
+
+def _lock_local(clave):
+    with _lock_registro:
+        if clave not in _locks_locales:
+            _locks_locales[clave] = threading.Lock()
+        return _locks_locales[clave]
+
+
+def _ruta_lock(cache, clave_lock):
+    return os.path.join(cache._dir, hashlib.md5(clave_lock.encode('utf-8')).hexdigest() + '.lock')
+
+
+def _adquirir_lock(cache, clave_lock, timeout):
+    """True si este proceso obtuvo el lock `clave_lock` (vence a los `timeout` segundos)"""
+    if not isinstance(cache, FileBasedCache):
+        return cache.add(clave_lock, os.getpid(), timeout=timeout)
+
+    ruta = _ruta_lock(cache, clave_lock)
+    os.makedirs(cache._dir, exist_ok=True)
+    for _ in range(2):
+        try:
+            descriptor = os.open(ruta, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                vencido = time.time() - os.path.getmtime(ruta) > timeout
+            except FileNotFoundError:
+                continue
+            if not vencido:
+                return False
+            # Lock de un proceso que murió sin liberarlo
+            try:
+                os.remove(ruta)
+            except FileNotFoundError:
+                pass
+            continue
+        with os.fdopen(descriptor, 'w') as archivo:
+            archivo.write(str(os.getpid()))
+        return True
+    return False
+
+
+def _liberar_lock(cache, clave_lock):
+    if not isinstance(cache, FileBasedCache):
+        cache.delete(clave_lock)
+        return
+    try:
+        os.remove(_ruta_lock(cache, clave_lock))
+    except FileNotFoundError:
+        pass
+
+
+def _lock_tomado(cache, clave_lock):
+    if not isinstance(cache, FileBasedCache):
+        return cache.get(clave_lock) is not None
+    return os.path.exists(_ruta_lock(cache, clave_lock))
+
+
+def _edad(entrada):
+    return time.time() - entrada['guardado_en']
+
+
+def _cargar_y_guardar(cache, clave, cargar, reintento_tras_fallo):
+    """Ejecuta la carga y guarda el resultado sin expiración en el backend"""
+    try:
+        valor = cargar()
+    except Exception as e:
+        print(f"Error al cargar '{clave}': {e}")
+        valor = None
+
+    if valor is None:
+        # Evita reintentar contra un servicio caído en cada petición
+        cache.set(f'{clave}:fallo', True, timeout=reintento_tras_fallo)
+        return None
+
+    cache.set(clave, {'valor': valor, 'guardado_en': time.time()}, timeout=None)
+    cache.delete(f'{clave}:fallo')
+    return valor
+
+
+def _refrescar_en_segundo_plano(cache, clave, cargar, reintento_tras_fallo, timeout_lock, al_refrescar=None):
+    """Lanza un refresco en un hilo si ningún otro proceso lo está haciendo ya"""
+    clave_lock = f'{clave}:lock'
+    if cache.get(f'{clave}:fallo') or not _adquirir_lock(cache, clave_lock, timeout_lock):
+        return
+
+    def refrescar():
+        try:
+            valor = _cargar_y_guardar(cache, clave, cargar, reintento_tras_fallo)
+            if valor is not None and al_refrescar is not None:
+                al_refrescar(valor)
+        except Exception as e:
+            print(f"Error al refrescar '{clave}': {e}")
+        finally:
+            _liberar_lock(cache, clave_lock)
+            # El hilo puede haber abierto conexiones a la BD que nadie más cerrará
+            connections.close_all()
+
+    threading.Thread(target=refrescar, name=f'refresco-{clave}', daemon=True).start()
+
+
+def obtener_con_cache(clave, cargar, ttl, ttl_obsoleto=0, alias='default', bloquear=True,
+                      espera_max=5.0, reintento_tras_fallo=30, timeout_lock=30, al_refrescar=None):
+    """
+    Devuelve el valor asociado a `clave`, llamando a `cargar()` solo cuando
+    hace falta. `cargar` debe devolver None si no pudo obtener el dato.
+    """
+    cache = caches[alias]
+    entrada = cache.get(clave)
+
+    if not bloquear:
+        if entrada is None or _edad(entrada) >= ttl:
+            _refrescar_en_segundo_plano(
+                cache, clave, cargar, reintento_tras_fallo, timeout_lock, al_refrescar
+            )
+        return entrada['valor'] if entrada else None
+
+    if entrada is not None:
+        edad = _edad(entrada)
+        if edad < ttl:
+            return entrada['valor']
+        if edad < ttl + ttl_obsoleto:
+            _refrescar_en_segundo_plano(
+                cache, clave, cargar, reintento_tras_fallo, timeout_lock, al_refrescar
+            )
+            return entrada['valor']
+
+    # Tras un fallo reciente se sirve el último valor conocido sin esperar
+    if cache.get(f'{clave}:fallo'):
+        return entrada['valor'] if entrada else None
+
+    with _lock_local(clave):
+        # Otro hilo pudo haber cargado el valor mientras esperábamos
+        actual = cache.get(clave)
+        if actual is not None and _edad(actual) < ttl:
+            return actual['valor']
+
+        clave_lock = f'{clave}:lock'
+        if _adquirir_lock(cache, clave_lock, timeout_lock):
+            try:
+                valor = _cargar_y_guardar(cache, clave, cargar, reintento_tras_fallo)
+            finally:
+                _liberar_lock(cache, clave_lock)
+            if valor is not None:
+                return valor
+            return actual['valor'] if actual else None
+
+        # Otro proceso está cargando: esperar a que publique el resultado
+        guardado_antes = actual['guardado_en'] if actual else 0
+        limite = time.monotonic() + espera_max
+        while time.monotonic() < limite:
+            time.sleep(0.05)
+            nueva = cache.get(clave)
+            if nueva is not None and nueva['guardado_en'] > guardado_antes:
+                return nueva['valor']
+            if not _lock_tomado(cache, clave_lock):
+                break
+
+        return actual['valor'] if actual else None
+
+
+def refrescar(clave, cargar, alias='default', reintento_tras_fallo=30):
+    """
+    Fuerza la carga de `clave` ahora mismo. Si falla, conserva el valor
+    anterior y devuelve None.
+    """
+    cache = caches[alias]
+    with _lock_local(clave):
+        return _cargar_y_guardar(cache, clave, cargar, reintento_tras_fallo)
+
+
+def actualizar(clave, modificar, alias='default'):
+    """
+    Aplica `modificar(valor)` al valor guardado sin cambiar su antigüedad,
+    para mantener al día contadores sin recalcularlos. No hace nada si la
+    entrada no existe. La lectura-escritura no es atómica entre procesos:
+    usar solo para datos que igualmente se recalculan al vencer el ttl.
+    """
+    cache = caches[alias]
+    entrada = cache.get(clave)
+    if entrada is None:
+        return
+    entrada['valor'] = modificar(entrada['valor'])
+    cache.set(clave, entrada, timeout=None)
+
+
+def invalidar(clave, alias='default'):
+    """Elimina una entrada para forzar su recarga en la siguiente lectura"""
+    cache = caches[alias]
+    cache.delete_many([clave, f'{clave}:fallo'])
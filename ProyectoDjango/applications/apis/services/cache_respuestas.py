@@ -0,0 +1,156 @@
+"""
+Caché de respuestas de las APIs REST de productos.
+La clave combina la versión del catálogo (VersionCatalogo) con el esquema y
+el host (las respuestas llevan URLs absolutas de paginación), la ruta, los
+parámetros normalizados, Accept y el usuario. Cualquier escritura en el
+catálogo cambia la versión: las entradas anteriores dejan de leerse y
+vencen solas por TTL, sin borrados explícitos.
+
+El backend es el alias de settings.CACHES indicado en
+API_CACHE_RESPUESTAS_ALIAS (memoria local, archivos, base de datos, Redis...).
+Solo se guardan respuestas 200 que no sean HTML ni fijen cookies; las
+métricas (aciertos, fallos, omitidas) son por proceso, como las de telemetría.
+"""
+import threading
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+
+from .version_catalogo import VersionCatalogo
+
+# Cabeceras de la respuesta original que se guardan con el contenido
+CABECERAS_GUARDADAS = ('X-Next-Cursor', 'Link')
+
+
+class MetricasCacheRespuestas:
+    """Contadores por catálogo de la caché de respuestas (por proceso)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._contadores = {}
+
+    def sumar(self, catalogo, resultado):
+        with self._lock:
+            contadores = self._contadores.setdefault(catalogo, {'aciertos': 0, 'fallos': 0, 'omitidas': 0})
+            contadores[resultado] += 1
+
+    def estadisticas(self):
+        with self._lock:
+            resultado = {}
+            for catalogo, contadores in self._contadores.items():
+                consultas = contadores['aciertos'] + contadores['fallos']
+                resultado[catalogo] = {
+                    **contadores,
+                    'tasa_aciertos': round(contadores['aciertos'] / consultas, 3) if consultas else None,
+                }
+            return resultado
+
+
+metricas = MetricasCacheRespuestas()
+
+
+def _cache():
+    return caches[getattr(settings, 'API_CACHE_RESPUESTAS_ALIAS', 'default')]
+
+
+def clave_respuesta(catalogo, request):
+    """Clave de la respuesta a `request` en la versión actual del catálogo"""
+    return 'respuestas:' + VersionCatalogo.etag(
+        catalogo,
+        request.scheme,
+        request.get_host(),
+        request.path,
+        sorted(request.GET.lists()),
+        request.META.get('HTTP_ACCEPT', ''),
+        request.user.pk,
+    )
+
+
+def _se_puede_guardar(response):
+    return (
+        response.status_code == 200
+        and not response.cookies
+        and 'text/html' not in response.get('Content-Type', '')
+        and 'no-store' not in response.get('Cache-Control', '')
+    )
+
+
+def _entrada(response, contenido):
+    return {
+        'contenido': contenido,
+        'content_type': response.get('Content-Type'),
+        'cabeceras': {c: response[c] for c in CABECERAS_GUARDADAS if response.has_header(c)},
+    }
+
+
+def _respuesta_guardada(entrada):
+    response = HttpResponse(entrada['contenido'], content_type=entrada['content_type'])
+    for cabecera, valor in entrada['cabeceras'].items():
+        response[cabecera] = valor
+    return response
+
+
+def _transmitir_y_guardar(response, contenido, cache, clave, ttl, maximo):
+    """Deja pasar los bloques de una respuesta en streaming y la guarda al terminar"""
+    bloques, tamano = [], 0
+    for bloque in contenido:
+        if bloques is not None:
+            tamano += len(bloque)
+            if tamano > maximo:
+                bloques = None
+            else:
+                bloques.append(bloque)
+        yield bloque
+    if bloques is not None:
+        cache.set(clave, _entrada(response, b''.join(bloques)), ttl)
+
+
+def _guardar(response, catalogo, cache, clave, ttl):
+    maximo = getattr(settings, 'API_CACHE_RESPUESTAS_MAX_BYTES', 512 * 1024)
+
+    def guardar_renderizada(renderizada):
+        if _se_puede_guardar(renderizada) and len(renderizada.content) <= maximo:
+            cache.set(clave, _entrada(renderizada, renderizada.content), ttl)
+        else:
+            metricas.sumar(catalogo, 'omitidas')
+
+    if getattr(response, 'is_rendered', True) is False:
+        # Respuestas de DRF / plantillas: el contenido y su tipo existen tras renderizar
+        response.add_post_render_callback(guardar_renderizada)
+    elif not _se_puede_guardar(response):
+        metricas.sumar(catalogo, 'omitidas')
+    elif response.streaming:
+        response.streaming_content = _transmitir_y_guardar(
+            response, response.streaming_content, cache, clave, ttl, maximo
+        )
+    else:
+        guardar_renderizada(response)
+    return response
+
+
+def cachear_respuesta(catalogo):
+    """
+    Decorador de vistas GET que sirve desde la caché la respuesta ya
+    generada para la versión actual de `catalogo`. Va debajo de @condition
+    para que los 304 no lleguen a consultar la caché.
+    """
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(request, *args, **kwargs):
+            ttl = getattr(settings, 'API_CACHE_RESPUESTAS_TTL', 300)
+            if request.method not in ('GET', 'HEAD') or not ttl:
+                return vista(request, *args, **kwargs)
+
+            cache = _cache()
+            clave = clave_respuesta(catalogo, request)
+            entrada = cache.get(clave)
+            if entrada is not None:
+                metricas.sumar(catalogo, 'aciertos')
+                return _respuesta_guardada(entrada)
+
+            metricas.sumar(catalogo, 'fallos')
+            return _guardar(vista(request, *args, **kwargs), catalogo, cache, clave, ttl)
+        return envoltura
+    return decorador
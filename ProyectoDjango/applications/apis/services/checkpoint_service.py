@@ -0,0 +1,48 @@
+"""
+Puntos de control para recorridos largos del catálogo.
+Guardan el avance en un archivo JSON para poder reanudar un recorrido
+interrumpido desde la última página procesada.
+"""
+import json
+import os
+from datetime import datetime
+
+from django.conf import settings
+
+
+class CheckpointCrawler:
+    """Avance persistente de un recorrido identificado por `nombre`"""
+
+    def __init__(self, nombre, directorio=None):
+        directorio = directorio or getattr(
+            settings, 'CRAWLER_CHECKPOINT_DIR', os.path.join(settings.BASE_DIR, '.cache', 'crawler')
+        )
+        os.makedirs(directorio, exist_ok=True)
+        self.ruta = os.path.join(directorio, f'{nombre}.json')
+
+    def leer(self):
+        """Devuelve el último avance guardado o None si no hay recorrido pendiente"""
+        try:
+            with open(self.ruta, encoding='utf-8') as archivo:
+                return json.load(archivo)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def guardar(self, skip, total, **extra):
+        """Guarda el avance de forma atómica (escritura a temporal + rename)"""
+        temporal = f'{self.ruta}.tmp'
+        with open(temporal, 'w', encoding='utf-8') as archivo:
+            json.dump({
+                'skip': skip,
+                'total': total,
+                'actualizado_en': datetime.now().isoformat(),
+                **extra,
+            }, archivo)
+        os.replace(temporal, self.ruta)
+
+    def borrar(self):
+        """Elimina el punto de control al terminar el recorrido"""
+        try:
+            os.remove(self.ruta)
+        except FileNotFoundError:
+            pass
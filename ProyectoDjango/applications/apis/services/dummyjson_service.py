@@ -2,11 +2,18 @@
 Servicio para consumir API de DummyJSON (productos).
 API 1: Obtiene datos de productos de prueba.
 """
+import time
 import requests
 from datetime import datetime
+from django.conf import settings
 from ..db.mongodb import mongo_db
+from . import http_client
+from .telemetria_service import telemetria
 
-API_URL = "https://dummyjson.com/products"
+API_URL = getattr(settings, 'DUMMYJSON_API_URL', "https://dummyjson.com/products")
+
+# Campos que necesita la sincronización (el id siempre se incluye)
+CAMPOS_SINCRONIZACION = 'title,description,price,category,brand,stock,rating,thumbnail'
 
 # Categorías relacionadas con calzado/zapatos
 CATEGORIAS_ZAPATOS = ['shoes', 'mens-shoes', 'womens-shoes', 'sports-shoes', 'footwear']
@@ -31,31 +38,38 @@ class DummyJSONService:
                 'mens-shoes',    # Zapatos de hombre
             ]
             
-            # Obtener productos de cada categoría
-            for categoria in categorias_zapatos:
+            # Obtener las categorías en paralelo con conexiones persistentes
+            respuestas = http_client.get_concurrente(
+                [f"{API_URL}/category/{categoria}" for categoria in categorias_zapatos]
+            )
+            # Cada categoría se procesa por separado: un error en una no descarta las demás
+            for categoria, response in zip(categorias_zapatos, respuestas):
                 try:
-                    response = requests.get(f"{API_URL}/category/{categoria}", timeout=10)
-                    if response.status_code == 200:
-                        data = response.json()
-                        productos_categoria = data.get('products', [])
+                    if isinstance(response, Exception):
+                        raise response
+                    if response.status_code != 200:
+                        continue
+                    data = response.json()
+                    productos_categoria = data.get('products', [])
+                    
+                    # Filtrar para asegurar que son zapatos
+                    for prod in productos_categoria:
+                        titulo = prod.get('title', '').lower()
+                        # Excluir productos que claramente no son zapatos
+                        palabras_excluir = ['ball', 'bat', 'helmet', 'glove', 'wicket', 
+                                          'shuttlecock', 'racket', 'rim', 'football', 
+                                          'basketball', 'baseball', 'volleyball', 'tennis ball',
+                                          'cricket', 'golf ball', 'iron golf']
                         
-                        # Filtrar para asegurar que son zapatos
-                        for prod in productos_categoria:
-                            titulo = prod.get('title', '').lower()
-                            # Excluir productos que claramente no son zapatos
-                            palabras_excluir = ['ball', 'bat', 'helmet', 'glove', 'wicket', 
-                                              'shuttlecock', 'racket', 'rim', 'football', 
-                                              'basketball', 'baseball', 'volleyball', 'tennis ball',
-                                              'cricket', 'golf ball', 'iron golf']
-                            
-                            if not any(palabra in titulo for palabra in palabras_excluir):
-                                productos.append(prod)
-                except:
+                        if not any(palabra in titulo for palabra in palabras_excluir):
+                            productos.append(prod)
+                except Exception as e:
+                    print(f"Error al obtener la categoría {categoria}: {e}")
                     continue
             
             # Si no se obtuvieron productos de categorías, buscar por palabra clave
             if not productos:
-                response = requests.get(f"{API_URL}/search?q=shoes", timeout=10)
+                response = http_client.get(f"{API_URL}/search", params={"q": "shoes"})
                 response.raise_for_status()
                 data = response.json()
                 productos = data.get('products', [])
@@ -88,7 +102,7 @@ class DummyJSONService:
     def obtener_producto_por_id(producto_id):
         """Obtiene un producto específico por ID"""
         try:
-            response = requests.get(f"{API_URL}/{producto_id}", timeout=10)
+            response = http_client.get(f"{API_URL}/{producto_id}")
             response.raise_for_status()
             producto = response.json()
             
@@ -120,7 +134,7 @@ class DummyJSONService:
             if 'shoe' not in query.lower() and 'zapato' not in query.lower():
                 search_query = f"{query} shoes"
             
-            response = requests.get(f"{API_URL}/search?q={search_query}", timeout=10)
+            response = http_client.get(f"{API_URL}/search", params={"q": search_query})
             response.raise_for_status()
             data = response.json()
             productos = data.get("products", [])
@@ -144,21 +158,61 @@ class DummyJSONService:
             })
             return []
     
+    @staticmethod
+    def recorrer_paginas(categoria=None, tamano_pagina=100, skip=0, base_url=None, reintentos=3):
+        """
+        Recorre el catálogo completo paginando con limit/skip.
+        Genera tuplas (productos_de_la_pagina, skip_siguiente, total) de una en
+        una, de modo que la memoria no crece con el tamaño del catálogo.
+        Reintenta cada página con espera exponencial antes de propagar el error.
+        """
+        base_url = (base_url or API_URL).rstrip('/')
+        url = f"{base_url}/category/{categoria}" if categoria else base_url
+        
+        while True:
+            params = {"limit": tamano_pagina, "skip": skip, "select": CAMPOS_SINCRONIZACION}
+            for intento in range(reintentos):
+                try:
+                    response = http_client.get(url, params=params)
+                    response.raise_for_status()
+                    data = response.json()
+                    break
+                except requests.RequestException:
+                    if intento == reintentos - 1:
+                        raise
+                    time.sleep(2 ** intento)
+            
+            productos = data.get('products', [])
+            total = data.get('total', 0)
+            if not productos:
+                return
+            
+            skip += len(productos)
+            yield productos, skip, total
+            
+            if skip >= total:
+                return
+    
+    @staticmethod
+    def recorrer_catalogo(categoria=None, tamano_pagina=100, skip=0, base_url=None):
+        """Generador de productos del catálogo completo, página a página"""
+        for productos, _, _ in DummyJSONService.recorrer_paginas(
+            categoria=categoria, tamano_pagina=tamano_pagina, skip=skip, base_url=base_url
+        ):
+            yield from productos
+    
     @staticmethod
     def _guardar_historial(datos):
         """Guarda el historial de consultas en MongoDB"""
-        try:
-            collection = mongo_db.get_collection('historial_dummyjson')
-            collection.insert_one(datos)
-        except Exception as e:
-            print(f"Error al guardar en MongoDB: {e}")
+        telemetria.registrar_historial('historial_dummyjson', datos)
     
     @staticmethod
     def obtener_historial(limit=50):
         """Obtiene el historial de consultas desde MongoDB"""
         try:
             collection = mongo_db.get_collection('historial_dummyjson')
-            historial = list(collection.find().sort("fecha", -1).limit(limit))
+            # Sin cargas pesadas: el listado no las muestra
+            historial = list(collection.find({}, {'datos': 0}).sort("fecha", -1).limit(limit))
             return historial
         except Exception as e:
             print(f"Error al obtener historial: {e}")
@@ -0,0 +1,91 @@
+"""
+Contadores del dashboard de APIs.
+Se calculan con una agregación por tabla y se guardan en la caché compartida,
+de modo que cada vista del dashboard solo lee una entrada de caché. Las
+señales de los modelos y las operaciones masivas invalidan la entrada; las
+consultas que escribe la telemetría se suman al contador guardado.
+
+api_consultas es un log que solo crece: cuando PostgreSQL estima que supera
+DASHBOARD_CONTEO_ESTIMADO_DESDE filas se usa la estimación del planificador
+(pg_class.reltuples) en lugar de un COUNT(*) completo.
+"""
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, Q
+
+from ..models import ProductoAPI, ConsultaAPI
+from .cache_compartido import obtener_con_cache, actualizar, invalidar
+
+CLAVE_CONTADORES = 'dashboard:contadores'
+
+
+def estimar_filas(modelo):
+    """
+    Número aproximado de filas de la tabla según las estadísticas de
+    PostgreSQL. Devuelve None en otros motores o si la tabla no se ha analizado.
+    """
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+            [modelo._meta.db_table],
+        )
+        fila = cursor.fetchone()
+    if fila is None or fila[0] < 0:
+        return None
+    return fila[0]
+
+
+def _contar_consultas():
+    """Devuelve (total, estimado) para api_consultas"""
+    umbral = getattr(settings, 'DASHBOARD_CONTEO_ESTIMADO_DESDE', 100000)
+    if umbral:
+        estimado = estimar_filas(ConsultaAPI)
+        if estimado is not None and estimado >= umbral:
+            return estimado, True
+    return ConsultaAPI.objects.count(), False
+
+
+def _calcular_contadores():
+    productos = ProductoAPI.objects.aggregate(
+        total=Count('id'),
+        activos=Count('id', filter=Q(activo=True)),
+    )
+    total_consultas, estimado = _contar_consultas()
+    return {
+        'total_productos': productos['total'],
+        'productos_activos': productos['activos'],
+        'total_consultas': total_consultas,
+        'consultas_estimadas': estimado,
+    }
+
+
+class EstadisticasService:
+    """Lectura e invalidación de los contadores del dashboard"""
+
+    @staticmethod
+    def obtener_contadores():
+        """
+        Devuelve {"total_productos", "productos_activos", "total_consultas",
+        "consultas_estimadas"} desde la caché, recalculándolos si hace falta.
+        """
+        contadores = obtener_con_cache(
+            CLAVE_CONTADORES,
+            _calcular_contadores,
+            ttl=getattr(settings, 'DASHBOARD_CONTADORES_TTL', 300),
+            ttl_obsoleto=getattr(settings, 'DASHBOARD_CONTADORES_STALE_TTL', 60),
+        )
+        return contadores or _calcular_contadores()
+
+    @staticmethod
+    def invalidar():
+        """Descarta los contadores guardados (llamar tras escrituras masivas)"""
+        invalidar(CLAVE_CONTADORES)
+
+    @staticmethod
+    def sumar_consultas(cantidad):
+        """Suma consultas recién registradas al contador guardado sin recalcularlo"""
+        def sumar(contadores):
+            return {**contadores, 'total_consultas': contadores['total_consultas'] + cantidad}
+        actualizar(CLAVE_CONTADORES, sumar)
@@ -4,21 +4,60 @@ API 2: Convierte precios de USD a COP (pesos colombianos).
 """
 import requests
 from datetime import datetime
+from django.conf import settings
+from django.core.cache import cache
 from ..db.mongodb import mongo_db
+from ..models import ProductoAPI, convertir_usd_a_cop
+from . import http_client
+from .telemetria_service import telemetria
+from .cache_compartido import obtener_con_cache, refrescar
 
 API_URL = "https://api.exchangerate-api.com/v4/latest/USD"
 
+# Clave de la tasa en la caché compartida entre procesos
+CLAVE_CACHE_TASA = 'exchangerate:usd'
+
+# Última tasa aplicada a los precios COP almacenados en api_productos
+CLAVE_TASA_APLICADA = 'exchangerate:tasa_aplicada'
+
 class ExchangeRateService:
     """Servicio para conversión de monedas"""
     
     @staticmethod
-    def obtener_tasa_cambio():
+    def obtener_tasa_cambio(forzar=False, bloquear=True):
+        """
+        Obtiene la tasa de cambio de USD a COP desde la caché compartida.
+        Solo consulta la API cuando la tasa venció (EXCHANGERATE_CACHE_TTL);
+        durante EXCHANGERATE_CACHE_STALE_TTL sirve la tasa anterior mientras
+        la refresca en segundo plano. Si la API no responde, devuelve la
+        última tasa conocida.
+        Los precios COP almacenados se recalculan solo tras un refresco en
+        segundo plano o con `manage.py actualizar_precios_cop`, nunca en la
+        petición que carga la tasa.
+        Con bloquear=False nunca espera a la API: devuelve la tasa guardada
+        (o None si aún no hay) y, si hace falta, la carga en segundo plano.
         """
-        Obtiene la tasa de cambio de USD a COP.
+        if forzar:
+            refrescar(CLAVE_CACHE_TASA, ExchangeRateService._consultar_api)
+
+        tasas = obtener_con_cache(
+            CLAVE_CACHE_TASA,
+            ExchangeRateService._consultar_api,
+            ttl=getattr(settings, 'EXCHANGERATE_CACHE_TTL', 3600),
+            ttl_obsoleto=getattr(settings, 'EXCHANGERATE_CACHE_STALE_TTL', 86400),
+            al_refrescar=lambda tasas: ExchangeRateService.aplicar_tasa_a_precios(tasas['tasa_cop']),
+            bloquear=bloquear,
+        )
+        return dict(tasas) if tasas else None
+
+    @staticmethod
+    def _consultar_api():
+        """
+        Consulta la API de tasas de cambio.
         Almacena el historial en MongoDB.
         """
         try:
-            response = requests.get(API_URL, timeout=10)
+            response = http_client.get(API_URL)
             response.raise_for_status()
             data = response.json()
             
@@ -37,7 +76,8 @@ class ExchangeRateService:
                 "tasa_cop": tasa_cop,
                 "base": data.get('base'),
                 "fecha": data.get('date'),
-                "todas_tasas": data.get('rates', {})
+                "todas_tasas": data.get('rates', {}),
+                "consultado_en": datetime.now().isoformat(),
             }
         except requests.RequestException as e:
             ExchangeRateService._guardar_historial({
@@ -48,27 +88,50 @@ class ExchangeRateService:
             })
             return None
     
+    @staticmethod
+    def aplicar_tasa_a_precios(tasa_cop, forzar=False, tamano_lote=None):
+        """
+        Recalcula los precios COP almacenados solo cuando la tasa cambió
+        respecto a la última aplicada (o siempre con forzar=True).
+        Devuelve cuántos productos se actualizaron, o None si no se hizo nada.
+        """
+        if not tasa_cop:
+            return None
+        if not forzar and (
+            not getattr(settings, 'EXCHANGERATE_ACTUALIZAR_PRECIOS', True)
+            or cache.get(CLAVE_TASA_APLICADA) == tasa_cop
+        ):
+            return None
+        if tamano_lote is None:
+            tamano_lote = getattr(settings, 'PRECIOS_COP_TAMANO_LOTE', 0)
+        actualizados = ProductoAPI.objects.recalcular_precios_cop(tasa_cop, tamano_lote=tamano_lote)
+        cache.set(CLAVE_TASA_APLICADA, tasa_cop, timeout=None)
+        return actualizados
+    
     @staticmethod
     def convertir_usd_a_cop(monto_usd):
-        """Convierte un monto de USD a COP"""
+        """
+        Convierte un monto de USD a COP con el mismo redondeo Decimal que
+        los precios guardados y el carrito (apis.models.convertir_usd_a_cop).
+        """
         try:
             tasas = ExchangeRateService.obtener_tasa_cambio()
             if tasas and tasas.get('tasa_cop'):
                 tasa_cop = tasas['tasa_cop']
-                monto_cop = float(monto_usd) * tasa_cop
+                monto_cop = convertir_usd_a_cop(monto_usd, tasa_cop)
                 
                 ExchangeRateService._guardar_historial({
                     "tipo": "conversion",
                     "fecha": datetime.now(),
                     "monto_usd": monto_usd,
-                    "monto_cop": monto_cop,
+                    "monto_cop": float(monto_cop),  # BSON no admite Decimal
                     "tasa_usada": tasa_cop,
                     "exitoso": True
                 })
                 
                 return {
                     "monto_usd": monto_usd,
-                    "monto_cop": round(monto_cop, 2),
+                    "monto_cop": monto_cop,
                     "tasa": tasa_cop
                 }
             return None
@@ -95,18 +158,15 @@ class ExchangeRateService:
     @staticmethod
     def _guardar_historial(datos):
         """Guarda el historial de conversiones en MongoDB"""
-        try:
-            collection = mongo_db.get_collection('historial_exchangerate')
-            collection.insert_one(datos)
-        except Exception as e:
-            print(f"Error al guardar en MongoDB: {e}")
+        telemetria.registrar_historial('historial_exchangerate', datos)
     
     @staticmethod
     def obtener_historial(limit=50):
         """Obtiene el historial de conversiones desde MongoDB"""
         try:
             collection = mongo_db.get_collection('historial_exchangerate')
-            historial = list(collection.find().sort("fecha", -1).limit(limit))
+            # Sin cargas pesadas: el listado no las muestra
+            historial = list(collection.find({}, {'todas_tasas': 0}).sort("fecha", -1).limit(limit))
             return historial
         except Exception as e:
             print(f"Error al obtener historial: {e}")
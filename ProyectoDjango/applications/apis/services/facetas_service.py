@@ -0,0 +1,111 @@
+"""
+Facetas materializadas (categoría y marca) de los productos de la API.
+La tabla api_facetas guarda, por valor, el total de productos y los activos.
+No se recalcula en cada petición: la sincronización y las señales de
+ProductoAPI aplican solo la diferencia (delta) de los productos que cambian,
+y la lectura se sirve desde la caché compartida.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q
+
+from ..models import FacetaProducto, ProductoAPI
+from .cache_compartido import obtener_con_cache, invalidar
+
+CLAVE_FACETAS = 'facetas:productos'
+TIPOS_FACETA = [tipo for tipo, _ in FacetaProducto.TIPO_CHOICES]
+
+
+def estado_faceta(categoria, marca, activo):
+    """Lo que cuenta un producto en las facetas: (categoria, marca, activo)"""
+    return (categoria or '', marca or '', bool(activo))
+
+
+def _sumar_estado(deltas, estado, signo):
+    categoria, marca, activo = estado
+    for tipo, valor in (('categoria', categoria), ('marca', marca)):
+        if not valor:
+            continue
+        delta = deltas.setdefault((tipo, valor), [0, 0])
+        delta[0] += signo
+        if activo:
+            delta[1] += signo
+
+
+def registrar_cambio(deltas, anterior, nuevo, cantidad=1):
+    """
+    Acumula en `deltas` el paso de `cantidad` productos del estado `anterior`
+    al `nuevo` (None = el producto no existía / deja de existir).
+    """
+    if anterior == nuevo:
+        return
+    if anterior is not None:
+        _sumar_estado(deltas, anterior, -cantidad)
+    if nuevo is not None:
+        _sumar_estado(deltas, nuevo, cantidad)
+
+
+def _cargar_facetas():
+    facetas = {tipo: [] for tipo in TIPOS_FACETA}
+    for tipo, valor, total, activos in FacetaProducto.objects.values_list(
+        'tipo', 'valor', 'total', 'activos'
+    ):
+        facetas[tipo].append({'valor': valor, 'total': total, 'activos': activos})
+    return facetas
+
+
+class FacetasService:
+    """Lectura y mantenimiento de las facetas de productos"""
+
+    @staticmethod
+    def obtener():
+        """
+        Devuelve {"categoria": [...], "marca": [...]} con elementos
+        {"valor", "total", "activos"} ordenados por valor.
+        """
+        facetas = obtener_con_cache(
+            CLAVE_FACETAS,
+            _cargar_facetas,
+            ttl=getattr(settings, 'FACETAS_CACHE_TTL', 3600),
+        )
+        return facetas or _cargar_facetas()
+
+    @staticmethod
+    def aplicar_deltas(deltas):
+        """Suma los deltas acumulados con registrar_cambio() a la tabla de facetas"""
+        cambios = {clave: delta for clave, delta in deltas.items() if delta != [0, 0]}
+        if not cambios:
+            return
+
+        with transaction.atomic():
+            FacetaProducto.objects.bulk_create(
+                [FacetaProducto(tipo=tipo, valor=valor) for tipo, valor in cambios],
+                ignore_conflicts=True,
+            )
+            for (tipo, valor), (d_total, d_activos) in cambios.items():
+                FacetaProducto.objects.filter(tipo=tipo, valor=valor).update(
+                    total=F('total') + d_total,
+                    activos=F('activos') + d_activos,
+                )
+            FacetaProducto.objects.filter(total__lte=0).delete()
+            transaction.on_commit(lambda: invalidar(CLAVE_FACETAS))
+
+    @staticmethod
+    def reconstruir():
+        """Recalcula todas las facetas desde api_productos. Devuelve cuántas hay."""
+        with transaction.atomic():
+            filas = []
+            for tipo in TIPOS_FACETA:
+                conteos = ProductoAPI.objects.exclude(**{tipo: ''}).values(tipo).annotate(
+                    total=Count('id'),
+                    activos=Count('id', filter=Q(activo=True)),
+                ).order_by()
+                filas.extend(
+                    FacetaProducto(tipo=tipo, valor=fila[tipo], total=fila['total'], activos=fila['activos'])
+                    for fila in conteos
+                )
+
+            FacetaProducto.objects.all().delete()
+            FacetaProducto.objects.bulk_create(filas)
+            transaction.on_commit(lambda: invalidar(CLAVE_FACETAS))
+        return len(filas)
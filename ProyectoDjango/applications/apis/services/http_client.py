@@ -0,0 +1,86 @@
+"""
+Cliente HTTP compartido por los servicios que consumen APIs externas.
+- Una sesión de requests por proceso con pools de conexiones persistentes,
+  para no pagar DNS + TCP + TLS en cada llamada.
+- Límite de conexiones por host y timeouts de conexión/lectura configurables.
+- Descarga concurrente de varias URLs con un pool de hilos.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+_lock = threading.Lock()
+_sesion = None
+_executor = None
+_pid = None
+
+
+def _crear_recursos():
+    """Crea la sesión y el pool de hilos del proceso actual (también tras un fork)"""
+    global _sesion, _executor, _pid
+
+    por_host = getattr(settings, 'HTTP_MAX_CONEXIONES_POR_HOST', 10)
+    adaptador = HTTPAdapter(
+        pool_connections=getattr(settings, 'HTTP_MAX_HOSTS', 10),
+        pool_maxsize=por_host,
+        pool_block=True,  # nunca abrir más de `por_host` conexiones a un mismo host
+    )
+    sesion = requests.Session()
+    sesion.mount('https://', adaptador)
+    sesion.mount('http://', adaptador)
+
+    _sesion = sesion
+    _executor = ThreadPoolExecutor(
+        max_workers=getattr(settings, 'HTTP_MAX_HILOS', 8),
+        thread_name_prefix='http-client',
+    )
+    _pid = os.getpid()
+
+
+def _recursos():
+    if _pid != os.getpid():
+        with _lock:
+            if _pid != os.getpid():
+                _crear_recursos()
+    return _sesion, _executor
+
+
+def obtener_sesion():
+    """Sesión HTTP con conexiones persistentes del proceso actual"""
+    return _recursos()[0]
+
+
+def timeout_por_defecto():
+    """Tupla (conexión, lectura) en segundos"""
+    return (
+        getattr(settings, 'HTTP_TIMEOUT_CONEXION', 3.05),
+        getattr(settings, 'HTTP_TIMEOUT_LECTURA', 10),
+    )
+
+
+def get(url, **kwargs):
+    """GET con la sesión compartida y los timeouts por defecto"""
+    kwargs.setdefault('timeout', timeout_por_defecto())
+    return obtener_sesion().get(url, **kwargs)
+
+
+def get_concurrente(urls, **kwargs):
+    """
+    Descarga varias URLs en paralelo. Devuelve una lista en el mismo orden
+    que `urls` con la respuesta de cada una o la excepción que produjo.
+    El tiempo total es el de la petición más lenta, no la suma.
+    """
+    _, executor = _recursos()
+    futuros = [executor.submit(get, url, **kwargs) for url in urls]
+
+    resultados = []
+    for futuro in futuros:
+        try:
+            resultados.append(futuro.result())
+        except Exception as e:
+            resultados.append(e)
+    return resultados
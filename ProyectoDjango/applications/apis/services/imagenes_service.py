@@ -0,0 +1,448 @@
+"""
+Caché en disco de las imágenes servidas por proxy_imagen.
+- Contenido direccionado por hash: cada imagen se guarda una sola vez como
+  objetos/<sha256[:2]>/<sha256>, y cada URL tiene un archivo de metadatos
+  (tipo, validadores del origen, vencimiento) que apunta a su objeto.
+- Respeta Cache-Control del origen (no-store, no-cache, max-age) y revalida
+  con If-None-Match / If-Modified-Since; si el origen falla se sirve la copia
+  vencida.
+- Tamaño acotado con expulsión LRU: cada acierto actualiza el mtime del
+  objeto y, al superar el límite, se borran los menos usados junto con los
+  metadatos que apuntaban a ellos.
+- En un fallo de caché la imagen se transmite al cliente a la vez que se
+  escribe en disco, sin cargarla entera en memoria.
+- Solo se aceptan URLs de los hosts permitidos (evita usar el proxy para
+  alcanzar otros servidores).
+- Variantes redimensionadas y/o recodificadas (WebP, AVIF...) con Pillow,
+  guardadas en la misma caché y asociadas al hash del original.
+"""
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from io import BytesIO
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from PIL import Image, ImageOps
+
+from . import http_client
+
+TAMANO_BLOQUE = 64 * 1024
+
+# Formatos de salida de las variantes: nombre -> (formato de Pillow, Content-Type)
+FORMATOS = {
+    'avif': ('AVIF', 'image/avif'),
+    'webp': ('WEBP', 'image/webp'),
+    'jpeg': ('JPEG', 'image/jpeg'),
+    'png': ('PNG', 'image/png'),
+}
+
+# Objetos usados hace menos de esto no se vuelven a marcar (evita un utime por acierto)
+_INTERVALO_TOQUE = 60
+
+
+def host_permitido(url):
+    """True si la URL es http(s) y apunta a uno de IMAGENES_HOSTS_PERMITIDOS"""
+    partes = urlsplit(url)
+    hosts = getattr(settings, 'IMAGENES_HOSTS_PERMITIDOS', ['cdn.dummyjson.com'])
+    return partes.scheme in ('http', 'https') and (partes.hostname or '') in hosts
+
+
+def _segundos_cache(cabeceras):
+    """
+    Segundos que el origen permite reutilizar la respuesta, o None si no
+    debe guardarse (no-store / private).
+    """
+    cache_control = cabeceras.get('Cache-Control', '').lower()
+    if 'no-store' in cache_control or 'private' in cache_control:
+        return None
+    if 'no-cache' in cache_control:
+        return 0
+    max_age = re.search(r'(?:s-maxage|max-age)\s*=\s*(\d+)', cache_control)
+    if max_age:
+        return int(max_age.group(1))
+    expira = cabeceras.get('Expires')
+    if expira:
+        try:
+            return max(0, int(parsedate_to_datetime(expira).timestamp() - time.time()))
+        except (TypeError, ValueError):
+            return 0
+    return getattr(settings, 'IMAGENES_TTL_POR_DEFECTO', 86400)
+
+
+def ajustar_ancho(ancho):
+    """Ancho permitido más cercano por encima (limita las variantes posibles)"""
+    anchos = sorted(getattr(settings, 'IMAGENES_ANCHOS', [150, 300, 600, 900, 1200]))
+    return next((permitido for permitido in anchos if permitido >= ancho), anchos[-1])
+
+
+def formato_disponible(formato):
+    """True si `formato` es una clave de FORMATOS y esta instalación de Pillow tiene su codificador"""
+    if formato not in FORMATOS:
+        return False
+    Image.init()
+    return FORMATOS[formato][0] in Image.SAVE
+
+
+def negociar_formato(accept):
+    """Primer formato de IMAGENES_FORMATOS_NEGOCIADOS que el cliente acepta y Pillow sabe escribir"""
+    for formato in getattr(settings, 'IMAGENES_FORMATOS_NEGOCIADOS', ['avif', 'webp']):
+        if FORMATOS[formato][1] in accept and formato_disponible(formato):
+            return formato
+    return None
+
+
+def _transformar(archivo, ancho, formato):
+    """Devuelve (bytes, content_type) de la imagen reducida a `ancho` y/o convertida a `formato`"""
+    calidad = getattr(settings, 'IMAGENES_CALIDAD', 80)
+    with Image.open(archivo) as imagen:
+        formato_pil, tipo = FORMATOS[formato] if formato else (imagen.format, Image.MIME.get(imagen.format))
+        imagen = ImageOps.exif_transpose(imagen)
+        if ancho and imagen.width > ancho:
+            imagen.thumbnail((ancho, imagen.height), Image.Resampling.LANCZOS)
+
+        if formato_pil == 'JPEG' and imagen.mode not in ('RGB', 'L'):
+            imagen = imagen.convert('RGB')
+        elif imagen.mode in ('P', 'CMYK'):
+            imagen = imagen.convert('RGBA' if 'transparency' in imagen.info else 'RGB')
+
+        opciones = {
+            'JPEG': {'quality': calidad, 'optimize': True, 'progressive': True},
+            'WEBP': {'quality': calidad, 'method': 4},
+            'AVIF': {'quality': calidad},
+            'PNG': {'optimize': True},
+        }.get(formato_pil, {})
+        salida = BytesIO()
+        imagen.save(salida, formato_pil, **opciones)
+    return salida.getvalue(), tipo
+
+
+class CacheImagenes:
+    """Almacén de imágenes en disco con índice por clave y expulsión LRU"""
+
+    def __init__(self, directorio=None, max_bytes=None):
+        self.directorio = directorio or getattr(
+            settings, 'IMAGENES_CACHE_DIR', os.path.join(settings.BASE_DIR, '.cache', 'imagenes')
+        )
+        self.max_bytes = max_bytes or getattr(settings, 'IMAGENES_CACHE_MAX_BYTES', 500 * 1024 * 1024)
+        self._dir_objetos = os.path.join(self.directorio, 'objetos')
+        self._dir_claves = os.path.join(self.directorio, 'claves')
+        self._dir_temporal = os.path.join(self.directorio, 'tmp')
+        for directorio_ in (self._dir_objetos, self._dir_claves, self._dir_temporal):
+            os.makedirs(directorio_, exist_ok=True)
+        self._lock = threading.Lock()
+        self._escritos_desde_recorte = self.max_bytes  # recortar tras la primera escritura
+
+    # ---------- Metadatos por clave ----------
+
+    def _ruta_clave(self, clave):
+        return os.path.join(self._dir_claves, hashlib.sha1(clave.encode('utf-8')).hexdigest() + '.json')
+
+    def leer_metadatos(self, clave):
+        try:
+            with open(self._ruta_clave(clave), encoding='utf-8') as archivo:
+                return json.load(archivo)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def guardar_metadatos(self, clave, metadatos):
+        ruta = self._ruta_clave(clave)
+        temporal = f'{ruta}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(temporal, 'w', encoding='utf-8') as archivo:
+            json.dump(metadatos, archivo)
+        os.replace(temporal, ruta)
+
+    # ---------- Objetos ----------
+
+    def ruta_objeto(self, sha256):
+        return os.path.join(self._dir_objetos, sha256[:2], sha256)
+
+    def abrir(self, metadatos):
+        """Abre el objeto de los metadatos (marcándolo como usado) o devuelve None si fue expulsado"""
+        ruta = self.ruta_objeto(metadatos['sha256'])
+        try:
+            archivo = open(ruta, 'rb')
+        except FileNotFoundError:
+            return None
+        try:
+            if time.time() - os.fstat(archivo.fileno()).st_mtime > _INTERVALO_TOQUE:
+                os.utime(ruta)
+        except OSError:
+            pass
+        return archivo
+
+    def escritor(self):
+        """Archivo temporal para escribir un objeto nuevo; se confirma con guardar_objeto()"""
+        return tempfile.NamedTemporaryFile(dir=self._dir_temporal, delete=False)
+
+    def guardar_objeto(self, ruta_temporal, sha256, tamano):
+        """Mueve el temporal a su ruta por contenido y recorta la caché si hace falta"""
+        destino = self.ruta_objeto(sha256)
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        os.replace(ruta_temporal, destino)
+
+        with self._lock:
+            self._escritos_desde_recorte += tamano
+            recortar = self._escritos_desde_recorte >= self.max_bytes // 10
+            if recortar:
+                self._escritos_desde_recorte = 0
+        if recortar:
+            self.recortar()
+
+    def recortar(self):
+        """
+        Borra los objetos menos usados hasta quedar por debajo del 90% del
+        límite, y después los metadatos que se quedaron sin objeto.
+        """
+        objetos = []
+        total = 0
+        for raiz, _, archivos in os.walk(self._dir_objetos):
+            for nombre in archivos:
+                ruta = os.path.join(raiz, nombre)
+                try:
+                    info = os.stat(ruta)
+                except FileNotFoundError:
+                    continue
+                objetos.append((info.st_mtime, info.st_size, ruta))
+                total += info.st_size
+
+        if total <= self.max_bytes:
+            return 0
+
+        objetivo = self.max_bytes * 0.9
+        borrados = 0
+        for _, tamano, ruta in sorted(objetos):
+            if total <= objetivo:
+                break
+            try:
+                os.remove(ruta)
+                total -= tamano
+                borrados += 1
+            except FileNotFoundError:
+                pass
+        self._borrar_metadatos_huerfanos()
+        return borrados
+
+    def _borrar_metadatos_huerfanos(self):
+        for entrada in os.scandir(self._dir_claves):
+            if not entrada.name.endswith('.json'):
+                continue
+            try:
+                with open(entrada.path, encoding='utf-8') as archivo:
+                    sha256 = json.load(archivo).get('sha256')
+                if not sha256 or not os.path.exists(self.ruta_objeto(sha256)):
+                    os.remove(entrada.path)
+            except (FileNotFoundError, ValueError):
+                continue
+
+
+class ResultadoImagen:
+    """
+    Imagen lista para responder: `archivo` (abierto, desde caché) o
+    `contenido` (iterador de bytes que se guarda mientras se transmite).
+    """
+
+    def __init__(self, metadatos, archivo=None, contenido=None):
+        self.metadatos = metadatos
+        self.archivo = archivo
+        self.contenido = contenido
+
+    @property
+    def etag(self):
+        return self.metadatos.get('sha256', '')[:32] or None
+
+    def cerrar(self):
+        """Libera el archivo o la descarga en curso cuando no se va a enviar el contenido"""
+        if self.archivo is not None:
+            self.archivo.close()
+        if self.contenido is not None and hasattr(self.contenido, 'close'):
+            # Cierra el generador: su finally cierra la respuesta del origen
+            self.contenido.close()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def obtener_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = CacheImagenes()
+    return _cache
+
+
+class ImagenesService:
+    """Obtiene imágenes del origen a través de la caché en disco"""
+
+    @staticmethod
+    def obtener(url):
+        """
+        Devuelve un ResultadoImagen para `url` o None si no se pudo obtener.
+        Lanza ValueError si el host no está permitido.
+        """
+        if not host_permitido(url):
+            raise ValueError(f'Host no permitido: {url}')
+
+        cache = obtener_cache()
+        metadatos = cache.leer_metadatos(url)
+
+        if metadatos is not None:
+            archivo = cache.abrir(metadatos)
+            if archivo is not None:
+                if metadatos['expira_en'] > time.time():
+                    return ResultadoImagen(metadatos, archivo=archivo)
+                # Vencida: revalidar; si el origen no cambió (o falla) se sirve la copia
+                resultado = ImagenesService._descargar(cache, url, metadatos, archivo)
+                if resultado is not None:
+                    return resultado
+                return ResultadoImagen(metadatos, archivo=archivo)
+            metadatos = None
+
+        return ImagenesService._descargar(cache, url, None, None)
+
+    @staticmethod
+    def obtener_variante(url, ancho=None, formato=None):
+        """
+        Como obtener(), pero reducida a `ancho` píxeles (ya ajustado con
+        ajustar_ancho) y/o convertida a `formato` (clave de FORMATOS). La
+        variante se genera una vez y se guarda asociada al hash del original,
+        de modo que si el original cambia se genera de nuevo.
+        """
+        original = ImagenesService.obtener(url)
+        if original is None or not (ancho or formato) or original.metadatos.get('no_store'):
+            return original
+
+        if original.archivo is None:
+            # Primera descarga: terminar de guardarla y leerla desde la caché
+            for _ in original.contenido:
+                pass
+            original = ImagenesService.obtener(url)
+            if original is None or original.archivo is None:
+                return original
+
+        cache = obtener_cache()
+        clave = f"{url}|{original.metadatos['sha256']}|w={ancho or ''}|f={formato or ''}"
+        metadatos = cache.leer_metadatos(clave)
+        if metadatos is not None:
+            archivo = cache.abrir(metadatos)
+            if archivo is not None:
+                original.archivo.close()
+                return ResultadoImagen(metadatos, archivo=archivo)
+
+        try:
+            contenido, tipo = _transformar(original.archivo, ancho, formato)
+        except (OSError, ValueError, KeyError, Image.DecompressionBombError) as e:
+            print(f"Error al transformar imagen {url}: {e}")
+            original.archivo.seek(0)
+            return original
+        original.archivo.close()
+
+        digest = hashlib.sha256(contenido).hexdigest()
+        with cache.escritor() as temporal:
+            temporal.write(contenido)
+        cache.guardar_objeto(temporal.name, digest, len(contenido))
+        metadatos = {
+            'url': url,
+            'content_type': tipo,
+            'sha256': digest,
+            'tamano': len(contenido),
+            'original': original.metadatos['sha256'],
+        }
+        cache.guardar_metadatos(clave, metadatos)
+        return ResultadoImagen(metadatos, archivo=cache.abrir(metadatos) or BytesIO(contenido))
+
+    @staticmethod
+    def _descargar(cache, url, metadatos, archivo):
+        cabeceras = {}
+        if metadatos is not None:
+            if metadatos.get('etag_origen'):
+                cabeceras['If-None-Match'] = metadatos['etag_origen']
+            if metadatos.get('last_modified_origen'):
+                cabeceras['If-Modified-Since'] = metadatos['last_modified_origen']
+
+        try:
+            respuesta = http_client.get(url, headers=cabeceras, stream=True, allow_redirects=False)
+        except requests.RequestException as e:
+            print(f"Error al descargar imagen {url}: {e}")
+            return None
+
+        segundos = _segundos_cache(respuesta.headers)
+
+        if respuesta.status_code == 304 and metadatos is not None:
+            respuesta.close()
+            metadatos['expira_en'] = time.time() + (segundos or 0)
+            cache.guardar_metadatos(url, metadatos)
+            return ResultadoImagen(metadatos, archivo=archivo)
+
+        tipo = respuesta.headers.get('Content-Type', '')
+        if respuesta.status_code != 200 or not tipo.startswith('image/'):
+            respuesta.close()
+            print(f"Respuesta inesperada al descargar imagen {url}: {respuesta.status_code} {tipo}")
+            return None
+
+        if archivo is not None:
+            archivo.close()
+
+        nuevos = {
+            'url': url,
+            'content_type': tipo,
+            'etag_origen': respuesta.headers.get('ETag'),
+            'last_modified_origen': respuesta.headers.get('Last-Modified'),
+            'expira_en': time.time() + (segundos or 0),
+        }
+        if segundos is None:
+            # El origen prohíbe guardarla: se transmite sin escribir en disco
+            return ResultadoImagen({**nuevos, 'no_store': True}, contenido=ImagenesService._transmitir(respuesta))
+        return ResultadoImagen(nuevos, contenido=ImagenesService._transmitir_y_guardar(cache, url, nuevos, respuesta))
+
+    @staticmethod
+    def _transmitir(respuesta):
+        """Entrega los bloques sin guardarlos; la conexión se libera al terminar o al cerrar el generador"""
+        try:
+            yield from respuesta.iter_content(TAMANO_BLOQUE)
+        finally:
+            respuesta.close()
+
+    @staticmethod
+    def _transmitir_y_guardar(cache, url, metadatos, respuesta):
+        """Entrega los bloques al cliente y los escribe en disco; solo confirma si llegan completos"""
+        max_bytes = getattr(settings, 'IMAGENES_MAX_BYTES_IMAGEN', 10 * 1024 * 1024)
+        temporal = cache.escritor()
+        sha256 = hashlib.sha256()
+        tamano = 0
+        completo = False
+        try:
+            for bloque in respuesta.iter_content(TAMANO_BLOQUE):
+                tamano += len(bloque)
+                if temporal is not None:
+                    if tamano > max_bytes:
+                        # Demasiado grande para la caché: se sigue transmitiendo sin guardar
+                        temporal.close()
+                        os.remove(temporal.name)
+                        temporal = None
+                    else:
+                        temporal.write(bloque)
+                        sha256.update(bloque)
+                yield bloque
+            completo = True
+        finally:
+            respuesta.close()
+            if temporal is not None:
+                temporal.close()
+                try:
+                    if completo:
+                        digest = sha256.hexdigest()
+                        cache.guardar_objeto(temporal.name, digest, tamano)
+                        cache.guardar_metadatos(url, {**metadatos, 'sha256': digest, 'tamano': tamano})
+                    else:
+                        os.remove(temporal.name)
+                except OSError as e:
+                    print(f"Error al guardar imagen en caché {url}: {e}")
@@ -0,0 +1,160 @@
+"""
+Servicio de sincronización masiva de productos de DummyJSON hacia PostgreSQL.
+Reemplaza el update_or_create fila por fila por:
+- Una sola consulta para cargar el estado actual del lote.
+- Un hash del contenido de cada producto para omitir los que no cambiaron.
+- Inserciones/actualizaciones por lotes con INSERT ... ON CONFLICT (api_id).
+- Actualización incremental de las facetas (categoría/marca) con los cambios del lote.
+- La señal productos_sincronizados con los productos escritos (índice de búsqueda).
+"""
+import hashlib
+import json
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from ..models import CENTAVOS, ProductoAPI, convertir_usd_a_cop
+from .estadisticas_service import EstadisticasService
+from .facetas_service import FacetasService, estado_faceta, registrar_cambio
+from .version_catalogo import PRODUCTOS_API, VersionCatalogo
+from ..signals import productos_sincronizados
+
+# Campos que vienen de la API y forman parte del hash de contenido
+CAMPOS_CONTENIDO = [
+    'titulo', 'descripcion', 'precio_usd', 'categoria',
+    'marca', 'stock', 'rating', 'imagen_url',
+]
+
+
+def _a_decimal(valor):
+    """Convierte un número de la API a Decimal con dos decimales"""
+    try:
+        return Decimal(str(valor or 0)).quantize(CENTAVOS, rounding=ROUND_HALF_UP)
+    except (InvalidOperation, ValueError):
+        return Decimal('0.00')
+
+
+def normalizar_producto(prod_data):
+    """Traduce un producto de DummyJSON a los campos de ProductoAPI"""
+    return {
+        'api_id': prod_data.get('id'),
+        'titulo': prod_data.get('title') or '',
+        'descripcion': prod_data.get('description') or '',
+        'precio_usd': _a_decimal(prod_data.get('price')),
+        'categoria': prod_data.get('category') or '',
+        'marca': prod_data.get('brand') or '',
+        'stock': int(prod_data.get('stock') or 0),
+        'rating': _a_decimal(prod_data.get('rating')),
+        'imagen_url': prod_data.get('thumbnail') or '',
+    }
+
+
+def calcular_hash(campos):
+    """Huella SHA-256 de los campos de contenido de un producto"""
+    contenido = {campo: str(campos[campo]) for campo in CAMPOS_CONTENIDO}
+    serializado = json.dumps(contenido, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(serializado.encode('utf-8')).hexdigest()
+
+
+class SincronizacionService:
+    """Sincroniza lotes de productos de la API con la tabla api_productos"""
+
+    @staticmethod
+    def sincronizar(productos, tasa_cop, desactivar_faltantes=False, batch_size=None):
+        """
+        Inserta o actualiza los productos recibidos en una sola transacción.
+        Con desactivar_faltantes=True marca como inactivos los productos que
+        ya no vienen en el lote (usar solo con el catálogo completo).
+        Los precios en COP se calculan con aritmética Decimal exacta.
+
+        Devuelve un resumen: {"creados", "actualizados", "sin_cambios", "desactivados"}.
+        """
+        batch_size = batch_size or getattr(settings, 'SINCRONIZACION_BATCH_SIZE', 500)
+
+        # Normalizar y eliminar duplicados del lote (gana el último)
+        entrantes = {}
+        for prod_data in productos:
+            campos = normalizar_producto(prod_data)
+            if campos['api_id'] is not None:
+                entrantes[campos['api_id']] = campos
+
+        # Estado actual de todo el lote en una sola consulta
+        existentes = {
+            api_id: (hash_contenido, activo, categoria, marca)
+            for api_id, hash_contenido, activo, categoria, marca in ProductoAPI.objects.filter(
+                api_id__in=list(entrantes)
+            ).values_list('api_id', 'hash_contenido', 'activo', 'categoria', 'marca')
+        }
+
+        resumen = {'creados': 0, 'actualizados': 0, 'sin_cambios': 0, 'desactivados': 0}
+        por_escribir = []
+        deltas_facetas = {}
+
+        for api_id, campos in entrantes.items():
+            huella = calcular_hash(campos)
+            actual = existentes.get(api_id)
+
+            if actual is None:
+                resumen['creados'] += 1
+                anterior = None
+            elif actual[:2] == (huella, True):
+                resumen['sin_cambios'] += 1
+                continue
+            else:
+                resumen['actualizados'] += 1
+                anterior = estado_faceta(actual[2], actual[3], actual[1])
+
+            registrar_cambio(
+                deltas_facetas, anterior, estado_faceta(campos['categoria'], campos['marca'], True)
+            )
+
+            por_escribir.append(ProductoAPI(
+                **campos,
+                precio_cop=convertir_usd_a_cop(campos['precio_usd'], tasa_cop),
+                hash_contenido=huella,
+                activo=True,
+            ))
+
+        with transaction.atomic():
+            if por_escribir:
+                ProductoAPI.objects.bulk_create(
+                    por_escribir,
+                    batch_size=batch_size,
+                    update_conflicts=True,
+                    unique_fields=['api_id'],
+                    update_fields=CAMPOS_CONTENIDO + [
+                        'precio_cop', 'hash_contenido', 'activo', 'actualizado_en',
+                    ],
+                )
+
+            # Un lote vacío suele ser un fallo de la API: no desactivar nada
+            desactivados_ids = []
+            if desactivar_faltantes and entrantes:
+                faltantes = ProductoAPI.objects.filter(activo=True).exclude(api_id__in=list(entrantes))
+                desactivados_ids = list(faltantes.values_list('id', flat=True))
+                for categoria, marca, cantidad in faltantes.values_list(
+                    'categoria', 'marca'
+                ).annotate(cantidad=Count('id')).order_by():
+                    registrar_cambio(
+                        deltas_facetas,
+                        estado_faceta(categoria, marca, True),
+                        estado_faceta(categoria, marca, False),
+                        cantidad,
+                    )
+                resumen['desactivados'] = faltantes.update(activo=False, actualizado_en=timezone.now())
+
+            FacetasService.aplicar_deltas(deltas_facetas)
+
+        # bulk_create y update no emiten señales
+        if resumen['creados'] or resumen['actualizados'] or resumen['desactivados']:
+            transaction.on_commit(EstadisticasService.invalidar)
+            transaction.on_commit(lambda: VersionCatalogo.incrementar(PRODUCTOS_API))
+            escritos = list(ProductoAPI.objects.filter(
+                api_id__in=[producto.api_id for producto in por_escribir]
+            ).values_list('id', flat=True))
+            productos_sincronizados.send(sender=SincronizacionService, ids=escritos + desactivados_ids)
+
+        return resumen
@@ -0,0 +1,154 @@
+"""
+Escritor asíncrono por lotes para el historial de consultas.
+Las vistas y servicios solo encolan los registros en memoria; un hilo en
+segundo plano los escribe con insert_many (MongoDB) y bulk_create
+(ConsultaAPI). Registrar nunca bloquea ni hace fallar una petición:
+- El buffer está acotado; si se llena, el registro se descarta y se cuenta.
+- Los errores de escritura se cuentan y se descarta el lote.
+- Al terminar el proceso se vacía lo pendiente.
+"""
+import atexit
+import os
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from ..db.mongodb import mongo_db
+from ..models import ConsultaAPI
+from .estadisticas_service import EstadisticasService
+
+# Tipos de registro encolados
+_MONGO = 'mongo'
+_CONSULTA = 'consulta'
+
+
+class EscritorTelemetria:
+    """Buffer acotado con un hilo que escribe por lotes"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = None
+        self._cola = None
+        self._hilo = None
+        self._detener = None
+        self.descartados = 0
+        self.escritos = 0
+        self.errores = 0
+
+    # ---------- API pública ----------
+
+    def registrar_historial(self, coleccion, documento):
+        """Encola un documento para la colección de historial indicada"""
+        self._encolar((_MONGO, coleccion, documento))
+
+    def registrar_consulta(self, **campos):
+        """Encola un registro de ConsultaAPI (se conserva la hora de la consulta)"""
+        campos.setdefault('fecha_consulta', timezone.now())
+        self._encolar((_CONSULTA, None, campos))
+
+    def flush(self, timeout=5.0):
+        """Escribe de inmediato todo lo pendiente (uso en comandos y al apagar)"""
+        if self._cola is None or self._pid != os.getpid():
+            return
+        limite = time.monotonic() + timeout
+        while not self._cola.empty() and time.monotonic() < limite:
+            self._escribir_lote(self._tomar_lote(bloquear=False))
+
+    def estadisticas(self):
+        """Contadores para monitoreo"""
+        return {
+            'pendientes': self._cola.qsize() if self._cola is not None else 0,
+            'escritos': self.escritos,
+            'descartados': self.descartados,
+            'errores': self.errores,
+        }
+
+    # ---------- Internos ----------
+
+    def _encolar(self, registro):
+        try:
+            self._asegurar_hilo()
+            self._cola.put_nowait(registro)
+        except queue.Full:
+            self.descartados += 1
+            if self.descartados == 1 or self.descartados % 1000 == 0:
+                print(f"Telemetría: buffer lleno, {self.descartados} registros descartados")
+        except Exception as e:
+            self.descartados += 1
+            print(f"Telemetría: no se pudo encolar el registro: {e}")
+
+    def _asegurar_hilo(self):
+        """Arranca el hilo escritor en el proceso actual (también tras un fork)"""
+        if self._pid == os.getpid() and self._hilo is not None and self._hilo.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._hilo is not None and self._hilo.is_alive():
+                return
+            if self._pid != os.getpid():
+                self._cola = queue.Queue(maxsize=getattr(settings, 'TELEMETRIA_MAX_PENDIENTES', 10000))
+                self._pid = os.getpid()
+            self._detener = threading.Event()
+            self._hilo = threading.Thread(target=self._ciclo, name='telemetria', daemon=True)
+            self._hilo.start()
+
+    def _ciclo(self):
+        intervalo = getattr(settings, 'TELEMETRIA_INTERVALO', 1.0)
+        while not self._detener.is_set():
+            lote = self._tomar_lote(bloquear=True, timeout=intervalo)
+            if lote:
+                self._escribir_lote(lote)
+
+    def _tomar_lote(self, bloquear, timeout=None):
+        tamano = getattr(settings, 'TELEMETRIA_TAMANO_LOTE', 500)
+        lote = []
+        try:
+            lote.append(self._cola.get(block=bloquear, timeout=timeout))
+            while len(lote) < tamano:
+                lote.append(self._cola.get_nowait())
+        except queue.Empty:
+            pass
+        return lote
+
+    def _escribir_lote(self, lote):
+        por_coleccion = {}
+        consultas = []
+        for tipo, coleccion, datos in lote:
+            if tipo == _MONGO:
+                por_coleccion.setdefault(coleccion, []).append(datos)
+            else:
+                consultas.append(datos)
+
+        for coleccion, documentos in por_coleccion.items():
+            try:
+                mongo_db.get_collection(coleccion).insert_many(documentos, ordered=False)
+                self.escritos += len(documentos)
+            except Exception as e:
+                self.errores += len(documentos)
+                print(f"Error al guardar en MongoDB: {e}")
+
+        if consultas:
+            try:
+                close_old_connections()
+                ConsultaAPI.objects.bulk_create([ConsultaAPI(**campos) for campos in consultas])
+                self.escritos += len(consultas)
+                EstadisticasService.sumar_consultas(len(consultas))
+            except Exception as e:
+                self.errores += len(consultas)
+                print(f"Error al registrar consultas: {e}")
+
+    def detener(self):
+        """Detiene el hilo y vacía lo pendiente"""
+        if self._detener is not None and self._pid == os.getpid():
+            self._detener.set()
+            if self._hilo is not None:
+                self._hilo.join(timeout=2)
+        self.flush()
+
+
+# Instancia global
+telemetria = EscritorTelemetria()
+atexit.register(telemetria.detener)
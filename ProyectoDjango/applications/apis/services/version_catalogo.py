@@ -0,0 +1,56 @@
+"""
+Versión de los catálogos para GET condicionales (ETag / Last-Modified).
+Cada catálogo tiene en la caché compartida un token que cambia con cada
+escritura (señales de los modelos y operaciones masivas), junto con la hora
+del cambio. Las vistas calculan sus validadores a partir de él sin tocar la
+base de datos ni renderizar, y responden 304 si el cliente ya tiene esa versión.
+"""
+import hashlib
+import uuid
+
+from django.core.cache import cache
+from django.utils import timezone
+
+# Catálogos versionados
+PRODUCTOS_API = 'productos_api'
+PRODUCTOS = 'productos'
+
+
+def _clave(nombre):
+    return f'catalogo:version:{nombre}'
+
+
+def _nueva_version():
+    return {'token': uuid.uuid4().hex[:16], 'modificado_en': timezone.now()}
+
+
+class VersionCatalogo:
+    """Lectura e incremento de la versión de un catálogo"""
+
+    @staticmethod
+    def obtener(nombre):
+        """Devuelve {"token", "modificado_en"} del catálogo"""
+        version = cache.get(_clave(nombre))
+        if version is None:
+            # Sin versión (caché vacía): se crea una, lo que solo invalida a los clientes una vez
+            cache.add(_clave(nombre), _nueva_version(), timeout=None)
+            version = cache.get(_clave(nombre))
+        return version
+
+    @staticmethod
+    def incrementar(nombre):
+        """Marca el catálogo como modificado ahora"""
+        cache.set(_clave(nombre), _nueva_version(), timeout=None)
+
+    @staticmethod
+    def etag(nombre, *partes):
+        """
+        ETag para una representación del catálogo: su versión más lo que
+        distinga a esta respuesta (parámetros, formato, usuario...).
+        """
+        huella = hashlib.sha1('|'.join(str(p) for p in partes).encode('utf-8')).hexdigest()[:16]
+        return f"{VersionCatalogo.obtener(nombre)['token']}-{huella}"
+
+    @staticmethod
+    def ultima_modificacion(nombre):
+        return VersionCatalogo.obtener(nombre)['modificado_en']
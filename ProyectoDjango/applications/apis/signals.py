@@ -0,0 +1,100 @@
+"""
+Señales de la aplicación de APIs.
+Invalidan los contadores del dashboard, actualizan las facetas, el índice
+de búsqueda y la versión del catálogo cuando cambian los modelos. Las
+operaciones masivas (bulk_create, update) no emiten señales: la
+sincronización y el recálculo de precios se encargan de ello por su cuenta
+(la sincronización emite productos_sincronizados).
+Las invalidaciones de caché y la versión del catálogo se aplican al
+confirmar la transacción, para que ninguna lectura concurrente asocie la
+versión nueva con las filas anteriores.
+"""
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import Signal, receiver
+
+from .models import DocumentoBusqueda, ProductoAPI, ConsultaAPI
+from .services.busqueda_service import CAMPOS_INDICE_API, BusquedaService
+from .services.estadisticas_service import EstadisticasService
+from .services.facetas_service import FacetasService, estado_faceta, registrar_cambio
+from .services.version_catalogo import PRODUCTOS_API, VersionCatalogo
+
+CAMPOS_FACETA = ('categoria', 'marca', 'activo')
+
+# Tras una sincronización masiva, con los ids (pk) de los ProductoAPI escritos en `ids`
+productos_sincronizados = Signal()
+
+
+@receiver(post_save, sender=ProductoAPI)
+@receiver(post_delete, sender=ProductoAPI)
+@receiver(post_save, sender=ConsultaAPI)
+@receiver(post_delete, sender=ConsultaAPI)
+def invalidar_contadores(sender, update_fields=None, **kwargs):
+    # Guardados parciales que no tocan `activo` (p. ej. precios) no cambian los conteos
+    if update_fields is not None and 'activo' not in update_fields:
+        return
+    transaction.on_commit(EstadisticasService.invalidar)
+
+
+def _estado_actual(instance):
+    """Estado de facetas del objeto, o None si alguno de sus campos está diferido"""
+    if any(campo not in instance.__dict__ for campo in CAMPOS_FACETA):
+        return None
+    return estado_faceta(instance.categoria, instance.marca, instance.activo)
+
+
+@receiver(post_init, sender=ProductoAPI)
+def recordar_estado_faceta(sender, instance, **kwargs):
+    # Estado con el que se cargó el objeto, para calcular el delta al guardar sin consultar
+    instance._estado_faceta = _estado_actual(instance)
+
+
+@receiver(post_save, sender=ProductoAPI)
+def actualizar_facetas_al_guardar(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and not set(update_fields) & set(CAMPOS_FACETA):
+        return
+
+    anterior = None if created else instance._estado_faceta
+    nuevo = _estado_actual(instance)
+    if nuevo is None or (anterior is None and not created):
+        # No se conoce el estado previo: recalcular todo
+        FacetasService.reconstruir()
+    else:
+        deltas = {}
+        registrar_cambio(deltas, anterior, nuevo)
+        FacetasService.aplicar_deltas(deltas)
+    instance._estado_faceta = nuevo
+
+
+@receiver(post_delete, sender=ProductoAPI)
+def actualizar_facetas_al_eliminar(sender, instance, **kwargs):
+    anterior = instance._estado_faceta or _estado_actual(instance)
+    if anterior is None:
+        FacetasService.reconstruir()
+        return
+    deltas = {}
+    registrar_cambio(deltas, anterior, None)
+    FacetasService.aplicar_deltas(deltas)
+
+
+@receiver(post_save, sender=ProductoAPI)
+@receiver(post_delete, sender=ProductoAPI)
+def incrementar_version_catalogo(sender, **kwargs):
+    transaction.on_commit(lambda: VersionCatalogo.incrementar(PRODUCTOS_API))
+
+
+@receiver(post_save, sender=ProductoAPI)
+def indexar_producto_api(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not set(update_fields) & set(CAMPOS_INDICE_API):
+        return
+    BusquedaService.indexar_productos_api([instance.pk])
+
+
+@receiver(post_delete, sender=ProductoAPI)
+def quitar_producto_api_del_indice(sender, instance, **kwargs):
+    BusquedaService.eliminar(DocumentoBusqueda.ORIGEN_API, [instance.pk])
+
+
+@receiver(productos_sincronizados)
+def indexar_productos_sincronizados(sender, ids, **kwargs):
+    BusquedaService.indexar_productos_api(ids)
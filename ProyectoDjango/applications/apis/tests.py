@@ -1,3 +1,467 @@
-from django.test import TestCase
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import caches
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import ProductoAPI
+from .paginacion import paginar_por_cursor
+from .services import cache_compartido
+from .services.exchangerate_service import CLAVE_CACHE_TASA
+from .services.imagenes_service import CacheImagenes
+from .services.sincronizacion_service import SincronizacionService
+
+CACHES_PRUEBA = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'pruebas-apis'},
+    'respuestas': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'pruebas-respuestas'},
+}
+
+
+def producto_dummyjson(api_id, **cambios):
+    """Producto con la forma de la respuesta de DummyJSON"""
+    datos = {
+        'id': api_id,
+        'title': f'Producto {api_id}',
+        'description': 'Descripción',
+        'price': 10,
+        'category': 'beauty',
+        'brand': 'Marca',
+        'stock': 5,
+        'rating': 4.5,
+        'thumbnail': f'https://cdn.dummyjson.com/{api_id}.png',
+    }
+    datos.update(cambios)
+    return datos
+
+
+def crear_productos_api(cantidad, mismo_instante=True):
+    """Crea productos activos; por defecto todos con la misma fecha para probar el desempate por id"""
+    ProductoAPI.objects.bulk_create(
+        ProductoAPI(api_id=i, titulo=f'Producto {i}', precio_usd=Decimal('10.00')) for i in range(1, cantidad + 1)
+    )
+    if mismo_instante:
+        ProductoAPI.objects.update(sincronizado_en=timezone.now())
+    return list(ProductoAPI.objects.order_by('-sincronizado_en', '-id').values_list('id', flat=True))
+
+
+def esperar_refrescos():
+    """Espera a que terminen los refrescos en segundo plano de cache_compartido"""
+    for hilo in threading.enumerate():
+        if hilo.name.startswith('refresco-'):
+            hilo.join(timeout=5)
+
+
+class Cargador:
+    """Función de carga que cuenta sus llamadas y puede tardar o fallar"""
+
+    def __init__(self, valor='nuevo', demora=0, error=None):
+        self.valor = valor
+        self.demora = demora
+        self.error = error
+        self.llamadas = 0
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            self.llamadas += 1
+        time.sleep(self.demora)
+        if self.error is not None:
+            raise self.error
+        return self.valor
+
+
+@override_settings(CACHES=CACHES_PRUEBA)
+class CacheCompartidoTests(SimpleTestCase):
+    clave = 'prueba:cache-compartido'
+
+    def setUp(self):
+        caches['default'].clear()
+
+    def guardar(self, valor, edad):
+        caches['default'].set(self.clave, {'valor': valor, 'guardado_en': time.time() - edad}, timeout=None)
+
+    def test_valor_fresco_no_recarga(self):
+        self.guardar('guardado', edad=1)
+        cargar = Cargador()
+
+        valor = cache_compartido.obtener_con_cache(self.clave, cargar, ttl=60)
+
+        self.assertEqual(valor, 'guardado')
+        self.assertEqual(cargar.llamadas, 0)
+
+    def test_valor_obsoleto_se_sirve_y_se_refresca_en_segundo_plano(self):
+        self.guardar('viejo', edad=120)
+        cargar = Cargador()
+        refrescados = []
+
+        valor = cache_compartido.obtener_con_cache(
+            self.clave, cargar, ttl=60, ttl_obsoleto=600, al_refrescar=refrescados.append
+        )
+        esperar_refrescos()
+
+        self.assertEqual(valor, 'viejo')
+        self.assertEqual(cargar.llamadas, 1)
+        self.assertEqual(refrescados, ['nuevo'])
+        self.assertEqual(cache_compartido.obtener_con_cache(self.clave, Cargador('otro'), ttl=60), 'nuevo')
+
+    def test_valor_vencido_se_carga_de_forma_sincrona(self):
+        self.guardar('viejo', edad=1000)
+        cargar = Cargador()
+
+        valor = cache_compartido.obtener_con_cache(self.clave, cargar, ttl=60, ttl_obsoleto=600)
+
+        self.assertEqual(valor, 'nuevo')
+        self.assertEqual(cargar.llamadas, 1)
+
+    def test_una_sola_carga_con_peticiones_concurrentes(self):
+        cargar = Cargador(demora=0.3)
+        resultados = []
+
+        def pedir():
+            resultados.append(cache_compartido.obtener_con_cache(self.clave, cargar, ttl=60))
+
+        hilos = [threading.Thread(target=pedir) for _ in range(8)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join(timeout=10)
+
+        self.assertEqual(cargar.llamadas, 1)
+        self.assertEqual(resultados, ['nuevo'] * 8)
+
+    def test_sin_bloquear_devuelve_lo_guardado_y_carga_en_segundo_plano(self):
+        cargar = Cargador(demora=0.1)
+
+        valor = cache_compartido.obtener_con_cache(self.clave, cargar, ttl=60, bloquear=False)
+        esperar_refrescos()
+
+        self.assertIsNone(valor)
+        self.assertEqual(cargar.llamadas, 1)
+        self.assertEqual(cache_compartido.obtener_con_cache(self.clave, cargar, ttl=60, bloquear=False), 'nuevo')
+
+    def test_fallo_sirve_el_ultimo_valor_y_no_reintenta_enseguida(self):
+        self.guardar('conocido', edad=1000)
+        cargar = Cargador(error=ConnectionError('sin red'))
+
+        primero = cache_compartido.obtener_con_cache(self.clave, cargar, ttl=60)
+        segundo = cache_compartido.obtener_con_cache(self.clave, cargar, ttl=60)
+
+        self.assertEqual((primero, segundo), ('conocido', 'conocido'))
+        self.assertEqual(cargar.llamadas, 1)
+
+    def test_invalidar_fuerza_la_recarga(self):
+        self.guardar('guardado', edad=1)
+        cache_compartido.invalidar(self.clave)
+
+        self.assertEqual(cache_compartido.obtener_con_cache(self.clave, Cargador(), ttl=60), 'nuevo')
+
+
+class LockArchivoTests(SimpleTestCase):
+    """Con FileBasedCache el lock entre procesos es un archivo creado con O_EXCL"""
+
+    def setUp(self):
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio, ignore_errors=True)
+        ajustes = override_settings(CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directorio},
+        })
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.cache = caches['default']
+
+    def test_lock_exclusivo_hasta_liberarlo(self):
+        self.assertTrue(cache_compartido._adquirir_lock(self.cache, 'clave:lock', timeout=30))
+        self.assertFalse(cache_compartido._adquirir_lock(self.cache, 'clave:lock', timeout=30))
+        self.assertTrue(cache_compartido._lock_tomado(self.cache, 'clave:lock'))
+
+        cache_compartido._liberar_lock(self.cache, 'clave:lock')
+
+        self.assertFalse(cache_compartido._lock_tomado(self.cache, 'clave:lock'))
+        self.assertTrue(cache_compartido._adquirir_lock(self.cache, 'clave:lock', timeout=30))
+
+    def test_lock_vencido_se_reemplaza(self):
+        self.assertTrue(cache_compartido._adquirir_lock(self.cache, 'clave:lock', timeout=30))
+
+        self.assertTrue(cache_compartido._adquirir_lock(self.cache, 'clave:lock', timeout=-1))
+
+
+@override_settings(CACHES=CACHES_PRUEBA)
+class SincronizacionServiceTests(TestCase):
+    tasa = 4000
+
+    def setUp(self):
+        caches['default'].clear()
+
+    def sincronizar(self, productos, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return SincronizacionService.sincronizar(productos, self.tasa, **kwargs)
+
+    def test_primera_sincronizacion_crea_los_productos(self):
+        resumen = self.sincronizar([producto_dummyjson(1), producto_dummyjson(2), producto_dummyjson(3)])
+
+        self.assertEqual(resumen, {'creados': 3, 'actualizados': 0, 'sin_cambios': 0, 'desactivados': 0})
+        producto = ProductoAPI.objects.get(api_id=1)
+        self.assertEqual(producto.precio_usd, Decimal('10.00'))
+        self.assertEqual(producto.precio_cop, Decimal('40000.00'))
+        self.assertTrue(producto.hash_contenido)
+
+    def test_solo_se_escriben_los_productos_que_cambiaron(self):
+        self.sincronizar([producto_dummyjson(1), producto_dummyjson(2), producto_dummyjson(3)])
+
+        resumen = self.sincronizar([
+            producto_dummyjson(1), producto_dummyjson(2, price=12.5), producto_dummyjson(3),
+        ])
+
+        self.assertEqual(resumen, {'creados': 0, 'actualizados': 1, 'sin_cambios': 2, 'desactivados': 0})
+        producto = ProductoAPI.objects.get(api_id=2)
+        self.assertEqual(producto.precio_usd, Decimal('12.50'))
+        self.assertEqual(producto.precio_cop, Decimal('50000.00'))
+
+    def test_repetir_el_lote_no_cambia_nada(self):
+        productos = [producto_dummyjson(1), producto_dummyjson(2)]
+        self.sincronizar(productos)
+
+        resumen = self.sincronizar(productos)
+
+        self.assertEqual(resumen, {'creados': 0, 'actualizados': 0, 'sin_cambios': 2, 'desactivados': 0})
+
+    def test_desactiva_los_que_faltan_en_el_catalogo_completo(self):
+        self.sincronizar([producto_dummyjson(1), producto_dummyjson(2), producto_dummyjson(3)])
+
+        resumen = self.sincronizar([producto_dummyjson(1), producto_dummyjson(2)], desactivar_faltantes=True)
+
+        self.assertEqual(resumen, {'creados': 0, 'actualizados': 0, 'sin_cambios': 2, 'desactivados': 1})
+        self.assertFalse(ProductoAPI.objects.get(api_id=3).activo)
+
+    def test_un_producto_desactivado_que_vuelve_se_reactiva(self):
+        self.sincronizar([producto_dummyjson(1), producto_dummyjson(2)])
+        self.sincronizar([producto_dummyjson(1)], desactivar_faltantes=True)
+
+        resumen = self.sincronizar([producto_dummyjson(1), producto_dummyjson(2)])
+
+        self.assertEqual(resumen, {'creados': 0, 'actualizados': 1, 'sin_cambios': 1, 'desactivados': 0})
+        self.assertTrue(ProductoAPI.objects.get(api_id=2).activo)
+
+    def test_un_lote_vacio_no_desactiva_nada(self):
+        self.sincronizar([producto_dummyjson(1)])
+
+        resumen = self.sincronizar([], desactivar_faltantes=True)
+
+        self.assertEqual(resumen['desactivados'], 0)
+        self.assertTrue(ProductoAPI.objects.get(api_id=1).activo)
+
+    def test_los_duplicados_del_lote_cuentan_una_vez(self):
+        resumen = self.sincronizar([producto_dummyjson(1, price=5), producto_dummyjson(1, price=7)])
+
+        self.assertEqual(resumen['creados'], 1)
+        self.assertEqual(ProductoAPI.objects.get(api_id=1).precio_usd, Decimal('7.00'))
+
+
+class PaginacionCursorTests(TestCase):
+    orden = ['-sincronizado_en', '-id']
+
+    def setUp(self):
+        self.ids = crear_productos_api(25)
+
+    def test_recorre_todas_las_paginas_sin_repetir_ni_saltar(self):
+        vistos, cursor, paginas = [], None, 0
+        while True:
+            pagina = paginar_por_cursor(ProductoAPI.objects.all(), self.orden, cursor, tamano=10)
+            vistos.extend(producto.id for producto in pagina)
+            paginas += 1
+            if not pagina.has_next():
+                break
+            cursor = pagina.siguiente
+
+        self.assertEqual(paginas, 3)
+        self.assertEqual(vistos, self.ids)
+
+    def test_el_cursor_anterior_devuelve_la_pagina_previa(self):
+        primera = paginar_por_cursor(ProductoAPI.objects.all(), self.orden, tamano=10)
+        segunda = paginar_por_cursor(ProductoAPI.objects.all(), self.orden, primera.siguiente, tamano=10)
+
+        anterior = paginar_por_cursor(ProductoAPI.objects.all(), self.orden, segunda.anterior, tamano=10)
+
+        self.assertFalse(primera.has_previous())
+        self.assertEqual([p.id for p in anterior], [p.id for p in primera])
+        self.assertFalse(anterior.has_previous())
+
+    def test_cursor_invalido_o_de_otro_orden_devuelve_la_primera_pagina(self):
+        primera = paginar_por_cursor(ProductoAPI.objects.all(), self.orden, tamano=10)
+        otro_orden = paginar_por_cursor(ProductoAPI.objects.all(), ['-id'], tamano=10).siguiente
+
+        for cursor in ('no-es-un-cursor', otro_orden):
+            pagina = paginar_por_cursor(ProductoAPI.objects.all(), self.orden, cursor, tamano=10)
+            self.assertEqual([p.id for p in pagina], [p.id for p in primera])
+
+
+@override_settings(CACHES=CACHES_PRUEBA)
+class ApiProductosJsonCursorTests(TestCase):
+
+    def setUp(self):
+        caches['default'].clear()
+        caches['respuestas'].clear()
+        self.ids = crear_productos_api(25)
+
+    def pedir(self, **parametros):
+        response = self.client.get(reverse('apis:api_productos'), parametros)
+        contenido = b''.join(response.streaming_content) if response.streaming else response.content
+        return response, json.loads(contenido)
+
+    def test_recorre_el_listado_con_x_next_cursor(self):
+        vistos, parametros = [], {'limit': 10, 'fields': 'id'}
+        while True:
+            response, filas = self.pedir(**parametros)
+            self.assertEqual(response.status_code, 200)
+            vistos.extend(fila['id'] for fila in filas)
+            if 'X-Next-Cursor' not in response:
+                break
+            self.assertIn('rel="next"', response['Link'])
+            parametros['cursor'] = response['X-Next-Cursor']
+
+        self.assertEqual(vistos, self.ids)
+
+    def test_cursor_invalido_responde_400(self):
+        response = self.client.get(reverse('apis:api_productos'), {'cursor': 'no-es-un-cursor'})
+
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(CACHES=CACHES_PRUEBA)
+class GetCondicionalTests(TestCase):
+
+    def setUp(self):
+        caches['default'].clear()
+        caches['respuestas'].clear()
+        crear_productos_api(3)
+
+    def test_if_none_match_con_la_misma_version_responde_304(self):
+        url = reverse('apis:api_productos')
+        etag = self.client.get(url, {'limit': 2})['ETag']
+
+        response = self.client.get(url, {'limit': 2}, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_el_etag_depende_de_los_parametros(self):
+        url = reverse('apis:api_productos')
+        etag = self.client.get(url, {'limit': 2})['ETag']
+
+        response = self.client.get(url, {'limit': 3}, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_una_sincronizacion_con_cambios_invalida_el_etag(self):
+        url = reverse('apis:api_productos')
+        etag = self.client.get(url)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            SincronizacionService.sincronizar([producto_dummyjson(99)], 4000)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_tasas_responde_304_sin_consultar_la_api(self):
+        caches['default'].set(CLAVE_CACHE_TASA, {
+            'valor': {'tasa_cop': 4000, 'consultado_en': '2026-01-01T00:00:00'}, 'guardado_en': time.time(),
+        }, timeout=None)
+        url = reverse('apis:api_tasas')
+        etag = self.client.get(url)['ETag']
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+
+
+class CacheImagenesTests(SimpleTestCase):
+
+    def setUp(self):
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio, ignore_errors=True)
+        self.cache = CacheImagenes(directorio, max_bytes=10 * 1024 * 1024)
+
+    def guardar(self, url, contenido, edad=0):
+        """Guarda una imagen vigente como lo hace la descarga, usada por última vez hace `edad` segundos"""
+        escritor = self.cache.escritor()
+        escritor.write(contenido)
+        escritor.close()
+        sha256 = hashlib.sha256(contenido).hexdigest()
+        self.cache.guardar_objeto(escritor.name, sha256, len(contenido))
+        self.cache.guardar_metadatos(url, {
+            'url': url, 'content_type': 'image/png', 'expira_en': time.time() + 3600,
+            'sha256': sha256, 'tamano': len(contenido),
+        })
+        instante = time.time() - edad
+        os.utime(self.cache.ruta_objeto(sha256), (instante, instante))
+        return sha256
+
+    def test_recortar_expulsa_los_menos_usados_y_sus_metadatos(self):
+        viejo = self.guardar('https://cdn.dummyjson.com/1.png', b'a' * 100, edad=300)
+        medio = self.guardar('https://cdn.dummyjson.com/2.png', b'b' * 100, edad=200)
+        nuevo = self.guardar('https://cdn.dummyjson.com/3.png', b'c' * 100, edad=100)
+        self.cache.max_bytes = 250
+
+        borrados = self.cache.recortar()
+
+        self.assertEqual(borrados, 1)
+        self.assertFalse(os.path.exists(self.cache.ruta_objeto(viejo)))
+        self.assertTrue(os.path.exists(self.cache.ruta_objeto(medio)))
+        self.assertTrue(os.path.exists(self.cache.ruta_objeto(nuevo)))
+        self.assertIsNone(self.cache.leer_metadatos('https://cdn.dummyjson.com/1.png'))
+        self.assertIsNotNone(self.cache.leer_metadatos('https://cdn.dummyjson.com/2.png'))
+
+    def test_recortar_no_borra_nada_bajo_el_limite(self):
+        sha256 = self.guardar('https://cdn.dummyjson.com/1.png', b'a' * 100)
+
+        self.assertEqual(self.cache.recortar(), 0)
+        self.assertTrue(os.path.exists(self.cache.ruta_objeto(sha256)))
+
+    def test_el_proxy_responde_304_con_el_etag_de_la_copia(self):
+        url = 'https://cdn.dummyjson.com/1.png'
+        self.guardar(url, b'imagen')
+        proxy = reverse('apis:proxy_imagen')
+
+        with mock.patch('applications.apis.services.imagenes_service.obtener_cache', return_value=self.cache):
+            response = self.client.get(proxy, {'url': url})
+            etag = response['ETag']
+            self.assertEqual(b''.join(response.streaming_content), b'imagen')
+            response.close()
+
+            response = self.client.get(proxy, {'url': url}, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_el_proxy_rechaza_hosts_no_permitidos(self):
+        response = self.client.get(reverse('apis:proxy_imagen'), {'url': 'https://ejemplo.com/1.png'})
+
+        self.assertEqual(response.status_code, 403)
+
+
+@override_settings(CACHES=CACHES_PRUEBA, ALLOWED_HOSTS=['a.ejemplo.com', 'b.ejemplo.com'])
+class CacheRespuestasTests(TestCase):
+
+    def setUp(self):
+        caches['default'].clear()
+        caches['respuestas'].clear()
+        crear_productos_api(3)
+
+    def test_la_respuesta_guardada_no_se_sirve_a_otro_host(self):
+        url = reverse('apis:api_productos')
+        # La respuesta en streaming se guarda al terminar de enviarse
+        b''.join(self.client.get(url, {'limit': 1}, HTTP_HOST='a.ejemplo.com').streaming_content)
+
+        response = self.client.get(url, {'limit': 1}, HTTP_HOST='b.ejemplo.com')
+
+        self.assertIn('//b.ejemplo.com/', response['Link'])
@@ -26,6 +26,8 @@ urlpatterns = [
     # API REST (JSON)
     path('api/tasas/', views.api_tasas_cambio, name='api_tasas'),
     path('api/productos/', views.api_productos_json, name='api_productos'),
+    path('api/facetas/', views.api_facetas, name='api_facetas'),
+    path('api/metricas/', views.api_metricas, name='api_metricas'),
     
     # Proxy de imágenes
     path('proxy-imagen/', views.proxy_imagen, name='proxy_imagen'),
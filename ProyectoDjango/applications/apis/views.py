@@ -5,16 +5,106 @@ Implementa el patrón MVC:
 - Vista: Templates HTML
 - Controlador: Este archivo (views.py)
 """
+from django.conf import settings
+from django.core.cache import cache
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import JsonResponse
+from django.db.models import FloatField
+from django.db.models.functions import Cast
+from django.http import (
+    FileResponse, HttpResponse, HttpResponseNotModified, JsonResponse, StreamingHttpResponse,
+)
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
 from django.contrib import messages
-from django.views.decorators.http import require_http_methods
-from django.core.paginator import Paginator
+from django.views.decorators.http import condition, require_http_methods
+from django.db import connection
 from bson import ObjectId
 
+from .db.mongodb import mongo_db
 from .models import ProductoAPI, ConsultaAPI
+from .paginacion import (
+    ADELANTE, codificar_cursor, decodificar_cursor, filtro_keyset, paginar_por_cursor,
+)
+from .serializacion import serializar_filas_json
 from .services.dummyjson_service import DummyJSONService
-from .services.exchangerate_service import ExchangeRateService
+from .services.estadisticas_service import EstadisticasService
+from .services.exchangerate_service import CLAVE_CACHE_TASA, ExchangeRateService
+from .services.facetas_service import FacetasService
+from .services.cache_respuestas import cachear_respuesta, metricas as metricas_cache_respuestas
+from .services.imagenes_service import (
+    TAMANO_BLOQUE, ImagenesService, ajustar_ancho, formato_disponible, negociar_formato,
+)
+from .services.sincronizacion_service import SincronizacionService
+from .services.telemetria_service import telemetria
+from .services.version_catalogo import PRODUCTOS_API, VersionCatalogo
+
+
+# Claves de orden de la paginación por cursor (índice api_productos_orden_idx)
+ORDEN_LISTADO = ['-sincronizado_en', '-id']
+ORDEN_RELEVANCIA = ['-relevancia', '-similitud', '-id']
+
+# Campos públicos de api_productos_json -> columna o expresión (los precios se
+# convierten a número en SQL para no tratar Decimals en Python)
+CAMPOS_JSON = {
+    'id': 'id',
+    'api_id': 'api_id',
+    'titulo': 'titulo',
+    'descripcion': 'descripcion',
+    'precio_usd': Cast('precio_usd', FloatField()),
+    'precio_cop': Cast('precio_cop', FloatField()),
+    'categoria': 'categoria',
+    'marca': 'marca',
+    'stock': 'stock',
+    'rating': Cast('rating', FloatField()),
+    'imagen': 'imagen_url',
+}
+CAMPOS_JSON_POR_DEFECTO = [
+    'id', 'api_id', 'titulo', 'precio_usd', 'precio_cop', 'categoria', 'stock', 'imagen',
+]
+TAMANO_BLOQUE_JSON = 1000
+
+
+# ==================== VALIDADORES HTTP (ETag / Last-Modified) ====================
+# Se calculan con la versión del catálogo en caché, sin consultar la BD ni
+# renderizar; si el cliente ya tiene la versión, `condition` responde 304.
+
+def _parametros_normalizados(request):
+    return sorted(request.GET.lists())
+
+
+def _etag_lista_productos(request, *args, **kwargs):
+    # Los mensajes pendientes se muestran una sola vez: esa respuesta no se valida
+    if len(messages.get_messages(request)):
+        return None
+    return VersionCatalogo.etag(
+        PRODUCTOS_API,
+        _parametros_normalizados(request),
+        request.user.pk,
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME),
+    )
+
+
+def _ultima_modificacion_lista_productos(request, *args, **kwargs):
+    if len(messages.get_messages(request)):
+        return None
+    return VersionCatalogo.ultima_modificacion(PRODUCTOS_API)
+
+
+def _etag_productos_json(request, *args, **kwargs):
+    return VersionCatalogo.etag(PRODUCTOS_API, _parametros_normalizados(request))
+
+
+def _ultima_modificacion_catalogo(request, *args, **kwargs):
+    return VersionCatalogo.ultima_modificacion(PRODUCTOS_API)
+
+
+def _etag_tasas(request, *args, **kwargs):
+    # Solo la entrada ya guardada: calcular el validador nunca consulta la API
+    entrada = cache.get(CLAVE_CACHE_TASA)
+    if not entrada or not entrada.get('valor'):
+        return None
+    tasas = entrada['valor']
+    return f"{tasas.get('tasa_cop')}-{tasas.get('consultado_en')}"
 
 
 # ==================== VISTAS PRINCIPALES ====================
@@ -22,9 +112,7 @@ from .services.exchangerate_service import ExchangeRateService
 def dashboard_apis(request):
     """Vista principal del dashboard de APIs"""
     context = {
-        'total_productos': ProductoAPI.objects.count(),
-        'productos_activos': ProductoAPI.objects.filter(activo=True).count(),
-        'total_consultas': ConsultaAPI.objects.count(),
+        **EstadisticasService.obtener_contadores(),
         'ultimas_consultas': ConsultaAPI.objects.all()[:5],
     }
     return render(request, 'apis/dashboard.html', context)
@@ -32,6 +120,7 @@ def dashboard_apis(request):
 
 # ==================== CRUD PRODUCTOS API ====================
 
+@condition(etag_func=_etag_lista_productos, last_modified_func=_ultima_modificacion_lista_productos)
 def lista_productos_api(request):
     """Lista todos los productos sincronizados desde la API (READ)"""
     productos = ProductoAPI.objects.all()
@@ -40,18 +129,30 @@ def lista_productos_api(request):
     categoria = request.GET.get('categoria')
     busqueda = request.GET.get('q')
     
+    # Categorías con sus conteos (facetas materializadas)
+    categorias = FacetasService.obtener()['categoria']
+    
     if categoria:
-        productos = productos.filter(categoria__icontains=categoria)
-    if busqueda:
-        productos = productos.filter(titulo__icontains=busqueda)
+        productos = productos.filter(categoria=categoria)
     
-    # Paginación
-    paginator = Paginator(productos, 12)
-    page = request.GET.get('page', 1)
-    productos_paginados = paginator.get_page(page)
+    # El total sale de facetas/contadores en caché; con búsqueda solo se cuenta si se pide
+    orden = ORDEN_LISTADO
+    total = None
+    if busqueda:
+        productos = productos.buscar(busqueda)
+        if connection.vendor == 'postgresql':
+            orden = ORDEN_RELEVANCIA
+        if request.GET.get('total'):
+            total = productos.count()
+    elif categoria:
+        total = next((c['total'] for c in categorias if c['valor'] == categoria), 0)
+    else:
+        total = EstadisticasService.obtener_contadores()['total_productos']
     
-    # Obtener categorías únicas
-    categorias = ProductoAPI.objects.values_list('categoria', flat=True).distinct()
+    # Paginación por cursor (sin COUNT ni OFFSET)
+    productos_paginados = paginar_por_cursor(
+        productos, orden, cursor=request.GET.get('cursor'), tamano=12, total=total
+    )
     
     context = {
         'productos': productos_paginados,
@@ -66,14 +167,14 @@ def detalle_producto_api(request, producto_id):
     """Muestra el detalle de un producto (READ)"""
     producto = get_object_or_404(ProductoAPI, id=producto_id)
     
-    # Actualizar precio COP con tasa actual
+    # Precio COP para mostrar con la tasa en caché (la lectura no escribe en la BD)
     tasas = ExchangeRateService.obtener_tasa_cambio()
-    if tasas:
-        producto.actualizar_precio_cop(tasas['tasa_cop'])
+    tasa_cop = tasas.get('tasa_cop') if tasas else None
     
     context = {
         'producto': producto,
-        'tasa_cambio': tasas.get('tasa_cop') if tasas else None,
+        'precio_cop': producto.calcular_precio_cop(tasa_cop) if tasa_cop else producto.precio_cop,
+        'tasa_cambio': tasa_cop,
     }
     return render(request, 'apis/producto_detalle.html', context)
 
@@ -89,47 +190,27 @@ def sincronizar_productos(request):
         tasas = ExchangeRateService.obtener_tasa_cambio()
         tasa_cop = tasas.get('tasa_cop', 4000) if tasas else 4000
         
-        sincronizados = 0
-        actualizados = 0
-        
-        for prod_data in productos:
-            # Convertir precio a COP
-            precio_cop = float(prod_data.get('price', 0)) * tasa_cop
-            
-            # Crear o actualizar producto
-            producto, created = ProductoAPI.objects.update_or_create(
-                api_id=prod_data.get('id'),
-                defaults={
-                    'titulo': prod_data.get('title', ''),
-                    'descripcion': prod_data.get('description', ''),
-                    'precio_usd': prod_data.get('price', 0),
-                    'precio_cop': precio_cop,
-                    'categoria': prod_data.get('category', ''),
-                    'marca': prod_data.get('brand', ''),
-                    'stock': prod_data.get('stock', 0),
-                    'rating': prod_data.get('rating', 0),
-                    'imagen_url': prod_data.get('thumbnail', ''),
-                    'activo': True,
-                }
-            )
-            
-            if created:
-                sincronizados += 1
-            else:
-                actualizados += 1
+        resumen = SincronizacionService.sincronizar(productos, tasa_cop)
         
         # Registrar consulta
-        ConsultaAPI.objects.create(
+        telemetria.registrar_consulta(
             tipo='PRODUCTO',
             api_nombre='DummyJSON',
             exitosa=True,
-            detalles=f'Sincronizados: {sincronizados}, Actualizados: {actualizados}'
+            detalles=(
+                f"Sincronizados: {resumen['creados']}, Actualizados: {resumen['actualizados']}, "
+                f"Sin cambios: {resumen['sin_cambios']}"
+            )
         )
         
-        messages.success(request, f'✓ {sincronizados} productos nuevos sincronizados, {actualizados} actualizados.')
+        messages.success(
+            request,
+            f"✓ {resumen['creados']} productos nuevos sincronizados, {resumen['actualizados']} actualizados, "
+            f"{resumen['sin_cambios']} sin cambios."
+        )
         
     except Exception as e:
-        ConsultaAPI.objects.create(
+        telemetria.registrar_consulta(
             tipo='PRODUCTO',
             api_nombre='DummyJSON',
             exitosa=False,
@@ -160,16 +241,15 @@ def actualizar_precios_cop(request):
             return redirect('apis:lista_productos')
         
         tasa_cop = tasas['tasa_cop']
-        productos = ProductoAPI.objects.all()
-        
-        for producto in productos:
-            producto.actualizar_precio_cop(tasa_cop)
+        actualizados = ProductoAPI.objects.recalcular_precios_cop(
+            tasa_cop, tamano_lote=settings.PRECIOS_COP_TAMANO_LOTE
+        )
         
-        ConsultaAPI.objects.create(
+        telemetria.registrar_consulta(
             tipo='CONVERSION',
             api_nombre='ExchangeRate',
             exitosa=True,
-            detalles=f'Actualizados {productos.count()} productos con tasa {tasa_cop}'
+            detalles=f'Actualizados {actualizados} productos con tasa {tasa_cop}'
         )
         
         messages.success(request, f'✓ Precios actualizados. Tasa: 1 USD = {tasa_cop:.2f} COP')
@@ -197,7 +277,7 @@ def buscar_en_api(request):
             for prod in productos_api:
                 prod['precio_cop'] = float(prod.get('price', 0)) * tasa_cop
         
-        ConsultaAPI.objects.create(
+        telemetria.registrar_consulta(
             tipo='BUSQUEDA',
             api_nombre='DummyJSON',
             exitosa=True,
@@ -236,6 +316,7 @@ def historial_consultas(request):
 
 # ==================== API REST (JSON) ====================
 
+@condition(etag_func=_etag_tasas)
 def api_tasas_cambio(request):
     """Endpoint JSON para obtener tasas de cambio"""
     tasas = ExchangeRateService.obtener_tasa_cambio()
@@ -244,38 +325,117 @@ def api_tasas_cambio(request):
     return JsonResponse({'error': 'No se pudo obtener tasas'}, status=500)
 
 
+@condition(etag_func=_etag_productos_json, last_modified_func=_ultima_modificacion_catalogo)
+@cachear_respuesta(PRODUCTOS_API)
 def api_productos_json(request):
-    """Endpoint JSON para listar productos"""
-    productos = ProductoAPI.objects.filter(activo=True)[:20]
-    data = []
-    
-    for prod in productos:
-        data.append({
-            'id': prod.id,
-            'api_id': prod.api_id,
-            'titulo': prod.titulo,
-            'precio_usd': float(prod.precio_usd),
-            'precio_cop': float(prod.precio_cop) if prod.precio_cop else None,
-            'categoria': prod.categoria,
-            'stock': prod.stock,
-            'imagen': prod.imagen_url,
-        })
-    
-    return JsonResponse(data, safe=False)
+    """
+    Endpoint JSON para listar productos activos.
+    Parámetros: limit (máx. API_PRODUCTOS_JSON_MAX_LIMIT), fields (lista separada
+    por comas de CAMPOS_JSON) y cursor (el de la cabecera X-Next-Cursor de la
+    respuesta anterior). Lee solo las columnas pedidas como tuplas y transmite
+    el JSON por bloques, sin crear objetos del modelo.
+    """
+    try:
+        limite = int(request.GET.get('limit', 20))
+    except ValueError:
+        return JsonResponse({'error': 'limit debe ser un entero'}, status=400)
+    limite = max(1, min(limite, settings.API_PRODUCTOS_JSON_MAX_LIMIT))
+
+    campos = [c for c in request.GET.get('fields', '').split(',') if c] or CAMPOS_JSON_POR_DEFECTO
+    desconocidos = [c for c in campos if c not in CAMPOS_JSON]
+    if desconocidos:
+        return JsonResponse({'error': f"Campos no válidos: {', '.join(desconocidos)}"}, status=400)
+
+    productos = ProductoAPI.objects.filter(activo=True).order_by(*ORDEN_LISTADO)
+    cursor = request.GET.get('cursor')
+    if cursor:
+        decodificado = decodificar_cursor(cursor, ORDEN_LISTADO)
+        if decodificado is None or decodificado[1] != ADELANTE:
+            return JsonResponse({'error': 'cursor no válido'}, status=400)
+        productos = productos.filter(filtro_keyset(ORDEN_LISTADO, decodificado[0]))
+
+    # Frontera de la página (solo el índice) para anunciar el siguiente cursor antes de transmitir
+    frontera = list(productos.values_list('sincronizado_en', 'id')[limite - 1:limite + 1])
+    siguiente = codificar_cursor(ORDEN_LISTADO, list(frontera[0]), ADELANTE) if len(frontera) > 1 else None
+
+    filas = productos.values_list(*(CAMPOS_JSON[c] for c in campos))[:limite]
+    response = StreamingHttpResponse(
+        serializar_filas_json(campos, filas.iterator(chunk_size=TAMANO_BLOQUE_JSON), TAMANO_BLOQUE_JSON),
+        content_type='application/json',
+    )
+    if siguiente:
+        response['X-Next-Cursor'] = siguiente
+        parametros = request.GET.copy()
+        parametros['cursor'] = siguiente
+        response['Link'] = f'<{request.build_absolute_uri(request.path)}?{parametros.urlencode()}>; rel="next"'
+    return response
+
+
+def api_facetas(request):
+    """Endpoint JSON con los conteos por categoría y marca (total y activos)"""
+    return JsonResponse(FacetasService.obtener())
+
+
+def api_metricas(request):
+    """
+    Endpoint JSON con métricas del proceso que atiende la petición:
+    pool de conexiones de MongoDB, buffer de telemetría y caché de respuestas
+    """
+    return JsonResponse({
+        'mongo_pool': mongo_db.estadisticas_pool(),
+        'telemetria': telemetria.estadisticas(),
+        'cache_respuestas': metricas_cache_respuestas.estadisticas(),
+    })
 
 
 def proxy_imagen(request):
-    """Proxy para cargar imágenes externas y evitar problemas de CORS"""
-    import requests
-    from django.http import HttpResponse
-    
+    """
+    Proxy para cargar imágenes externas y evitar problemas de CORS.
+    Sirve desde la caché en disco (ver ImagenesService) con cabeceras de
+    caché de larga duración; solo acepta los hosts de IMAGENES_HOSTS_PERMITIDOS.
+    Parámetros opcionales: w (ancho en píxeles) y formato.
+    """
     url = request.GET.get('url')
     if not url:
         return HttpResponse('URL no proporcionada', status=400)
     
+    # Variante: ancho (w) y formato (webp, avif, jpeg, png o auto = según Accept)
     try:
-        response = requests.get(url, timeout=10)
-        return HttpResponse(response.content, content_type=response.headers.get('content-type', 'image/jpeg'))
-    except Exception as e:
+        ancho = ajustar_ancho(int(request.GET['w'])) if request.GET.get('w') else None
+    except ValueError:
+        return HttpResponse('w debe ser un entero', status=400)
+    formato = request.GET.get('formato', 'auto')
+    negociado = formato == 'auto'
+    if negociado:
+        formato = negociar_formato(request.META.get('HTTP_ACCEPT', ''))
+    elif not formato_disponible(formato):
+        return HttpResponse('Formato no soportado', status=400)
+    
+    try:
+        imagen = ImagenesService.obtener_variante(url, ancho, formato)
+    except ValueError:
+        return HttpResponse('Host no permitido', status=403)
+    
+    if imagen is None:
         # Devolver imagen placeholder si falla
         return redirect('https://placehold.co/300x200/667eea/white?text=Error')
+    
+    etag = f'"{imagen.etag}"' if imagen.etag else None
+    if etag and etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+        imagen.cerrar()
+        response = HttpResponseNotModified()
+    elif imagen.archivo is not None:
+        response = FileResponse(imagen.archivo, content_type=imagen.metadatos['content_type'])
+        response.block_size = TAMANO_BLOQUE
+    else:
+        response = StreamingHttpResponse(imagen.contenido, content_type=imagen.metadatos['content_type'])
+    
+    if imagen.metadatos.get('no_store'):
+        response['Cache-Control'] = 'no-store'
+    else:
+        response['Cache-Control'] = f'public, max-age={settings.IMAGENES_MAX_AGE_CLIENTE}'
+    if etag:
+        response['ETag'] = etag
+    if negociado:
+        patch_vary_headers(response, ['Accept'])
+    return response
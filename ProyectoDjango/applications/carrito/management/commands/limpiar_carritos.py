@@ -0,0 +1,27 @@
+"""
+Elimina los carritos vacíos creados hace más de N días (por defecto 7).
+Antes se creaba un carrito por cada visita sin sesión; ahora solo al agregar
+el primer producto, así que esto limpia los que quedaron:
+
+    python manage.py limpiar_carritos --dias 7
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from applications.carrito.models import Carrito
+
+
+class Command(BaseCommand):
+    help = 'Elimina los carritos sin productos más antiguos que --dias'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=7)
+
+    def handle(self, *args, **options):
+        limite = timezone.now() - timedelta(days=options['dias'])
+        eliminados, _ = Carrito.objects.filter(
+            creado_en__lt=limite, items__isnull=True
+        ).delete()
+        self.stdout.write(self.style.SUCCESS(f'✓ {eliminados} carritos vacíos eliminados'))
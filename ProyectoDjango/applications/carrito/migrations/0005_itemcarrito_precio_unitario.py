@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:02
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copiar_precios(apps, schema_editor):
+    """Los items existentes toman el precio actual de su producto"""
+    ItemCarrito = apps.get_model('carrito', 'ItemCarrito')
+    Producto = apps.get_model('productos', 'Producto')
+    ItemCarrito.objects.update(
+        precio_unitario=Subquery(Producto.objects.filter(pk=OuterRef('producto_id')).values('precio')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('carrito', '0004_alter_itemcarrito_producto_and_more'),
+        ('productos', '0003_producto_imagen_url'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='itemcarrito',
+            name='precio_unitario',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+            preserve_default=False,
+        ),
+        migrations.RunPython(copiar_precios, migrations.RunPython.noop),
+    ]
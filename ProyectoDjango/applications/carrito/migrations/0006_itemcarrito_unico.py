@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:40
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def unir_duplicados(apps, schema_editor):
+    """Une los items repetidos (mismo carrito y producto) sumando sus cantidades"""
+    ItemCarrito = apps.get_model('carrito', 'ItemCarrito')
+    repetidos = (
+        ItemCarrito.objects.values('carrito_id', 'producto_id')
+        .annotate(filas=Count('id'), primero=Min('id'), cantidad_total=Sum('cantidad'))
+        .filter(filas__gt=1)
+        .order_by()
+    )
+    for grupo in repetidos:
+        ItemCarrito.objects.filter(id=grupo['primero']).update(cantidad=grupo['cantidad_total'])
+        ItemCarrito.objects.filter(
+            carrito_id=grupo['carrito_id'], producto_id=grupo['producto_id']
+        ).exclude(id=grupo['primero']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('carrito', '0005_itemcarrito_precio_unitario'),
+    ]
+
+    operations = [
+        migrations.RunPython(unir_duplicados, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='itemcarrito',
+            constraint=models.UniqueConstraint(fields=('carrito', 'producto'), name='carrito_item_producto_unico'),
+        ),
+    ]
@@ -1,4 +1,8 @@
-from django.db import models
+from decimal import Decimal
+
+from django.db import IntegrityError, connection, models, transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum
+from django.db.models.functions import Coalesce
 from django.conf import settings
 from applications.productos.models import Producto
 
@@ -16,16 +20,92 @@ class Carrito(models.Model):
     )
     creado_en = models.DateTimeField(auto_now_add=True)
 
+    def resumen(self):
+        """
+        Devuelve {"total", "cantidad_items"} del carrito con una sola consulta
+        de agregación sobre sus items.
+        """
+        resumen = self.items.aggregate(
+            total=Coalesce(
+                Sum(ExpressionWrapper(
+                    F('precio_unitario') * F('cantidad'),
+                    output_field=DecimalField(max_digits=12, decimal_places=2),
+                )),
+                Decimal('0'),
+                output_field=DecimalField(max_digits=12, decimal_places=2),
+            ),
+            cantidad_items=Count('id'),
+        )
+        # SQLite suma decimales como REAL: se devuelve siempre con dos decimales exactos
+        resumen['total'] = Decimal(resumen['total']).quantize(Decimal('0.01'))
+        return resumen
+
     def total(self):
         """
         Calcula el total del carrito sumando los subtotales de cada producto.
         """
-        return sum(item.subtotal() for item in self.items.all())
+        return self.resumen()['total']
 
     def __str__(self):
         return f"Carrito #{self.id}"
 
 
+class ItemCarritoQuerySet(models.QuerySet):
+    def agregar(self, carrito, lineas):
+        """
+        Suma productos al carrito en una sola sentencia. `lineas` es un
+        iterable de (producto, cantidad); si el producto ya está en el carrito
+        se incrementa su cantidad, si no se inserta con el precio actual.
+
+        En PostgreSQL (y SQLite) es un INSERT ... ON CONFLICT DO UPDATE sobre
+        la restricción (carrito, producto): correcto con peticiones
+        concurrentes, sin lecturas previas ni incrementos perdidos.
+        """
+        cantidades, precios = {}, {}
+        for producto, cantidad in lineas:
+            cantidades[producto.pk] = cantidades.get(producto.pk, 0) + cantidad
+            precios[producto.pk] = producto.precio
+        if not cantidades:
+            return
+        # Siempre en el mismo orden para que dos lotes concurrentes no se bloqueen mutuamente
+        ids = sorted(cantidades)
+
+        if connection.vendor in ('postgresql', 'sqlite'):
+            tabla = connection.ops.quote_name(self.model._meta.db_table)
+            valores = ', '.join(['(%s, %s, %s, %s)'] * len(ids))
+            parametros = []
+            for producto_id in ids:
+                parametros.extend([carrito.pk, producto_id, cantidades[producto_id], precios[producto_id]])
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'INSERT INTO {tabla} (carrito_id, producto_id, cantidad, precio_unitario) '
+                    f'VALUES {valores} '
+                    f'ON CONFLICT (carrito_id, producto_id) '
+                    f'DO UPDATE SET cantidad = {tabla}.cantidad + EXCLUDED.cantidad',
+                    parametros,
+                )
+            return
+
+        # Otros motores: incremento con F() y, si no existía, inserción
+        with transaction.atomic():
+            for producto_id in ids:
+                if self.filter(carrito=carrito, producto_id=producto_id).update(
+                    cantidad=F('cantidad') + cantidades[producto_id]
+                ):
+                    continue
+                try:
+                    with transaction.atomic():
+                        self.create(
+                            carrito=carrito, producto_id=producto_id,
+                            cantidad=cantidades[producto_id], precio_unitario=precios[producto_id],
+                        )
+                except IntegrityError:
+                    # Otra petición lo insertó entre el UPDATE y el INSERT
+                    self.filter(carrito=carrito, producto_id=producto_id).update(
+                        cantidad=F('cantidad') + cantidades[producto_id]
+                    )
+
+
 class ItemCarrito(models.Model):
     """
     Representa un producto dentro del carrito, junto con su cantidad.
@@ -33,12 +113,21 @@ class ItemCarrito(models.Model):
     carrito = models.ForeignKey(Carrito, on_delete=models.CASCADE, related_name='items')
     producto = models.ForeignKey(Producto, on_delete=models.CASCADE)
     cantidad = models.PositiveIntegerField(default=1)
+    # Precio del producto al agregarlo al carrito (no cambia si luego cambia el producto)
+    precio_unitario = models.DecimalField(max_digits=10, decimal_places=2)
+
+    objects = ItemCarritoQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['carrito', 'producto'], name='carrito_item_producto_unico'),
+        ]
 
     def subtotal(self):
         """
         Devuelve el valor total de este producto en el carrito.
         """
-        return self.producto.precio * self.cantidad
+        return self.precio_unitario * self.cantidad
 
     def __str__(self):
         return f"{self.cantidad} x {self.producto.nombre}"
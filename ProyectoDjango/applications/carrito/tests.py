@@ -1,3 +1,107 @@
-from django.test import TestCase
+import json
+from decimal import Decimal
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from applications.productos.models import Producto
+from .models import Carrito, ItemCarrito
+
+
+class CarritoTestCase(TestCase):
+
+    def setUp(self):
+        self.producto = Producto.objects.create(nombre='Zapato', precio=Decimal('10000.00'))
+
+    def agregar_local(self, producto=None):
+        return self.client.post(reverse('agregar_al_carrito'), {
+            'tipo': 'local', 'producto_id': (producto or self.producto).pk,
+        })
+
+
+class CarritoPerezosoTests(CarritoTestCase):
+
+    def test_ver_el_carrito_no_crea_carrito_ni_sesion(self):
+        response = self.client.get(reverse('ver_carrito'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Carrito.objects.exists())
+        self.assertNotIn('carrito_id', self.client.session)
+        self.assertEqual(response.context['cantidad_items'], 0)
+
+    def test_el_primer_producto_crea_el_carrito_de_la_sesion(self):
+        response = self.agregar_local()
+
+        self.assertRedirects(response, reverse('ver_carrito'))
+        carrito = Carrito.objects.get()
+        self.assertEqual(self.client.session['carrito_id'], carrito.id)
+        self.assertEqual(carrito.items.get().producto, self.producto)
+
+
+class AgregarAlCarritoTests(CarritoTestCase):
+
+    def agregar_json(self, items):
+        return self.client.post(
+            reverse('api_agregar_al_carrito'), json.dumps({'items': items}), content_type='application/json'
+        )
+
+    def test_agregar_dos_veces_incrementa_la_cantidad(self):
+        self.agregar_local()
+        self.agregar_local()
+
+        item = ItemCarrito.objects.get()
+        self.assertEqual(item.cantidad, 2)
+        self.assertEqual(item.precio_unitario, Decimal('10000.00'))
+
+    def test_agregar_no_cambia_el_precio_guardado(self):
+        self.agregar_local()
+        Producto.objects.filter(pk=self.producto.pk).update(precio=Decimal('15000.00'))
+
+        self.agregar_local()
+
+        item = ItemCarrito.objects.get()
+        self.assertEqual((item.cantidad, item.precio_unitario), (2, Decimal('10000.00')))
+
+    def test_el_upsert_suma_las_lineas_repetidas_de_un_lote(self):
+        carrito = Carrito.objects.create()
+        otro = Producto.objects.create(nombre='Bota', precio=Decimal('2500.50'))
+
+        ItemCarrito.objects.agregar(carrito, [(self.producto, 1), (otro, 2), (self.producto, 3)])
+        ItemCarrito.objects.agregar(carrito, [(otro, 1)])
+
+        cantidades = dict(carrito.items.values_list('producto_id', 'cantidad'))
+        self.assertEqual(cantidades, {self.producto.pk: 4, otro.pk: 3})
+        self.assertEqual(carrito.resumen(), {'total': Decimal('47501.50'), 'cantidad_items': 2})
+
+    def test_el_endpoint_json_agrega_y_devuelve_el_resumen(self):
+        otro = Producto.objects.create(nombre='Bota', precio=Decimal('2500.50'))
+
+        self.agregar_json([{'producto_id': self.producto.pk, 'cantidad': 2}])
+        response = self.agregar_json([
+            {'producto_id': self.producto.pk}, {'producto_id': otro.pk, 'cantidad': 2},
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['total'], '35001.00')
+        self.assertEqual(response.json()['cantidad_items'], 2)
+        self.assertEqual(Carrito.objects.count(), 1)
+        self.assertEqual(ItemCarrito.objects.get(producto=self.producto).cantidad, 3)
+
+    @override_settings(CARRITO_MAX_CANTIDAD=5, CARRITO_MAX_ITEMS=2)
+    def test_el_endpoint_json_valida_el_cuerpo(self):
+        invalidos = [
+            [],
+            [{'producto_id': self.producto.pk, 'cantidad': 0}],
+            [{'producto_id': self.producto.pk, 'cantidad': 6}],
+            [{'producto_id': self.producto.pk}] * 3,
+            [{'cantidad': 1}],
+        ]
+        for items in invalidos:
+            with self.subTest(items=items):
+                self.assertEqual(self.agregar_json(items).status_code, 400)
+
+        response = self.agregar_json([{'producto_id': self.producto.pk + 1000}])
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json()['producto_ids'], [self.producto.pk + 1000])
+        self.assertFalse(Carrito.objects.exists())
@@ -4,6 +4,7 @@ from . import views
 urlpatterns = [
     path('', views.ver_carrito, name='ver_carrito'),
     path('agregar/', views.agregar_al_carrito, name='agregar_al_carrito'),
+    path('api/agregar/', views.api_agregar_al_carrito, name='api_agregar_al_carrito'),
     path('eliminar/<int:item_id>/', views.eliminar_del_carrito, name='eliminar_del_carrito'),
 
 ]
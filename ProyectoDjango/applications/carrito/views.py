@@ -1,22 +1,90 @@
+import json
 from decimal import Decimal
+from django.conf import settings
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.views.decorators.http import require_http_methods
+from applications.apis.models import ProductoAPI, convertir_usd_a_cop
+from applications.apis.services.exchangerate_service import ExchangeRateService
 from applications.productos.models import Producto
+from applications.productos.services.api_dummyjson import obtener_snapshot_catalogo
 from .models import Carrito, ItemCarrito
 
 
-def obtener_carrito(request):
+def obtener_carrito(request, crear=False):
+    """
+    Devuelve el carrito de la sesión, o None si aún no tiene.
+    El carrito solo se crea en la base de datos (y se guarda en la sesión)
+    con crear=True, es decir, al agregar el primer producto: las visitas que
+    solo navegan no escriben ni el carrito ni la sesión.
+    """
     carrito_id = request.session.get("carrito_id")
-    if carrito_id:
-        carrito = Carrito.objects.filter(id=carrito_id).first()
-    else:
+    carrito = Carrito.objects.filter(id=carrito_id).first() if carrito_id else None
+    if carrito is None and crear:
         carrito = Carrito.objects.create()
         request.session["carrito_id"] = carrito.id
     return carrito
 
 
-def agregar_al_carrito(request):
-    carrito = obtener_carrito(request)
+def datos_producto_api(api_id):
+    """
+    Campos de Producto para el producto externo `api_id`, o None si no se
+    encuentra o no se puede calcular su precio. Se toman de api_productos
+    (búsqueda por índice único) y, si aún no se sincronizó, del snapshot del
+    catálogo de la tienda. El precio en COP usa la tasa de la caché.
+    """
+    fuente = ProductoAPI.objects.filter(api_id=api_id).values(
+        "titulo", "descripcion", "precio_usd", "precio_cop", "imagen_url"
+    ).first()
+    if fuente is None:
+        snapshot = obtener_snapshot_catalogo()
+        p = next((p for p in (snapshot["productos"] if snapshot else []) if p.get("id") == api_id), None)
+        if p is None:
+            return None
+        fuente = {
+            "titulo": p.get("title", ""),
+            "descripcion": p.get("description", ""),
+            "precio_usd": p.get("price", 0),
+            "precio_cop": None,
+            "imagen_url": p.get("thumbnail") or p.get("image", ""),
+        }
+
+    precio_cop = fuente["precio_cop"]
+    if precio_cop is None:
+        tasas = ExchangeRateService.obtener_tasa_cambio()
+        if not tasas or not tasas.get("tasa_cop"):
+            print(f"Sin tasa de cambio para el producto externo {api_id}")
+            return None
+        precio_cop = convertir_usd_a_cop(fuente["precio_usd"], tasas["tasa_cop"])
+
+    return {
+        "nombre": (fuente["titulo"] or "Producto externo")[:100],
+        "descripcion": fuente["descripcion"] or "Producto externo desde API",
+        "precio": precio_cop,
+        "imagen_url": fuente["imagen_url"] or None,
+    }
+
+
+def obtener_producto_api(api_id):
+    """
+    Producto local vinculado al producto externo `api_id`, creándolo la
+    primera vez. Solo escribe los campos que cambiaron desde la última vez.
+    """
+    datos = datos_producto_api(api_id)
+    if datos is None:
+        return None
+
+    producto, creado = Producto.objects.get_or_create(api_id=api_id, defaults=datos)
+    if not creado:
+        cambios = [campo for campo, valor in datos.items() if getattr(producto, campo) != valor]
+        if cambios:
+            for campo in cambios:
+                setattr(producto, campo, datos[campo])
+            producto.save(update_fields=cambios)
+    return producto
+
 
+def agregar_al_carrito(request):
     if request.method == "POST":
         tipo = request.POST.get("tipo")
 
@@ -25,71 +93,74 @@ def agregar_al_carrito(request):
             producto = get_object_or_404(Producto, id=producto_id)
 
         elif tipo == "api":
-            nombre = request.POST.get("nombre")
-            precio_usd = request.POST.get("precio", "0")
-            descripcion = request.POST.get("descripcion", "")
-            imagen = request.POST.get("imagen", "")
-
-            # Validar que el nombre no esté vacío
-            if not nombre or nombre.strip() == "":
-                nombre = "Producto externo"
-            
-            # Validar precio y convertir de USD a COP
             try:
-                precio_usd_decimal = Decimal(precio_usd)
-                # Tasa de cambio aproximada: 1 USD = 3800 COP
-                TASA_CAMBIO = Decimal("3800")
-                precio_cop = precio_usd_decimal * TASA_CAMBIO
-            except:
-                precio_cop = Decimal("0")
-            
-            # Validar descripción
-            if not descripcion or descripcion.strip() == "":
-                descripcion = "Producto externo desde API"
-
-            # Buscar o crear el producto (precio ya en COP)
-            producto, created = Producto.objects.get_or_create(
-                nombre=nombre,
-                defaults={
-                    "precio": precio_cop,
-                    "descripcion": descripcion,
-                    "imagen_url": imagen,
-                },
-            )
-
-            # Actualizar si ya existía pero con datos incompletos
-            if not created:
-                actualizar = False
-                if precio_cop > 0 and producto.precio != precio_cop:
-                    producto.precio = precio_cop
-                    actualizar = True
-                if descripcion and producto.descripcion != descripcion:
-                    producto.descripcion = descripcion
-                    actualizar = True
-                if imagen and not producto.imagen_url:
-                    producto.imagen_url = imagen
-                    actualizar = True
-                if actualizar:
-                    producto.save()
+                api_id = int(request.POST.get("api_id", ""))
+            except ValueError:
+                return redirect("tienda")
+            producto = obtener_producto_api(api_id)
+            if producto is None:
+                return redirect("tienda")
 
         else:
             return redirect("tienda")
 
-        item, creado = ItemCarrito.objects.get_or_create(
-            carrito=carrito, producto=producto
-        )
-        if not creado:
-            item.cantidad += 1
-            item.save()
+        carrito = obtener_carrito(request, crear=True)
+        ItemCarrito.objects.agregar(carrito, [(producto, 1)])
 
         return redirect("ver_carrito")
 
     return redirect("tienda")
 
 
+@require_http_methods(["POST"])
+def api_agregar_al_carrito(request):
+    """
+    Agrega varios productos locales en una petición.
+    Cuerpo JSON: {"items": [{"producto_id": 1, "cantidad": 2}, ...]}, con hasta
+    CARRITO_MAX_ITEMS items de 1 a CARRITO_MAX_CANTIDAD unidades cada uno.
+    Responde con el total y la cantidad de productos del carrito.
+    """
+    try:
+        datos = json.loads(request.body)
+        lineas = [(int(item["producto_id"]), int(item.get("cantidad", 1))) for item in datos["items"]]
+    except (ValueError, TypeError, KeyError, AttributeError):
+        return JsonResponse({"error": 'Se esperaba {"items": [{"producto_id", "cantidad"}]}'}, status=400)
+    max_items = getattr(settings, "CARRITO_MAX_ITEMS", 100)
+    max_cantidad = getattr(settings, "CARRITO_MAX_CANTIDAD", 99)
+    if not lineas or len(lineas) > max_items:
+        return JsonResponse({"error": f"Se esperaban entre 1 y {max_items} items"}, status=400)
+    if any(not 1 <= cantidad <= max_cantidad for _, cantidad in lineas):
+        return JsonResponse({"error": f"Cada item debe tener una cantidad entre 1 y {max_cantidad}"}, status=400)
+
+    productos = Producto.objects.only("id", "precio").in_bulk({producto_id for producto_id, _ in lineas})
+    faltantes = sorted({producto_id for producto_id, _ in lineas} - productos.keys())
+    if faltantes:
+        return JsonResponse({"error": "Productos no encontrados", "producto_ids": faltantes}, status=404)
+
+    carrito = obtener_carrito(request, crear=True)
+    ItemCarrito.objects.agregar(carrito, [(productos[producto_id], cantidad) for producto_id, cantidad in lineas])
+    resumen = carrito.resumen()
+    return JsonResponse({
+        "carrito_id": carrito.id,
+        "total": str(resumen["total"]),
+        "cantidad_items": resumen["cantidad_items"],
+    })
+
+
 def ver_carrito(request):
     carrito = obtener_carrito(request)
-    return render(request, "carrito/ver_carrito.html", {"carrito": carrito})
+    items = []
+    resumen = {"total": Decimal("0"), "cantidad_items": 0}
+    if carrito is not None:
+        # Items con su producto en una consulta y totales en otra
+        items = list(carrito.items.select_related("producto").order_by("id"))
+        resumen = carrito.resumen()
+    return render(request, "carrito/ver_carrito.html", {
+        "carrito": carrito,
+        "items": items,
+        "total": resumen["total"],
+        "cantidad_items": resumen["cantidad_items"],
+    })
 
 
 def eliminar_del_carrito(request, item_id):
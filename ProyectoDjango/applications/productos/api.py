@@ -1,7 +1,151 @@
-from rest_framework import viewsets
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from rest_framework import serializers, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+from applications.apis.models import DocumentoBusqueda
+from applications.apis.services.busqueda_service import BusquedaService
+from applications.apis.services.cache_respuestas import cachear_respuesta
+from applications.apis.services.version_catalogo import PRODUCTOS, VersionCatalogo
 from .models import Producto
-from .serializers import ProductoSerializer
+from .serializers import ProductoIdsSerializer, ProductoSerializer, ProductoValoresSerializer
+from .signals import sin_senales_por_objeto
+
+# Campos que se pueden pedir con ?fields=
+CAMPOS_PRODUCTO = [campo.name for campo in Producto._meta.concrete_fields]
+
+
+class ProductoCursorPagination(CursorPagination):
+    """
+    Paginación por cursor sobre la clave primaria: cada página cuesta lo
+    mismo a cualquier profundidad. El total (COUNT) solo se calcula con ?total=1.
+    """
+    ordering = '-id'
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    total_query_param = 'total'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.total = queryset.count() if request.query_params.get(self.total_query_param) else None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if self.total is not None:
+            response.data = OrderedDict([('count', self.total), *response.data.items()])
+        return response
+
+
+def _etag_productos(request, *args, **kwargs):
+    # El formato (JSON, API navegable) depende de Accept y de ?format=
+    return VersionCatalogo.etag(
+        PRODUCTOS, request.get_full_path(), request.META.get('HTTP_ACCEPT', ''), request.user.pk
+    )
+
+
+def _ultima_modificacion_productos(request, *args, **kwargs):
+    return VersionCatalogo.ultima_modificacion(PRODUCTOS)
+
+
+validar_con_version = method_decorator(
+    condition(etag_func=_etag_productos, last_modified_func=_ultima_modificacion_productos)
+)
+
+# Debajo de validar_con_version: los 304 se responden antes de leer la caché
+cachear_en_version = method_decorator(cachear_respuesta(PRODUCTOS))
+
 
 class ProductoViewSet(viewsets.ModelViewSet):
+    """
+    CRUD de productos locales.
+    - ?fields=id,nombre,precio limita la respuesta y las columnas consultadas.
+    - El listado se construye con values() (ProductoValoresSerializer).
+    - /lote/ crea (POST), actualiza (PATCH) o elimina (DELETE) muchos
+      productos en una petición y una transacción.
+    """
     queryset = Producto.objects.all()
     serializer_class = ProductoSerializer
+    pagination_class = ProductoCursorPagination
+
+    def get_campos(self):
+        """Campos de ?fields= (None = todos). Responde 400 si alguno no existe."""
+        parametro = self.request.query_params.get('fields')
+        if not parametro:
+            return None
+        campos = [campo.strip() for campo in parametro.split(',') if campo.strip()]
+        desconocidos = [campo for campo in campos if campo not in CAMPOS_PRODUCTO]
+        if desconocidos:
+            raise serializers.ValidationError({'fields': f"Campos no válidos: {', '.join(desconocidos)}"})
+        return campos
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        campos = self.get_campos() if self.request.method == 'GET' else None
+        if campos and self.action == 'retrieve':
+            queryset = queryset.only(*campos)
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        if self.request.method == 'GET':
+            kwargs.setdefault('campos', self.get_campos())
+        return super().get_serializer(*args, **kwargs)
+
+    @validar_con_version
+    @cachear_en_version
+    def list(self, request, *args, **kwargs):
+        campos = self.get_campos() or CAMPOS_PRODUCTO
+        # El id siempre se consulta: es la clave del cursor
+        filas = self.filter_queryset(self.get_queryset()).values(*dict.fromkeys(['id', *campos]))
+        pagina = self.paginate_queryset(filas)
+        contexto = self.get_serializer_context()
+        if pagina is not None:
+            datos = ProductoValoresSerializer(pagina, many=True, campos=campos, context=contexto).data
+            return self.get_paginated_response(datos)
+        return Response(ProductoValoresSerializer(filas, many=True, campos=campos, context=contexto).data)
+
+    @validar_con_version
+    @cachear_en_version
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    @action(detail=False, methods=['post', 'patch', 'delete'], url_path='lote')
+    def lote(self, request):
+        """
+        POST: lista de productos a crear.
+        PATCH: lista de productos con su "id" y los campos a cambiar.
+        DELETE: {"ids": [...]}.
+        """
+        maximo = getattr(settings, 'PRODUCTOS_API_MAX_LOTE', 1000)
+
+        if request.method == 'DELETE':
+            datos = ProductoIdsSerializer(data=request.data, maximo=maximo)
+            datos.is_valid(raise_exception=True)
+            ids = datos.validated_data['ids']
+            # Sin receptores por fila: índice y versión se actualizan una vez para todo el lote
+            with transaction.atomic(), sin_senales_por_objeto():
+                _, por_modelo = Producto.objects.filter(id__in=ids).delete()
+                BusquedaService.eliminar(DocumentoBusqueda.ORIGEN_LOCAL, ids)
+                transaction.on_commit(lambda: VersionCatalogo.incrementar(PRODUCTOS))
+            return Response({'eliminados': por_modelo.get(Producto._meta.label, 0)})
+
+        if not isinstance(request.data, list) or len(request.data) > maximo:
+            raise serializers.ValidationError(f'Se esperaba una lista de hasta {maximo} productos')
+
+        if request.method == 'POST':
+            serializer = self.get_serializer(data=request.data, many=True)
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+        ids = [item.get('id') for item in request.data if isinstance(item, dict)]
+        productos = list(Producto.objects.filter(id__in=[i for i in ids if isinstance(i, int)]))
+        serializer = self.get_serializer(productos, data=request.data, many=True, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data)
@@ -0,0 +1,41 @@
+"""
+Refresca el snapshot del catálogo externo que lee tienda_view.
+Pensado para ejecutarse desde cron o como proceso aparte:
+
+    python manage.py refrescar_catalogo
+    python manage.py refrescar_catalogo --intervalo 300
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from applications.productos.services.api_dummyjson import refrescar_snapshot_catalogo
+
+
+class Command(BaseCommand):
+    help = 'Descarga el catálogo de DummyJSON y actualiza el snapshot local de la tienda'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--intervalo',
+            type=int,
+            default=0,
+            help='Segundos entre refrescos; 0 ejecuta una sola vez',
+        )
+
+    def handle(self, *args, **options):
+        intervalo = options['intervalo']
+
+        while True:
+            snapshot = refrescar_snapshot_catalogo()
+            if snapshot:
+                self.stdout.write(self.style.SUCCESS(
+                    f"✓ Snapshot actualizado: {len(snapshot['productos'])} productos "
+                    f"({snapshot['actualizado_en']:%d/%m/%Y %H:%M:%S})"
+                ))
+            else:
+                self.stderr.write('✗ No se pudo actualizar el catálogo; se conserva el snapshot anterior')
+
+            if intervalo <= 0:
+                break
+            time.sleep(intervalo)
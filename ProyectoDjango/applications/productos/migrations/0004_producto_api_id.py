@@ -0,0 +1,41 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:05
+
+from django.db import migrations, models
+
+
+def vincular_productos_api(apps, schema_editor):
+    """
+    Vincula los productos creados desde la API (antes se buscaban por nombre)
+    con su ProductoAPI cuando el título coincide con uno solo.
+    """
+    Producto = apps.get_model('productos', 'Producto')
+    ProductoAPI = apps.get_model('apis', 'ProductoAPI')
+
+    por_titulo = {}
+    for api_id, titulo in ProductoAPI.objects.values_list('api_id', 'titulo'):
+        por_titulo.setdefault(titulo, []).append(api_id)
+
+    usados = set()
+    for producto in Producto.objects.filter(api_id__isnull=True, nombre__in=list(por_titulo)).order_by('id'):
+        api_ids = por_titulo[producto.nombre]
+        if len(api_ids) == 1 and api_ids[0] not in usados:
+            usados.add(api_ids[0])
+            producto.api_id = api_ids[0]
+            producto.save(update_fields=['api_id'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0003_producto_imagen_url'),
+        ('apis', '0006_productoapi_orden_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producto',
+            name='api_id',
+            field=models.IntegerField(blank=True, null=True, unique=True),
+        ),
+        migrations.RunPython(vincular_productos_api, migrations.RunPython.noop),
+    ]
@@ -6,6 +6,8 @@ class Producto(models.Model):
     precio = models.DecimalField(max_digits=10, decimal_places=2)
     imagen = models.ImageField(upload_to='productos/', blank=True, null=True)
     imagen_url = models.URLField(blank=True, null=True)
+    # Producto externo del que se creó (ProductoAPI.api_id), para encontrarlo por índice
+    api_id = models.IntegerField(blank=True, null=True, unique=True)
 
     def __str__(self):
         return self.nombre
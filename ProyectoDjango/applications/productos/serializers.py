@@ -1,7 +1,128 @@
+from django.core.files.storage import default_storage
+from django.db import transaction
 from rest_framework import serializers
+from applications.apis.services.busqueda_service import CAMPOS_INDICE_LOCAL, BusquedaService
+from applications.apis.services.version_catalogo import PRODUCTOS, VersionCatalogo
 from .models import Producto
 
-class ProductoSerializer(serializers.ModelSerializer):
+
+class CamposDinamicosMixin:
+    """
+    Permite pasar `campos` (lista de nombres) al serializer para incluir
+    solo esos campos en la respuesta (?fields= de la API).
+    """
+
+    def __init__(self, *args, **kwargs):
+        campos = kwargs.pop('campos', None)
+        super().__init__(*args, **kwargs)
+        if campos is not None:
+            for nombre in set(self.fields) - set(campos):
+                self.fields.pop(nombre)
+
+
+class ProductoListSerializer(serializers.ListSerializer):
+    """
+    Crea y actualiza lotes de productos con bulk_create / bulk_update en una
+    sola transacción (las señales por objeto no se disparan, así que la
+    versión del catálogo y el índice de búsqueda se actualizan aquí).
+    """
+
+    def validate(self, attrs):
+        # api_id es único: dos productos del lote con el mismo valor acabarían en IntegrityError
+        vistos = set()
+        for datos in attrs:
+            api_id = datos.get('api_id')
+            if api_id is None:
+                continue
+            if api_id in vistos:
+                raise serializers.ValidationError({'api_id': f'El api_id {api_id} está repetido en el lote'})
+            vistos.add(api_id)
+        return attrs
+
+    def run_child_validation(self, data):
+        if self.instance is not None:
+            if not hasattr(self, '_por_id'):
+                self._por_id = {producto.pk: producto for producto in self.instance}
+            producto_id = data.get('id') if isinstance(data, dict) else None
+            if producto_id not in self._por_id:
+                raise serializers.ValidationError({'id': 'Producto no encontrado'})
+            self.child.instance = self._por_id[producto_id]
+            self.child.initial_data = data
+        return super().run_child_validation(data)
+
+    def create(self, validated_data):
+        with transaction.atomic():
+            productos = Producto.objects.bulk_create(Producto(**datos) for datos in validated_data)
+            transaction.on_commit(lambda: VersionCatalogo.incrementar(PRODUCTOS))
+            BusquedaService.indexar_productos_locales(producto.pk for producto in productos)
+        return productos
+
+    def update(self, instance, validated_data):
+        campos = set()
+        productos = []
+        for datos in validated_data:
+            producto = self._por_id[datos.pop('id')]
+            for campo, valor in datos.items():
+                setattr(producto, campo, valor)
+            campos.update(datos)
+            productos.append(producto)
+
+        with transaction.atomic():
+            if campos:
+                Producto.objects.bulk_update(productos, sorted(campos), batch_size=500)
+            transaction.on_commit(lambda: VersionCatalogo.incrementar(PRODUCTOS))
+            if campos & set(CAMPOS_INDICE_LOCAL):
+                BusquedaService.indexar_productos_locales(producto.pk for producto in productos)
+        return productos
+
+
+class ProductoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Producto
         fields = '__all__'
+        list_serializer_class = ProductoListSerializer
+
+    def validate(self, attrs):
+        # En lotes de actualización el id identifica a cada producto
+        if isinstance(self.parent, ProductoListSerializer) and self.instance is not None:
+            attrs['id'] = self.instance.pk
+        return attrs
+
+
+class ProductoIdsSerializer(serializers.Serializer):
+    """Cuerpo de DELETE /lote/: {"ids": [...]} con hasta `maximo` enteros"""
+
+    def __init__(self, *args, maximo=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['ids'] = serializers.ListField(child=serializers.IntegerField(), max_length=maximo)
+
+
+# Misma representación del precio que el campo del ModelSerializer ("12.50")
+CAMPO_PRECIO = serializers.DecimalField(max_digits=10, decimal_places=2)
+
+
+class ProductoValoresSerializer(serializers.BaseSerializer):
+    """
+    Serializer de solo lectura para listados: recibe los diccionarios de
+    queryset.values() en lugar de instancias y produce la misma salida que
+    ProductoSerializer sin construir modelos ni campos por objeto.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.campos = kwargs.pop('campos', None) or [campo.name for campo in Producto._meta.concrete_fields]
+        super().__init__(*args, **kwargs)
+
+    def to_representation(self, fila):
+        datos = {campo: fila[campo] for campo in self.campos}
+        if datos.get('precio') is not None:
+            datos['precio'] = CAMPO_PRECIO.to_representation(datos['precio'])
+        if 'imagen' in datos:
+            datos['imagen'] = self._url_imagen(datos['imagen'])
+        return datos
+
+    def _url_imagen(self, nombre):
+        if not nombre:
+            return None
+        url = default_storage.url(nombre)
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request is not None else url
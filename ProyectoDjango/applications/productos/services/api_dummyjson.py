@@ -1,7 +1,14 @@
 import requests
+from django.conf import settings
+from django.utils import timezone
+from applications.apis.services import http_client
+from applications.apis.services.cache_compartido import obtener_con_cache, refrescar
 
 API_URL = "https://dummyjson.com/products"
 
+# Clave del snapshot del catálogo externo en la caché compartida
+CLAVE_SNAPSHOT_CATALOGO = 'catalogo:dummyjson'
+
 def obtener_productos_api():
     """
     Obtiene productos de zapatos desde DummyJSON.
@@ -17,31 +24,32 @@ def obtener_productos_api():
             'mens-shoes',    # Zapatos de hombre
         ]
         
-        # Obtener productos de cada categoría
-        for categoria in categorias_zapatos:
-            try:
-                response = requests.get(f"{API_URL}/category/{categoria}", timeout=5)
-                if response.status_code == 200:
-                    data = response.json()
-                    productos_categoria = data.get("products", [])
-                    
-                    # Filtrar para asegurar que son zapatos
-                    for prod in productos_categoria:
-                        titulo = prod.get('title', '').lower()
-                        # Excluir productos que claramente no son zapatos
-                        palabras_excluir = ['ball', 'bat', 'helmet', 'glove', 'wicket', 
-                                          'shuttlecock', 'racket', 'rim', 'football', 
-                                          'basketball', 'baseball', 'volleyball', 'tennis ball',
-                                          'cricket', 'golf ball', 'iron golf']
-                        
-                        if not any(palabra in titulo for palabra in palabras_excluir):
-                            productos.append(prod)
-            except:
+        # Obtener las categorías en paralelo con conexiones persistentes
+        respuestas = http_client.get_concurrente(
+            [f"{API_URL}/category/{categoria}" for categoria in categorias_zapatos],
+            timeout=5,
+        )
+        for response in respuestas:
+            if isinstance(response, Exception) or response.status_code != 200:
                 continue
+            data = response.json()
+            productos_categoria = data.get("products", [])
+            
+            # Filtrar para asegurar que son zapatos
+            for prod in productos_categoria:
+                titulo = prod.get('title', '').lower()
+                # Excluir productos que claramente no son zapatos
+                palabras_excluir = ['ball', 'bat', 'helmet', 'glove', 'wicket', 
+                                  'shuttlecock', 'racket', 'rim', 'football', 
+                                  'basketball', 'baseball', 'volleyball', 'tennis ball',
+                                  'cricket', 'golf ball', 'iron golf']
+                
+                if not any(palabra in titulo for palabra in palabras_excluir):
+                    productos.append(prod)
         
         # Si no se obtuvieron productos, buscar específicamente "shoes"
         if not productos:
-            response = requests.get(f"{API_URL}/search?q=shoes", timeout=5)
+            response = http_client.get(f"{API_URL}/search", params={"q": "shoes"}, timeout=5)
             response.raise_for_status()
             data = response.json()
             productos = data.get("products", [])
@@ -51,3 +59,37 @@ def obtener_productos_api():
     except requests.RequestException as e:
         print(f"Error obteniendo productos desde DummyJSON: {e}")
         return []
+
+
+def _cargar_snapshot():
+    """Descarga el catálogo; devuelve None si la API no respondió para conservar el anterior"""
+    productos = obtener_productos_api()
+    if not productos:
+        return None
+    return {
+        "productos": productos,
+        "actualizado_en": timezone.now(),
+    }
+
+
+def obtener_snapshot_catalogo():
+    """
+    Devuelve el último snapshot del catálogo externo sin esperar a la API:
+    {"productos": [...], "actualizado_en": datetime} o None si aún no existe.
+    Si el snapshot tiene más de CATALOGO_SNAPSHOT_TTL segundos, se pide un
+    refresco en segundo plano y se sigue sirviendo el actual.
+    """
+    return obtener_con_cache(
+        CLAVE_SNAPSHOT_CATALOGO,
+        _cargar_snapshot,
+        ttl=getattr(settings, 'CATALOGO_SNAPSHOT_TTL', 300),
+        bloquear=False,
+    )
+
+
+def refrescar_snapshot_catalogo():
+    """
+    Descarga el catálogo de inmediato y reemplaza el snapshot (uso en comandos).
+    Si la API falla se conserva el snapshot anterior y se devuelve None.
+    """
+    return refrescar(CLAVE_SNAPSHOT_CATALOGO, _cargar_snapshot)
@@ -0,0 +1,55 @@
+"""
+Señales de la aplicación de productos.
+Cambian la versión del catálogo local (ETag de la API REST) y mantienen el
+índice de búsqueda unificado al modificar productos. Las operaciones por
+lotes de la API se ejecutan dentro de sin_senales_por_objeto() y hacen ese
+trabajo una sola vez.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from applications.apis.models import DocumentoBusqueda
+from applications.apis.services.busqueda_service import CAMPOS_INDICE_LOCAL, BusquedaService
+from applications.apis.services.version_catalogo import PRODUCTOS, VersionCatalogo
+from .models import Producto
+
+_omitir = ContextVar('omitir_senales_producto', default=False)
+
+
+@contextmanager
+def sin_senales_por_objeto():
+    """Desactiva los receptores de este módulo mientras dura el bloque"""
+    token = _omitir.set(True)
+    try:
+        yield
+    finally:
+        _omitir.reset(token)
+
+
+@receiver(post_save, sender=Producto)
+@receiver(post_delete, sender=Producto)
+def incrementar_version_catalogo(sender, **kwargs):
+    if _omitir.get():
+        return
+    # Al confirmar: antes, una lectura concurrente vería la versión nueva con las filas viejas
+    transaction.on_commit(lambda: VersionCatalogo.incrementar(PRODUCTOS))
+
+
+@receiver(post_save, sender=Producto)
+def indexar_producto(sender, instance, update_fields=None, **kwargs):
+    if _omitir.get():
+        return
+    if update_fields is not None and not set(update_fields) & set(CAMPOS_INDICE_LOCAL):
+        return
+    BusquedaService.indexar_productos_locales([instance.pk])
+
+
+@receiver(post_delete, sender=Producto)
+def quitar_producto_del_indice(sender, instance, **kwargs):
+    if _omitir.get():
+        return
+    BusquedaService.eliminar(DocumentoBusqueda.ORIGEN_LOCAL, [instance.pk])
@@ -1,3 +1,167 @@
-from django.test import TestCase
+from decimal import Decimal
 
-# Create your tests here.
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+
+from applications.apis.models import DocumentoBusqueda
+from .models import Producto
+
+CACHES_PRUEBA = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'pruebas-productos'},
+    'respuestas': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'pruebas-respuestas'},
+}
+URL_PRODUCTOS = '/api/productos/'
+URL_LOTE = '/api/productos/lote/'
+
+
+@override_settings(CACHES=CACHES_PRUEBA)
+class ProductosApiTestCase(TestCase):
+
+    def setUp(self):
+        caches['default'].clear()
+        caches['respuestas'].clear()
+
+
+class PaginacionProductosTests(ProductosApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        Producto.objects.bulk_create(
+            Producto(nombre=f'Producto {i}', precio=Decimal('1000.00')) for i in range(45)
+        )
+        self.ids = list(Producto.objects.order_by('-id').values_list('id', flat=True))
+
+    def test_los_enlaces_next_y_previous_recorren_el_listado(self):
+        vistos, paginas, url = [], [], URL_PRODUCTOS
+        while url:
+            datos = self.client.get(url, {'fields': 'id,nombre'} if url == URL_PRODUCTOS else None).json()
+            paginas.append(datos)
+            vistos.extend(producto['id'] for producto in datos['results'])
+            url = datos['next']
+
+        self.assertEqual(len(paginas), 3)
+        self.assertEqual(vistos, self.ids)
+        self.assertEqual(set(paginas[0]['results'][0]), {'id', 'nombre'})
+
+        anterior = self.client.get(paginas[2]['previous']).json()
+        self.assertEqual(anterior['results'], paginas[1]['results'])
+
+    def test_el_total_solo_se_cuenta_si_se_pide(self):
+        sin_total = self.client.get(URL_PRODUCTOS).json()
+        con_total = self.client.get(URL_PRODUCTOS, {'total': 1}).json()
+
+        self.assertNotIn('count', sin_total)
+        self.assertEqual(con_total['count'], 45)
+
+    def test_campo_desconocido_responde_400(self):
+        response = self.client.get(URL_PRODUCTOS, {'fields': 'id,no_existe'})
+
+        self.assertEqual(response.status_code, 400)
+
+
+class GetCondicionalProductosTests(ProductosApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.producto = Producto.objects.create(nombre='Producto', precio=Decimal('1000.00'))
+
+    def test_listado_y_detalle_responden_304_con_la_misma_version(self):
+        for url in (URL_PRODUCTOS, f'{URL_PRODUCTOS}{self.producto.pk}/'):
+            etag = self.client.get(url)['ETag']
+
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+            self.assertEqual(response.status_code, 304)
+
+    def test_una_escritura_invalida_el_etag(self):
+        etag = self.client.get(URL_PRODUCTOS)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(
+                f'{URL_PRODUCTOS}{self.producto.pk}/', {'precio': '2000.00'}, content_type='application/json'
+            )
+        response = self.client.get(URL_PRODUCTOS, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['precio'], '2000.00')
+
+
+class LoteProductosTests(ProductosApiTestCase):
+
+    def enviar(self, metodo, datos):
+        with self.captureOnCommitCallbacks(execute=True):
+            return getattr(self.client, metodo)(URL_LOTE, datos, content_type='application/json')
+
+    def test_post_crea_el_lote_e_indexa_los_locales(self):
+        response = self.enviar('post', [
+            {'nombre': 'Zapato', 'precio': '1000.00'},
+            {'nombre': 'Bota', 'precio': '2000.00', 'api_id': 7},
+        ])
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.json()), 2)
+        self.assertEqual(Producto.objects.count(), 2)
+        # Los espejos de productos externos (con api_id) no entran al índice local
+        indexados = DocumentoBusqueda.objects.filter(
+            origen=DocumentoBusqueda.ORIGEN_LOCAL
+        ).values_list('objeto_id', flat=True)
+        self.assertEqual(list(indexados), [Producto.objects.get(nombre='Zapato').pk])
+
+    def test_post_con_api_id_repetido_responde_400_sin_crear_nada(self):
+        response = self.enviar('post', [
+            {'nombre': 'Zapato', 'precio': '1000.00', 'api_id': 7},
+            {'nombre': 'Bota', 'precio': '2000.00', 'api_id': 7},
+        ])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Producto.objects.exists())
+
+    @override_settings(PRODUCTOS_API_MAX_LOTE=2)
+    def test_un_lote_demasiado_grande_o_que_no_es_lista_responde_400(self):
+        for datos in ([{'nombre': f'P{i}', 'precio': '1.00'} for i in range(3)], {'nombre': 'P', 'precio': '1.00'}):
+            with self.subTest(datos=datos):
+                self.assertEqual(self.enviar('post', datos).status_code, 400)
+        self.assertFalse(Producto.objects.exists())
+
+    def test_patch_actualiza_cada_producto_por_id(self):
+        zapato = Producto.objects.create(nombre='Zapato', precio=Decimal('1000.00'))
+        bota = Producto.objects.create(nombre='Bota', precio=Decimal('2000.00'))
+
+        response = self.enviar('patch', [
+            {'id': zapato.pk, 'precio': '1500.00'}, {'id': bota.pk, 'nombre': 'Bota alta'},
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        zapato.refresh_from_db()
+        bota.refresh_from_db()
+        self.assertEqual((zapato.nombre, zapato.precio), ('Zapato', Decimal('1500.00')))
+        self.assertEqual((bota.nombre, bota.precio), ('Bota alta', Decimal('2000.00')))
+
+    def test_patch_con_un_id_inexistente_responde_400(self):
+        zapato = Producto.objects.create(nombre='Zapato', precio=Decimal('1000.00'))
+
+        response = self.enviar('patch', [
+            {'id': zapato.pk, 'precio': '1.00'}, {'id': zapato.pk + 1000, 'precio': '1.00'},
+        ])
+
+        self.assertEqual(response.status_code, 400)
+        zapato.refresh_from_db()
+        self.assertEqual(zapato.precio, Decimal('1000.00'))
+
+    def test_delete_elimina_los_ids_y_sus_documentos(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            productos = [Producto.objects.create(nombre=f'Producto {i}', precio=Decimal('1.00')) for i in range(3)]
+        ids = [producto.pk for producto in productos[:2]]
+
+        response = self.enviar('delete', {'ids': ids + [ids[-1] + 1000]})
+
+        self.assertEqual(response.json(), {'eliminados': 2})
+        self.assertEqual(list(Producto.objects.values_list('pk', flat=True)), [productos[2].pk])
+        self.assertFalse(DocumentoBusqueda.objects.filter(
+            origen=DocumentoBusqueda.ORIGEN_LOCAL, objeto_id__in=ids
+        ).exists())
+
+    def test_delete_con_ids_invalidos_responde_400(self):
+        for datos in ({'ids': ['abc']}, {'ids': 3}, {}):
+            with self.subTest(datos=datos):
+                self.assertEqual(self.enviar('delete', datos).status_code, 400)
@@ -1,6 +1,9 @@
 from django.shortcuts import render
 from .models import Producto
-from .services.api_dummyjson import obtener_productos_api
+from .services.api_dummyjson import obtener_snapshot_catalogo
+from applications.apis.models import ProductoAPI, convertir_usd_a_cop
+from applications.apis.services.busqueda_service import BusquedaService
+from applications.apis.services.exchangerate_service import ExchangeRateService
 
 def home_view(request):
     """
@@ -8,26 +11,62 @@ def home_view(request):
     """
     return render(request, "home.html")
 
+def _precio_cop(precio_cop, precio_usd, tasa_cop):
+    """
+    Precio COP con el que el carrito guardaría el producto externo: el
+    almacenado en api_productos o, si no hay, la conversión Decimal con la
+    tasa actual. None si no hay tasa con qué calcularlo.
+    """
+    if precio_cop is not None:
+        return precio_cop
+    if precio_usd is None or not tasa_cop:
+        return None
+    return convertir_usd_a_cop(precio_usd, tasa_cop)
+
+
 def tienda_view(request):
     """
     Controlador que orquesta:
     - Productos locales (BD)
-    - Productos externos (API)
+    - Productos externos (snapshot local del catálogo de la API)
+    - Con ?q=, resultados del índice de búsqueda unificado (ambas fuentes)
     """
     query = request.GET.get("q", "").strip()
 
-    # Productos locales
+    # Tasa con la que el carrito convierte los precios de la API, sin esperar a la API:
+    # None mientras la caché se calienta (se muestra el precio guardado o "no disponible")
+    tasas = ExchangeRateService.obtener_tasa_cambio(bloquear=False)
+    tasa_cop = tasas["tasa_cop"] if tasas and tasas.get("tasa_cop") else None
+
     if query:
-        productos_locales = Producto.objects.filter(nombre__icontains=query)
-    else:
-        productos_locales = Producto.objects.all()
+        # Búsqueda: índice local unificado (productos propios y de la API), sin llamar a la API
+        resultados = BusquedaService.buscar(query, cursor=request.GET.get("cursor"))
+        for r in resultados:
+            if r["origen"] == "api":
+                r["precio_cop"] = _precio_cop(r["precio_cop"], r["precio_usd"], tasa_cop)
+        context = {
+            "resultados": resultados,
+            "query": query,
+        }
+        return render(request, "productos/tienda.html", context)
+
+    # Productos desde API externa (se refrescan en segundo plano)
+    snapshot = obtener_snapshot_catalogo()
+    productos_api = snapshot["productos"] if snapshot else []
 
-    # Productos desde API externa
-    productos_api = obtener_productos_api()
+    # Mismo precio que guardará el carrito: el de api_productos si ya se sincronizó
+    guardados = dict(ProductoAPI.objects.filter(
+        api_id__in=[p.get("id") for p in productos_api]
+    ).values_list("api_id", "precio_cop")) if productos_api else {}
+    productos_api = [
+        {**p, "precio_cop": _precio_cop(guardados.get(p.get("id")), p.get("price"), tasa_cop)}
+        for p in productos_api
+    ]
 
     context = {
-        "productos_locales": productos_locales,
+        "productos_locales": Producto.objects.all(),
         "productos_api": productos_api,
+        "catalogo_actualizado_en": snapshot["actualizado_en"] if snapshot else None,
         "query": query,
     }
 